@@ -1,48 +1,305 @@
+import argparse
+import json
+import os
+
 import pandas as pd
-from column_selection import final_preprocessed_df  
 
+from abc_engine import CLASS_SCHEMES, METRICS, abc_classify, product_abc, rolling_abc, xyz_classify
+from charts import abc_chart
+from instrumentation import instrumented, step
+from preprocess_cache import file_fingerprint
+from sales_cube import aggregate
 
+# File-name suffix of the default month; --from/--to runs are named after their dates instead.
+DEFAULT_PERIOD_SUFFIX = 'feb_2024'
 
-print("--- ABC Analysis ---")
+ABC_RESULTS_FILE_PATH = f'abc_analysis_results_{DEFAULT_PERIOD_SUFFIX}.csv'
 
-# Group by ProductID and calculate total revenue for each product
-# Ensure 'ProductName' is included if you want it in the ABC analysis results dataframe.
-product_revenue = final_preprocessed_df.groupby(['ProductID', 'ProductName'])['TotalPrice'].sum().sort_values(ascending=False).reset_index()
-product_revenue.columns = ['ProductID', 'ProductName', 'TotalRevenue']
+# Per-product running revenue, persisted so new sales batches can be folded in incrementally.
+# '<state>.json' next to it records the days the state covers and the batch files folded into it.
+ABC_STATE_FILE_PATH = f'abc_state_{DEFAULT_PERIOD_SUFFIX}.csv'
+ABC_STATE_COLUMNS = ['ProductID', 'ProductName', 'TotalRevenue', 'ABC_Category']
 
-# Calculate cumulative percentage of total revenue
-product_revenue['CumulativeRevenue'] = product_revenue['TotalRevenue'].cumsum()
-product_revenue['CumulativeRevenuePercentage'] = (product_revenue['CumulativeRevenue'] / product_revenue['TotalRevenue'].sum()) * 100
 
-# Assign ABC categories
+# Assign ABC categories (defaults; see abc_engine.CLASS_SCHEMES for others)
 # A-items: Top 70% of revenue
 # B-items: Next 20% of revenue (up to 90%)
 # C-items: Remaining 10% of revenue (above 90%)
-def assign_abc_category(percentage):
-    if percentage <= 70:
-        return 'A'
-    elif percentage <= 90:
-        return 'B'
+ABC_THRESHOLDS, ABC_LABELS = CLASS_SCHEMES['abc']
+
+
+def classify_product_revenue(product_revenue, thresholds=ABC_THRESHOLDS, labels=ABC_LABELS):
+    """
+    Given one row per product with 'TotalRevenue', sort by revenue and add the cumulative
+    revenue, cumulative percentage and 'ABC_Category' columns.
+    """
+    return abc_classify(product_revenue, thresholds, labels, metric='revenue')
+
+
+def summarize_abc(product_totals, total_column='TotalRevenue'):
+    # Summarize ABC categories
+    return product_totals.groupby('ABC_Category').agg(
+        ProductCount=('ProductID', 'count'),
+        **{total_column: (total_column, 'sum')},
+        **{f'PercentageOf{total_column}': (total_column, lambda x: (x.sum() / product_totals[total_column].sum()) * 100)}
+    ).reset_index()
+
+
+@instrumented('abc')
+def run_abc_analysis(final_preprocessed_df, output_filename=ABC_RESULTS_FILE_PATH, state_filename=None,
+                     metric='revenue', thresholds=ABC_THRESHOLDS, labels=ABC_LABELS, period_label=None, charts=None,
+                     reset_state=False):
+    """
+    Rank products by `metric` (revenue, quantity or margin), assign classes and save the results.
+    Returns the per-product table. With `state_filename` (revenue only), also seed the per-product
+    running revenue for later incremental updates; an existing state is kept unless `reset_state`,
+    so a full run never discards folded-in batches. `period_label` names the analyzed period in the output.
+    With `charts` (a charts.ChartBatch), the class share bar chart is added to it.
+    """
+    print(f"--- ABC Analysis for {period_label} ---" if period_label else "--- ABC Analysis ---")
+
+    # Group by ProductID and calculate the metric total for each product, then classify
+    # (vectorized, see abc_engine.py). 'ProductName' is kept in the results dataframe.
+    with step('classify', metric=metric) as current:
+        product_totals = product_abc(final_preprocessed_df, metric, thresholds, labels)
+        current.record(product_totals)
+    total_column = f'Total{METRICS[metric][0]}'
+
+    print(f"\nABC Analysis Results by {metric} (Top 5 products):")
+    print(product_totals.head()) # Display top few ABC categorized products
+
+    abc_summary = summarize_abc(product_totals, total_column)
+    print("\nABC Analysis Summary:")
+    print(abc_summary)
+    if charts is not None:
+        plot_order = [label for label in labels if label in set(abc_summary['ABC_Category'])]
+        charts.add(abc_chart(abc_summary, plot_order, period_label, METRICS[metric][0]))
+
+    # Save the ABC analysis results to a CSV file
+    with step('write_results'):
+        product_totals.to_csv(output_filename, index=False)
+    print(f"\nABC analysis results saved to '{output_filename}'.")
+
+    if state_filename and metric == 'revenue':
+        if os.path.exists(state_filename) and not reset_state:
+            print(f"Kept the existing ABC running revenue state '{state_filename}' "
+                  f"(pass --reset-state to rebuild it from this period).")
+        else:
+            first_day, last_day = sales_days(final_preprocessed_df)
+            save_abc_state(product_totals, state_filename, {'first_day': _day_string(first_day),
+                                                            'last_day': _day_string(last_day), 'batches': []})
+            print(f"ABC running revenue state saved to '{state_filename}'.")
+
+    print("\nABC Analysis section complete.")
+    return product_totals
+
+
+# --- Incremental ABC Analysis ---
+
+def sales_days(sales_data):
+    """First and last sales day of a SalesCube or preprocessed DataFrame, or (None, None) if it is empty."""
+    days = aggregate(sales_data, ['SalesDay'])['SalesDay']
+    if days.empty:
+        return None, None
+    return days.min(), days.max()
+
+
+def _day_string(day):
+    return None if day is None else f"{day:%Y-%m-%d}"
+
+
+def abc_state_manifest_path(state_filename):
+    return os.path.splitext(state_filename)[0] + '.json'
+
+
+def load_abc_state_manifest(state_filename=ABC_STATE_FILE_PATH):
+    """The days a persisted state covers and the batches folded into it (nothing for a new state)."""
+    path = abc_state_manifest_path(state_filename)
+    if not os.path.exists(path):
+        return {'first_day': None, 'last_day': None, 'batches': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_abc_state(product_revenue, state_filename, manifest):
+    product_revenue[ABC_STATE_COLUMNS].to_csv(state_filename, index=False)
+    with open(abc_state_manifest_path(state_filename), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def load_abc_state(state_filename=ABC_STATE_FILE_PATH):
+    """Load the persisted per-product running revenue, or an empty state if none exists yet."""
+    if not os.path.exists(state_filename):
+        return pd.DataFrame({
+            'ProductID': pd.Series(dtype='int64'),
+            'ProductName': pd.Series(dtype='object'),
+            'TotalRevenue': pd.Series(dtype='float64'),
+            'ABC_Category': pd.Series(dtype='object'),
+        })
+    return pd.read_csv(state_filename)
+
+
+def update_abc_state(state_df, batch_df):
+    """
+    Fold a batch of new preprocessed sales into the running per-product revenue and re-derive
+    the ABC classes. Only the batch rows are aggregated; the rest is work over one row per
+    product. Returns (updated product table, products whose class changed).
+    """
+    batch_revenue = aggregate(batch_df, ['ProductID', 'ProductName'], ['TotalPrice'])
+    batch_revenue = batch_revenue.rename(columns={'TotalPrice': 'TotalRevenue'}).set_index('ProductID')
+    batch_revenue['ProductName'] = batch_revenue['ProductName'].astype(object)
+
+    state = state_df.set_index('ProductID')
+    previous_category = state['ABC_Category']
+    names = state['ProductName'].combine_first(batch_revenue['ProductName'])
+    revenue = state['TotalRevenue'].add(batch_revenue['TotalRevenue'], fill_value=0)
+
+    product_revenue = pd.DataFrame({'ProductName': names, 'TotalRevenue': revenue})
+    product_revenue.index.name = 'ProductID'
+    product_revenue = classify_product_revenue(product_revenue.reset_index())
+
+    previous = product_revenue['ProductID'].map(previous_category)
+    changed = product_revenue[previous.ne(product_revenue['ABC_Category'])].assign(
+        PreviousCategory=previous
+    )[['ProductID', 'ProductName', 'PreviousCategory', 'ABC_Category', 'TotalRevenue']]
+    return product_revenue, changed
+
+
+def check_new_batch(manifest, batch_first_day, batch_sha256=None, state_filename=ABC_STATE_FILE_PATH):
+    """
+    Raise ValueError if a batch was already folded into the state (same file contents) or starts
+    on or before the last day the state covers, since its sales would be counted twice.
+    """
+    for batch in manifest['batches']:
+        if batch_sha256 is not None and batch['sha256'] == batch_sha256:
+            raise ValueError(f"'{batch['file']}' ({batch['first_day']} to {batch['last_day']}) has already been "
+                             f"folded into '{state_filename}'.")
+    if manifest['last_day'] is not None and batch_first_day <= pd.Timestamp(manifest['last_day']):
+        raise ValueError(f"The batch starts on {batch_first_day:%Y-%m-%d}, but '{state_filename}' already covers sales "
+                         f"up to {manifest['last_day']}; only batches of later days can be folded in.")
+
+
+@instrumented('abc_incremental')
+def run_incremental_abc_analysis(batch_df, state_filename=ABC_STATE_FILE_PATH, output_filename=None, batch_file=None):
+    """
+    Fold one new sales batch into the persisted ABC state, save it and report class changes.
+    `batch_file` is the CSV the batch was loaded from; it is fingerprinted so the same file is
+    never folded in twice. A repeated or overlapping batch raises ValueError (see check_new_batch).
+    The results go to `output_filename` (default: named after the days the state covers).
+    """
+    print("--- Incremental ABC Analysis ---")
+    manifest = load_abc_state_manifest(state_filename)
+    batch_first_day, batch_last_day = sales_days(batch_df)
+    if batch_first_day is None:
+        raise ValueError("The batch has no sales to fold in.")
+    batch_sha256 = file_fingerprint(batch_file)['sha256'] if batch_file else None
+    check_new_batch(manifest, batch_first_day, batch_sha256, state_filename)
+
+    state_df = load_abc_state(state_filename)
+    print(f"Loaded running revenue for {len(state_df)} products; folding in {len(batch_df)} new sales rows "
+          f"({batch_first_day:%Y-%m-%d} to {batch_last_day:%Y-%m-%d}).")
+
+    product_revenue, changed = update_abc_state(state_df, batch_df)
+
+    print("\nABC Analysis Summary:")
+    print(summarize_abc(product_revenue))
+
+    if changed.empty:
+        print("\nNo products changed ABC class.")
+    else:
+        print(f"\n{len(changed)} products changed ABC class (PreviousCategory is NaN for new products):")
+        print(changed.to_string(index=False))
+
+    first_day = pd.Timestamp(manifest['first_day']) if manifest['first_day'] else batch_first_day
+    if batch_sha256 is not None:
+        manifest['batches'].append({'file': os.path.abspath(batch_file), 'sha256': batch_sha256,
+                                    'first_day': _day_string(batch_first_day), 'last_day': _day_string(batch_last_day)})
+    manifest.update(first_day=_day_string(first_day), last_day=_day_string(batch_last_day))
+    save_abc_state(product_revenue, state_filename, manifest)
+    output_filename = output_filename or f"abc_analysis_results_{first_day:%Y%m%d}_{batch_last_day:%Y%m%d}.csv"
+    product_revenue.to_csv(output_filename, index=False)
+    print(f"\nABC running revenue state saved to '{state_filename}' and results to '{output_filename}'.")
+    return product_revenue, changed
+
+
+def parse_thresholds(value):
+    return tuple(float(threshold) for threshold in value.split(','))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="ABC analysis of product revenue.")
+    parser.add_argument('--incremental', metavar='BATCH_CSV',
+                        help="Fold a new trimmed sales batch into the saved running revenue instead of recomputing the month.")
+    parser.add_argument('--state',
+                        help=f"Running revenue state file (default: abc_state_<period>.csv, {ABC_STATE_FILE_PATH} "
+                             f"for the default month). A full run only creates it; --incremental updates it.")
+    parser.add_argument('--reset-state', action='store_true',
+                        help="Rebuild an existing state from this full run, discarding the batches folded into it.")
+    parser.add_argument('--from', dest='date_from', type=pd.Timestamp,
+                        help="Analyze a date range starting on this date (YYYY-MM-DD) instead of the default month.")
+    parser.add_argument('--to', dest='date_to', type=pd.Timestamp, help="Last day (YYYY-MM-DD) of the date range.")
+    parser.add_argument('--partition-dir',
+                        help="Read a --from/--to range from these month partitions instead of the trimmed sales file.")
+    parser.add_argument('--metric', choices=list(METRICS), default='revenue',
+                        help="What to rank products by (default: %(default)s).")
+    parser.add_argument('--scheme', choices=list(CLASS_SCHEMES), default='abc',
+                        help="Preset thresholds and classes (default: %(default)s).")
+    parser.add_argument('--thresholds', type=parse_thresholds,
+                        help="Custom cumulative-percentage cutoffs, e.g. 60,85,95 (one fewer than classes).")
+    parser.add_argument('--labels', help="Custom class labels, e.g. ABCD.")
+    parser.add_argument('--xyz', action='store_true', help="Also classify products by daily demand variability (XYZ).")
+    parser.add_argument('--rolling-weeks', type=int,
+                        help="Also classify every product over trailing windows of this many weeks.")
+    args = parser.parse_args()
+
+    thresholds, labels = CLASS_SCHEMES[args.scheme]
+    thresholds = args.thresholds or thresholds
+    labels = tuple(args.labels) if args.labels else labels
+
+    if args.incremental:
+        from column_selection import load_final_preprocessed_df
+
+        if args.date_from is not None or args.date_to is not None:
+            print("Note: --from/--to apply to full runs; an incremental run covers the batch's own dates.")
+        batch_df = load_final_preprocessed_df(args.incremental, use_cache=False)
+        try:
+            run_incremental_abc_analysis(batch_df, state_filename=args.state or ABC_STATE_FILE_PATH,
+                                         batch_file=args.incremental)
+        except ValueError as e:
+            print(f"Error: {e} The state was not changed.")
+            exit()
     else:
-        return 'C'
+        if args.date_from is None and args.date_to is None:
+            from column_selection import final_preprocessed_df
 
-product_revenue['ABC_Category'] = product_revenue['CumulativeRevenuePercentage'].apply(assign_abc_category)
+            period_label, period_suffix = None, DEFAULT_PERIOD_SUFFIX
+        else:
+            from column_selection import load_sales_cube_range
 
-print("\nABC Analysis Results (Top 5 products):")
-print(product_revenue.head()) # Display top few ABC categorized products
+            final_preprocessed_df = load_sales_cube_range(args.date_from, args.date_to, args.partition_dir)
+            first_day, last_day = sales_days(final_preprocessed_df)
+            if first_day is None:
+                print("Error: no sales in the requested date range.")
+                exit()
+            first_day = args.date_from if args.date_from is not None else first_day
+            last_day = args.date_to if args.date_to is not None else last_day
+            period_label, period_suffix = f"{first_day:%Y-%m-%d} to {last_day:%Y-%m-%d}", f"{first_day:%Y%m%d}_{last_day:%Y%m%d}"
 
-# Summarize ABC categories
-abc_summary = product_revenue.groupby('ABC_Category').agg(
-    ProductCount=('ProductID', 'count'),
-    TotalRevenue=('TotalRevenue', 'sum'),
-    PercentageOfTotalRevenue=('TotalRevenue', lambda x: (x.sum() / product_revenue['TotalRevenue'].sum()) * 100)
-).reset_index()
-print("\nABC Analysis Summary:")
-print(abc_summary)
+        # Non-revenue rankings get their own results file, so visualize.py keeps reading revenue classes.
+        metric_prefix = '' if args.metric == 'revenue' else f'{args.metric}_'
+        output_filename = f'abc_analysis_results_{metric_prefix}{period_suffix}.csv'
+        run_abc_analysis(final_preprocessed_df, output_filename=output_filename,
+                         state_filename=args.state or f'abc_state_{period_suffix}.csv', metric=args.metric,
+                         thresholds=thresholds, labels=labels, period_label=period_label, reset_state=args.reset_state)
 
-# Save the ABC analysis results to a CSV file
-output_filename = 'abc_analysis_results_feb_2024.csv'
-product_revenue.to_csv(output_filename, index=False)
-print(f"\nABC analysis results saved to '{output_filename}'.")
+        if args.xyz:
+            xyz = xyz_classify(final_preprocessed_df)
+            print("\nXYZ Classification by daily demand variability (coefficient of variation):")
+            print(xyz['XYZ_Category'].value_counts().sort_index().to_string())
 
-print("\nABC Analysis section complete.")
+        if args.rolling_weeks:
+            rolling = rolling_abc(final_preprocessed_df, window=args.rolling_weeks, freq='W', metric=args.metric,
+                                  thresholds=thresholds, labels=labels)
+            print(f"\nRolling {args.rolling_weeks}-week classes (product counts per window end):")
+            print(rolling.pivot_table(index='WindowEnd', columns='ABC_Category', values='ProductID',
+                                      aggfunc='count', fill_value=0))
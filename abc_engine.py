@@ -0,0 +1,194 @@
+"""
+Reusable, vectorized ABC/XYZ classification.
+
+The classic analysis in ABC_analysis.py ranks products by revenue and cuts the cumulative
+revenue percentage at 70% and 90%. Here the cut is a single `np.searchsorted` over the
+cumulative percentages, so thresholds and the number of classes are configurable
+(ABC, ABCD, ...). Products can be ranked by revenue, quantity or margin, classified by demand
+variability (XYZ), or classified over trailing windows for every product and period at once.
+All totals come from sales_cube.aggregate, so a SalesCube works as well as row-level data.
+"""
+import numpy as np
+import pandas as pd
+
+from sales_cube import aggregate
+from schema import as_float64
+
+# Cumulative-percentage upper bounds and class labels. A product whose cumulative percentage is
+# <= the first bound gets the first label, and so on; anything above the last bound gets the last.
+CLASS_SCHEMES = {
+    'abc': ((70, 90), ('A', 'B', 'C')),
+    'abcd': ((50, 80, 95), ('A', 'B', 'C', 'D')),
+}
+
+# Coefficient-of-variation upper bounds of per-period demand: X is steady, Z is erratic.
+XYZ_THRESHOLDS = (0.5, 1.0)
+XYZ_LABELS = ('X', 'Y', 'Z')
+
+# Ranking metrics -> (name used in output columns, source column). Margin is computed from
+# TotalPrice, Quantity and Price (see _margin_totals).
+METRICS = {
+    'revenue': ('Revenue', 'TotalPrice'),
+    'quantity': ('Quantity', 'Quantity'),
+    'margin': ('Margin', None),
+}
+
+# A product's unit cost is its Price times this share, the assumed COGS share of
+# inventory_turnover_ratio_analysis.py and the basis inventory_store.py values stock at.
+DEFAULT_COGS_PERCENTAGE_OF_REVENUE = 0.70
+
+_WEEK_START_OFFSET = 3  # 1970-01-01 was a Thursday; shifting by 3 days aligns weeks to Monday.
+
+
+def _check_scheme(thresholds, labels):
+    thresholds = np.asarray(thresholds, dtype=float)
+    if len(labels) != len(thresholds) + 1:
+        raise ValueError(f"{len(thresholds)} thresholds need {len(thresholds) + 1} labels, got {len(labels)}")
+    if np.any(np.diff(thresholds) <= 0):
+        raise ValueError(f"thresholds must be strictly increasing, got {thresholds.tolist()}")
+    return thresholds, np.asarray(labels, dtype=object)
+
+
+def classify_by_thresholds(values, thresholds, labels):
+    """Vectorized class assignment: the first label whose threshold is >= the value."""
+    thresholds, labels = _check_scheme(thresholds, labels)
+    return labels[np.searchsorted(thresholds, np.asarray(values, dtype=float), side='left')]
+
+
+def metric_totals(data, by, metric, cogs_percentage=DEFAULT_COGS_PERCENTAGE_OF_REVENUE):
+    """Totals of the ranking metric grouped by `by`, as a DataFrame with the `by` columns and 'Value'."""
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {list(METRICS)}, got {metric!r}")
+    if metric == 'margin':
+        return _margin_totals(data, by, cogs_percentage)
+    source = METRICS[metric][1]
+    totals = aggregate(data, by, [source])
+    return totals.assign(Value=totals.pop(source).astype('float64'))
+
+
+def _margin_totals(data, by, cogs_percentage):
+    # Revenue less the unit cost of every unit sold. The cost does not shrink with the discount a
+    # sale was given, so discounts narrow the margin and products rank differently than by revenue.
+    # Price is added to the grouping to cost each group, then summed out again.
+    keys = list(by) if 'Price' in by else list(by) + ['Price']
+    totals = aggregate(data, keys, ['TotalPrice', 'Quantity'])
+    unit_cost = as_float64(totals['Price']) * cogs_percentage
+    totals = totals[keys].assign(Value=totals['TotalPrice'] - totals['Quantity'] * unit_cost)
+    if 'Price' in by:
+        return totals
+    return totals.groupby(list(by), observed=True)['Value'].sum().reset_index()
+
+
+def abc_classify(product_totals, thresholds=CLASS_SCHEMES['abc'][0], labels=CLASS_SCHEMES['abc'][1],
+                 metric='revenue'):
+    """
+    Rank one row per product by its 'Total<Metric>' column (e.g. 'TotalRevenue') and add the
+    'Cumulative<Metric>', 'Cumulative<Metric>Percentage' and 'ABC_Category' columns.
+    """
+    name = METRICS[metric][0]
+    total_column = f'Total{name}'
+    ranked = product_totals.sort_values(total_column, ascending=False, kind='stable').reset_index(drop=True)
+    cumulative = ranked[total_column].cumsum()
+    ranked[f'Cumulative{name}'] = cumulative
+    ranked[f'Cumulative{name}Percentage'] = (cumulative / ranked[total_column].sum()) * 100
+    ranked['ABC_Category'] = classify_by_thresholds(ranked[f'Cumulative{name}Percentage'], thresholds, labels)
+    return ranked
+
+
+def product_abc(final_preprocessed_df, metric='revenue', thresholds=CLASS_SCHEMES['abc'][0],
+                labels=CLASS_SCHEMES['abc'][1], cogs_percentage=DEFAULT_COGS_PERCENTAGE_OF_REVENUE):
+    """ABC classes per product from the preprocessed sales (rows or a SalesCube)."""
+    totals = metric_totals(final_preprocessed_df, ['ProductID', 'ProductName'], metric, cogs_percentage)
+    totals = totals.rename(columns={'Value': f'Total{METRICS[metric][0]}'})
+    return abc_classify(totals, thresholds, labels, metric)
+
+
+def _period_codes(sales_dates, freq):
+    """Integer day ('D') or Monday-aligned week ('W') number of each date."""
+    days = sales_dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    if freq == 'D':
+        return days
+    if freq == 'W':
+        return (days + _WEEK_START_OFFSET) // 7
+    raise ValueError(f"freq must be 'D' or 'W', got {freq!r}")
+
+
+def _period_start(codes, freq):
+    days = codes if freq == 'D' else codes * 7 - _WEEK_START_OFFSET
+    return days.astype('datetime64[D]')
+
+
+def product_period_matrix(final_preprocessed_df, metric='quantity', freq='D',
+                          cogs_percentage=DEFAULT_COGS_PERCENTAGE_OF_REVENUE):
+    """
+    Dense products x periods matrix of summed `metric`, with every period between the first
+    and last sale present (zero where a product had no sales). Built from per-product daily
+    totals. Returns (product_ids, period_codes, matrix).
+    """
+    daily = metric_totals(final_preprocessed_df, ['ProductID', 'SalesDay'], metric, cogs_percentage)
+    codes = _period_codes(daily['SalesDay'], freq)
+    product_ids, product_positions = np.unique(daily['ProductID'].to_numpy(), return_inverse=True)
+    first_period = codes.min()
+    period_codes = np.arange(first_period, codes.max() + 1)
+    matrix = np.zeros((len(product_ids), len(period_codes)))
+    np.add.at(matrix, (product_positions, codes - first_period), daily['Value'].to_numpy())
+    return product_ids, period_codes, matrix
+
+
+def xyz_classify(final_preprocessed_df, thresholds=XYZ_THRESHOLDS, labels=XYZ_LABELS, freq='D'):
+    """
+    XYZ classes by demand variability: the coefficient of variation of each product's
+    per-period Quantity (periods with no sales count as zero demand).
+    """
+    product_ids, _, demand = product_period_matrix(final_preprocessed_df, 'quantity', freq)
+    mean = demand.mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variation = np.where(mean > 0, demand.std(axis=1) / mean, np.inf)
+    return pd.DataFrame({
+        'ProductID': product_ids,
+        'MeanDemand': mean,
+        'DemandCV': variation,
+        'XYZ_Category': classify_by_thresholds(variation, thresholds, labels),
+    })
+
+
+def rolling_abc(final_preprocessed_df, window=4, freq='W', metric='revenue',
+                thresholds=CLASS_SCHEMES['abc'][0], labels=CLASS_SCHEMES['abc'][1],
+                cogs_percentage=DEFAULT_COGS_PERCENTAGE_OF_REVENUE):
+    """
+    ABC classes over trailing windows of `window` periods, for every product and every period,
+    computed from one products x periods matrix: a cumulative-sum difference gives all window
+    totals, and one argsort per axis ranks every window at once.
+
+    Returns a long DataFrame with ProductID, WindowEnd (start date of the last period in the
+    window), Window<Metric>, Cumulative<Metric>Percentage and ABC_Category. Products with no
+    sales in a window are classified in the last class.
+    """
+    name = METRICS[metric][0]
+    product_ids, period_codes, matrix = product_period_matrix(final_preprocessed_df, metric, freq, cogs_percentage)
+
+    def trailing_sum(periods):
+        running = np.cumsum(periods, axis=1)
+        totals = running.copy()
+        totals[:, window:] -= running[:, :-window]
+        return totals
+
+    window_totals = trailing_sum(matrix)
+    has_sales = trailing_sum(matrix != 0) > 0
+
+    order = np.argsort(-window_totals, axis=0, kind='stable')
+    ranked = np.take_along_axis(window_totals, order, axis=0)
+    column_totals = ranked.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ranked_percentage = np.where(column_totals > 0, np.cumsum(ranked, axis=0) / column_totals * 100, 100.0)
+    percentage = np.empty_like(ranked_percentage)
+    np.put_along_axis(percentage, order, ranked_percentage, axis=0)
+    percentage[~has_sales] = np.inf  # No sales in the window -> last class.
+
+    return pd.DataFrame({
+        'ProductID': np.repeat(product_ids, len(period_codes)),
+        'WindowEnd': np.tile(_period_start(period_codes, freq), len(product_ids)),
+        f'Window{name}': window_totals.ravel(),
+        f'Cumulative{name}Percentage': np.where(np.isinf(percentage), 100.0, percentage).ravel(),
+        'ABC_Category': classify_by_thresholds(percentage.ravel(), thresholds, labels),
+    })
@@ -0,0 +1,192 @@
+"""
+Batch forecasting of every product and category series.
+
+All daily series are built with one grouped pivot of the sales cube (one column per
+product or category, one row per day, zero for days without sales). With a NumPy backend (see
+forecasters.py) each level's whole matrix is fitted at once in-process; with Prophet each
+series is fitted in a worker process. A series that fails is recorded in the report instead of
+aborting the batch. Series are looked up in the forecast cache first (see forecast_cache.py).
+All forecasts are written to a single long-format columnar file.
+"""
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from forecast_cache import lookup_forecasts, store_forecasts
+from forecasters import DEFAULT_FORECAST_BACKEND, forecast_frame, get_forecaster
+from sales_cube import aggregate
+
+FORECAST_LEVELS = {
+    'product': ('ProductID', 'ProductName'),
+    'category': ('CategoryID', 'CategoryName'),
+}
+
+DEFAULT_FORECAST_PERIODS = 7
+
+BATCH_FORECAST_FILE_PATH = 'batch_forecasts_feb_2024.parquet'
+BATCH_REPORT_FILE_PATH = 'batch_forecast_report_feb_2024.csv'
+
+
+def daily_series(final_preprocessed_df, level):
+    """
+    One grouped pivot (of the rows or a SalesCube): a days x series DataFrame of summed
+    TotalPrice, covering every day from the first to the last sale, plus a Series mapping each
+    series ID to its name.
+    """
+    id_column, name_column = FORECAST_LEVELS[level]
+    totals = aggregate(final_preprocessed_df, ['SalesDay', id_column, name_column], ['TotalPrice'])
+    matrix = totals.pivot(index='SalesDay', columns=id_column, values='TotalPrice').fillna(0.0)
+    matrix = matrix.reindex(pd.date_range(matrix.index.min(), matrix.index.max(), freq='D', name='ds'), fill_value=0.0)
+    matrix.columns.name = id_column
+    names = totals.drop_duplicates(id_column).set_index(id_column)[name_column].astype(object)
+    return matrix, names
+
+
+def _fit_task(level, series_id, ds, y, periods, backend, init=None):
+    """Worker entry point (one series): never raises, so one bad series cannot abort the batch."""
+    start = time.perf_counter()
+    try:
+        yhat, lower, upper, states = get_forecaster(backend).fit_predict_state(y[np.newaxis], periods, ds=ds,
+                                                                             init=[init])
+        return level, series_id, (yhat[0], lower[0], upper[0]), states[0], None, time.perf_counter() - start
+    except Exception:
+        return level, series_id, None, None, traceback.format_exc(limit=3), time.perf_counter() - start
+
+
+def _fit_matrix(level, series_ids, ds, Y, periods, backend, init):
+    """
+    Fit a level's series (rows of Y) with one vectorized call. Yields the same tuples as
+    _fit_task; the fit time is split evenly across the series. If the vectorized call raises,
+    every series is refitted on its own, so only the series that fail alone are reported failed.
+    """
+    start = time.perf_counter()
+    try:
+        yhat, lower, upper, states = get_forecaster(backend).fit_predict_state(Y, periods, ds=ds, init=init)
+    except Exception:
+        print(f"  Fitting the {level} matrix failed; fitting its {len(series_ids)} series one by one.")
+        for position, series_id in enumerate(series_ids):
+            yield _fit_task(level, series_id, ds, Y[position], periods, backend, init[position])
+        return
+    seconds = (time.perf_counter() - start) / max(len(series_ids), 1)
+    for position, series_id in enumerate(series_ids):
+        yield level, series_id, (yhat[position], lower[position], upper[position]), states[position], None, seconds
+
+
+def forecast_batch(final_preprocessed_df, levels=('product', 'category'), workers=None,
+                   periods=DEFAULT_FORECAST_PERIODS, backend=DEFAULT_FORECAST_BACKEND, use_cache=True):
+    """
+    Fit every series of the requested levels with `backend`: Prophet across a pool of `workers`
+    processes (default: all CPUs), the NumPy backends one matrix per level. With `use_cache`,
+    unchanged series come from the forecast cache and series that gained days are refitted warm
+    (see forecast_cache.py). Returns (forecasts, report): forecasts is one long DataFrame with
+    Level, SeriesID, SeriesName, ds, yhat, yhat_lower and yhat_upper; report has one row per
+    series with its source (cached, warm or cold), fit time and error (if any).
+    """
+    forecaster = get_forecaster(backend)  # Also fails fast on an unknown backend.
+    forecasts, report = [], []
+    pending = {}  # level -> (series_ids, ds, Y, init, sources, keys) still to be fitted
+
+    for level in levels:
+        matrix, names = daily_series(final_preprocessed_df, level)
+        series_ids, ds, Y = list(matrix.columns), matrix.index, matrix.to_numpy().T
+        keys, hits, warm_states = lookup_forecasts(forecaster, Y, periods, ds) if use_cache else (None, {}, {})
+        for row, (yhat, lower, upper, _) in hits.items():
+            series_name = names.get(series_ids[row])
+            report.append({'Level': level, 'SeriesID': series_ids[row], 'SeriesName': series_name,
+                           'Source': 'cached', 'FitSeconds': 0.0, 'Error': None})
+            forecasts.append(forecast_frame(ds, yhat, lower, upper, periods).assign(
+                Level=level, SeriesID=series_ids[row], SeriesName=series_name))
+        misses = [row for row in range(len(series_ids)) if row not in hits]
+        pending[level] = ([series_ids[row] for row in misses], ds, Y[misses], names,
+                          [warm_states.get(row) for row in misses],
+                          [keys[row] for row in misses] if use_cache else None)
+    if report:
+        print(f"  {len(report)} series served from the forecast cache.")
+
+    fitted = {level: [] for level in pending}
+    positions = {level: {series_id: position for position, series_id in enumerate(series_ids)}
+                 for level, (series_ids, *_) in pending.items()}
+
+    def collect(results, total):
+        for done, (level, series_id, arrays, state, error, seconds) in enumerate(results, start=1):
+            _, ds, Y, names, init, _ = pending[level]
+            position = positions[level][series_id]
+            series_name = names.get(series_id)
+            warm = forecaster.warm_startable(init[position], Y.shape[1])
+            report.append({'Level': level, 'SeriesID': series_id, 'SeriesName': series_name,
+                           'Source': 'warm' if warm else 'cold',
+                           'FitSeconds': seconds, 'Error': error})
+            if arrays is not None:
+                forecasts.append(forecast_frame(ds, *arrays, periods).assign(
+                    Level=level, SeriesID=series_id, SeriesName=series_name))
+                fitted[level].append((position, arrays, state))
+            if done % 50 == 0 or done == total:
+                print(f"  {done}/{total} series fitted.")
+
+    if backend == 'prophet':
+        tasks = [(level, series_id, ds.to_numpy(), Y[position], periods, backend, init[position])
+                 for level, (series_ids, ds, Y, _, init, _) in pending.items()
+                 for position, series_id in enumerate(series_ids)]
+        if tasks:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+                futures = [pool.submit(_fit_task, *task) for task in tasks]
+                collect((future.result() for future in as_completed(futures)), len(futures))
+    else:
+        for level, (series_ids, ds, Y, _, init, _) in pending.items():
+            if series_ids:
+                collect(_fit_matrix(level, series_ids, ds, Y, periods, backend, init), len(series_ids))
+
+    if use_cache:
+        for level, results in fitted.items():
+            if results:
+                keys = pending[level][5]
+                fitted_positions, arrays, states = zip(*results)
+                yhat, lower, upper = (np.stack(part) for part in zip(*arrays))
+                store_forecasts([keys[position] for position in fitted_positions], yhat, lower, upper, list(states))
+
+    columns = ['Level', 'SeriesID', 'SeriesName', 'ds', 'yhat', 'yhat_lower', 'yhat_upper']
+    forecasts = pd.concat(forecasts, ignore_index=True)[columns] if forecasts else pd.DataFrame(columns=columns)
+    report = pd.DataFrame(report).sort_values(['Level', 'SeriesID']).reset_index(drop=True)
+    return forecasts, report
+
+
+def write_forecasts(forecasts, output_filename=BATCH_FORECAST_FILE_PATH):
+    """Write all forecasts to one Parquet file (CSV if pyarrow is unavailable). Returns the path written."""
+    try:
+        forecasts.to_parquet(output_filename, index=False)
+    except ImportError:
+        output_filename = os.path.splitext(output_filename)[0] + '.csv'
+        print("Note: pyarrow is not installed; writing forecasts as CSV instead of Parquet.")
+        forecasts.to_csv(output_filename, index=False)
+    return output_filename
+
+
+def run_batch_forecast(final_preprocessed_df, levels=('product', 'category'), workers=None,
+                       periods=DEFAULT_FORECAST_PERIODS, output_filename=BATCH_FORECAST_FILE_PATH,
+                       report_filename=BATCH_REPORT_FILE_PATH, backend=DEFAULT_FORECAST_BACKEND, use_cache=True):
+    print(f"--- Batch Time Series Forecasting ({backend}) ---")
+    start = time.perf_counter()
+    forecasts, report = forecast_batch(final_preprocessed_df, levels, workers, periods, backend, use_cache)
+    elapsed = time.perf_counter() - start
+
+    failed = report[report['Error'].notna()]
+    pool_note = f"{workers or os.cpu_count()} workers, " if backend == 'prophet' else ""
+    print(f"\nForecast {len(report) - len(failed)} of {len(report)} series in {elapsed:.1f}s "
+          f"({pool_note}{report['FitSeconds'].sum():.1f}s total fit time).")
+    sources = report['Source'].value_counts()
+    print("Series by source: " + ", ".join(f"{source} {sources.get(source, 0)}" for source in ('cached', 'warm', 'cold')))
+    print("\nFit time per series (seconds) by level:")
+    print(report.groupby('Level')['FitSeconds'].describe()[['count', 'mean', 'min', 'max']])
+    if not failed.empty:
+        print(f"\n{len(failed)} series failed (see '{report_filename}'):")
+        for _, row in failed.head(10).iterrows():
+            print(f"  {row['Level']} {row['SeriesID']} ({row['SeriesName']}): {row['Error'].strip().splitlines()[-1]}")
+
+    output_filename = write_forecasts(forecasts, output_filename)
+    report.to_csv(report_filename, index=False)
+    print(f"\nForecasts saved to '{output_filename}' and per-series report to '{report_filename}'.")
+    return forecasts, report
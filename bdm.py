@@ -0,0 +1,509 @@
+"""
+Command-line entry point for the BDM analysis pipeline.
+
+    python -m bdm run --month 2024-02 --stages abc,revenue,trend,forecast,turnover
+    python -m bdm run --from 2024-01-01 --to 2024-12-31 --partition-dir partitions
+    python -m bdm run --month 2024-02 --chart-dir charts --chart-formats png,svg
+    python -m bdm movers --partition-dir partitions --from 2024-01-01 --to 2024-03-31 -k 20
+    python -m bdm scenarios scenarios.json --month 2024-02 --output scenario_results.csv
+    python -m bdm serve --month 2024-02 --port 8765
+
+Preprocessing (column_selection.py) runs once, and the month's pre-aggregated sales cube
+(sales_cube.py) is shared by every requested stage. Stages only read it, so they run concurrently
+in a thread pool; each stage's printed output is collected and shown in stage order,
+followed by a per-stage wall-time summary.
+"""
+import argparse
+import calendar
+import importlib
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from forecasters import DEFAULT_FORECAST_BACKEND, FORECASTERS
+from instrumentation import add_profile_argument, enable_from_args, step
+from preprocess_engines import DEFAULT_ENGINE, ENGINES
+from query_service import DEFAULT_CACHE_SIZE, DEFAULT_HOST, DEFAULT_PORT
+from sales_io import DEFAULT_MEMORY_BUDGET_MB
+from top_movers import MOVER_METHODS, MOVER_METRICS
+
+# --- Stage Registry ---
+# Stage name -> (module, function). Modules are imported only when their stage is requested;
+# Prophet itself is imported only when the forecast stage uses the 'prophet' backend.
+STAGES = {
+    'abc': ('ABC_analysis', 'run_abc_analysis'),
+    'revenue': ('revenue', 'run_financial_overview'),
+    'trend': ('sales_trend_analysis', 'run_sales_trend_analysis'),
+    'forecast': ('time_series', 'run_forecast'),
+    'turnover': ('inventory_turnover_ratio_analysis', 'run_inventory_turnover_analysis'),
+}
+PLOTTING_STAGES = {'trend', 'forecast', 'turnover'}
+# Stages that can add their figures to a charts.ChartBatch (--chart-dir).
+CHART_STAGES = PLOTTING_STAGES | {'abc'}
+
+
+class _ThreadLocalStdout(io.TextIOBase):
+    """Routes print() from each stage thread into that stage's own buffer."""
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def capture(self, buffer):
+        """Route this thread's output to `buffer` (None: the default stream). Returns the previous buffer."""
+        previous = getattr(self._local, 'buffer', None)
+        self._local.buffer = buffer
+        return previous
+
+    def _target(self):
+        buffer = getattr(self._local, 'buffer', None)
+        return self._default if buffer is None else buffer
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+
+def parse_month(value):
+    """Parse 'YYYY-MM' into (year, month)."""
+    try:
+        period = pd.Period(value, freq='M')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a month as YYYY-MM, got {value!r}")
+    return period.year, period.month
+
+
+def parse_stages(value):
+    stages = [stage.strip() for stage in value.split(',') if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown stage(s) {unknown}; choose from {list(STAGES)}")
+    return stages
+
+
+def load_month(year, month, sales_file=None, partition_dir=None, use_cache=True, memory_report=False, as_cube=False,
+               engine=DEFAULT_ENGINE, ingest_workers=None, memory_limit_mb=None):
+    """
+    Preprocess one month once, from a partition directory or a trimmed sales file. With
+    `as_cube`, return the month's SalesCube (see sales_cube.py) instead of the row-level frame.
+    `engine` builds a cache miss with pandas or a lazy Polars/DuckDB plan (see preprocess_engines.py);
+    `ingest_workers` parses the CSVs of a pandas build in a process pool (see parallel_ingest.py);
+    a duckdb build spills to disk past `memory_limit_mb`.
+    """
+    from column_selection import TRIMMED_SALES_FILE_PATH, load_final_preprocessed_df, load_sales_cube
+    from sales_cube import SalesCube
+
+    if partition_dir:
+        from sales_io import partition_paths
+        sales_file_paths = partition_paths(partition_dir, year, month)
+    else:
+        sales_file_paths = sales_file or TRIMMED_SALES_FILE_PATH
+
+    if as_cube:
+        if memory_report:
+            cube = SalesCube.from_rows(load_final_preprocessed_df(sales_file_paths, use_cache=False, memory_report=True,
+                                                                  ingest_workers=ingest_workers))
+        else:
+            cube = load_sales_cube(sales_file_paths, use_cache=use_cache, engine=engine, ingest_workers=ingest_workers,
+                                   memory_limit_mb=memory_limit_mb)
+        first_day = pd.Timestamp(year, month, 1)
+        return cube.filter_days(first_day, first_day + pd.offsets.MonthEnd(0))
+
+    final_df = load_final_preprocessed_df(sales_file_paths, use_cache=use_cache, memory_report=memory_report,
+                                          engine=engine, ingest_workers=ingest_workers, memory_limit_mb=memory_limit_mb)
+    in_month = (final_df['SalesDate'].dt.year == year) & (final_df['SalesDate'].dt.month == month)
+    if not in_month.all():
+        final_df = final_df[in_month].reset_index(drop=True)
+    return final_df
+
+
+def load_period(args, memory_report=False):
+    """
+    The SalesCube to analyze, with a label and a file-name suffix for it: the dates
+    --from/--to if either is given (open ends allowed), otherwise --month.
+    """
+    if args.date_from is None and args.date_to is None:
+        year, month = args.month
+        if args.sales_store:
+            from column_selection import load_sales_cube_store
+
+            first_day = pd.Timestamp(year, month, 1)
+            sales_cube = load_sales_cube_store(args.sales_store, first_day, first_day + pd.offsets.MonthEnd(0))
+        else:
+            sales_cube = load_month(year, month, args.sales_file, args.partition_dir, use_cache=not args.no_cache,
+                                    memory_report=memory_report, as_cube=True, engine=args.engine,
+                                    ingest_workers=args.ingest_workers, memory_limit_mb=args.memory_budget_mb)
+        return sales_cube, f"{calendar.month_name[month]} {year}", f"{calendar.month_abbr[month].lower()}_{year}"
+
+    from column_selection import TRIMMED_SALES_FILE_PATH, load_sales_cube_range, load_sales_cube_store
+
+    if memory_report:
+        print("Note: --memory-report applies to single months; ignoring it for a date range.")
+    if args.sales_store:
+        sales_cube = load_sales_cube_store(args.sales_store, args.date_from, args.date_to)
+    else:
+        sales_cube = load_sales_cube_range(args.date_from, args.date_to, args.partition_dir,
+                                           args.sales_file or TRIMMED_SALES_FILE_PATH, use_cache=not args.no_cache,
+                                           engine=args.engine, ingest_workers=args.ingest_workers,
+                                           memory_limit_mb=args.memory_budget_mb)
+    days = sales_cube.cells['SalesDay']
+    first_day = args.date_from if args.date_from is not None or days.empty else days.min()
+    last_day = args.date_to if args.date_to is not None or days.empty else days.max()
+    return sales_cube, f"{first_day:%Y-%m-%d} to {last_day:%Y-%m-%d}", f"{first_day:%Y%m%d}_{last_day:%Y%m%d}"
+
+
+def run_stage(stage, sales_data, stage_kwargs):
+    module_name, function_name = STAGES[stage]
+    stage_function = getattr(importlib.import_module(module_name), function_name)
+    return stage_function(sales_data, **stage_kwargs)
+
+
+def run_pipeline(sales_data, stages, workers=None, period_label=None, period_suffix=None, forecast_backend=None,
+                 use_cache=True, inventory_file=None, charts=None):
+    """
+    Run `stages` against one shared SalesCube (or preprocessed DataFrame). `period_label`
+    (e.g. 'February 2024') is used in the stages' output; `period_suffix` (e.g. 'feb_2024')
+    names the ABC and inventory turnover results files. `inventory_file` holds the inventory
+    snapshots for the turnover stage. With `charts` (a charts.ChartBatch), the stages add their
+    figures to it for rendering after the run. Returns {stage: (result, error, wall_seconds, output)} in stage order.
+    """
+    stage_kwargs = {stage: {} for stage in stages}
+    for stage in PLOTTING_STAGES.intersection(stages):
+        stage_kwargs[stage]['show_plots'] = False
+    if charts is not None:
+        for stage in CHART_STAGES.intersection(stages):
+            stage_kwargs[stage]['charts'] = charts
+    if period_label is not None:
+        for stage in stages:
+            stage_kwargs[stage]['period_label'] = period_label
+    if 'abc' in stages and period_suffix is not None:
+        stage_kwargs['abc']['output_filename'] = f"abc_analysis_results_{period_suffix}.csv"
+    if 'forecast' in stages and forecast_backend:
+        stage_kwargs['forecast']['backend'] = forecast_backend
+    if 'forecast' in stages and not use_cache:
+        stage_kwargs['forecast']['use_cache'] = False
+    if 'turnover' in stages and inventory_file:
+        stage_kwargs['turnover']['inventory'] = inventory_file
+        if period_suffix is not None:
+            stage_kwargs['turnover']['turnover_filename'] = f"inventory_turnover_{period_suffix}.csv"
+
+    # Import stage modules up front, on the main thread, so that imports never race.
+    # A stage whose dependencies are missing fails on its own without stopping the others.
+    import_errors = {}
+    for stage in stages:
+        try:
+            importlib.import_module(STAGES[stage][0])
+        except ImportError as e:
+            import_errors[stage] = e
+
+    stdout = _ThreadLocalStdout(sys.stdout)
+
+    def timed(stage):
+        if stage in import_errors:
+            return None, import_errors[stage], 0.0, ''
+        buffer = io.StringIO()
+        stdout.capture(buffer)
+        start = time.perf_counter()
+        result, error = None, None
+        try:
+            result = run_stage(stage, sales_data, stage_kwargs[stage])
+        except Exception as e:
+            error = e
+        return result, error, time.perf_counter() - start, buffer.getvalue()
+
+    original_stdout, sys.stdout = sys.stdout, stdout
+    try:
+        with ThreadPoolExecutor(max_workers=workers or len(stages)) as pool:
+            futures = {stage: pool.submit(timed, stage) for stage in stages}
+            return {stage: futures[stage].result() for stage in stages}
+    finally:
+        sys.stdout = original_stdout
+
+
+def print_stage_report(results, preprocess_seconds, total_seconds, chart_seconds=None):
+    print("\n--- Pipeline Timing ---")
+    print(f"{'stage':<12}{'status':<10}{'wall (s)':>10}")
+    print(f"{'preprocess':<12}{'ok':<10}{preprocess_seconds:>10.3f}")
+    for stage, (_, error, seconds, _) in results.items():
+        print(f"{stage:<12}{'FAILED' if error else 'ok':<10}{seconds:>10.3f}")
+    if chart_seconds is not None:
+        print(f"{'charts':<12}{'ok':<10}{chart_seconds:>10.3f}")
+    print(f"{'total':<12}{'':<10}{total_seconds:>10.3f}")
+
+
+def command_run(args):
+    start = time.perf_counter()
+    sales_cube, period_label, period_suffix = load_period(args, memory_report=args.memory_report)
+    preprocess_seconds = time.perf_counter() - start
+    print(f"\nPreprocessed {len(sales_cube.cells)} product x day cells for {period_label} "
+          f"in {preprocess_seconds:.2f}s; running stages: {', '.join(args.stages)}")
+    if sales_cube.empty:
+        print("No preprocessed rows for the requested period. Nothing to analyze.")
+        return 1
+
+    charts = None
+    if args.chart_dir:
+        from charts import ChartBatch
+        charts = ChartBatch(args.chart_dir, args.chart_formats, suffix=period_suffix)
+
+    results = run_pipeline(sales_cube, args.stages, workers=args.workers, period_label=period_label,
+                           period_suffix=period_suffix, forecast_backend=args.forecast_backend,
+                           use_cache=not args.no_cache, inventory_file=args.inventory_file, charts=charts)
+    for stage, (_, error, seconds, output) in results.items():
+        print(f"\n===== Stage: {stage} ({seconds:.2f}s) =====")
+        print(output, end='')
+        if error:
+            print(f"Stage '{stage}' failed: {error!r}")
+
+    chart_seconds = None
+    if charts is not None:
+        with step('render_charts', charts=len(charts.specs)):
+            paths, chart_seconds = charts.render(workers=args.chart_workers)
+        print(f"\nWrote {len(charts.specs)} charts ({len(paths)} files) to '{args.chart_dir}' in {chart_seconds:.2f}s.")
+
+    print_stage_report(results, preprocess_seconds, time.perf_counter() - start, chart_seconds)
+    return 1 if any(error for _, error, _, _ in results.values()) else 0
+
+
+def command_forecast_batch(args):
+    from batch_forecast import run_batch_forecast
+
+    sales_cube, _, suffix = load_period(args)
+    forecasts, report = run_batch_forecast(
+        sales_cube, levels=args.levels, workers=args.workers, periods=args.periods,
+        output_filename=args.output or f"batch_forecasts_{suffix}.parquet",
+        report_filename=f"batch_forecast_report_{suffix}.csv", backend=args.backend, use_cache=not args.no_cache,
+    )
+    return 1 if report['Error'].notna().all() else 0
+
+
+def stream_source(args):
+    """
+    The sales files to stream for `movers` and `scenarios`, with the period: (sales_file_paths,
+    start, end, target_year, period_label). `target_year` is set for the raw sales.csv, whose
+    dates still have to be shifted.
+    """
+    from column_selection import TRIMMED_SALES_FILE_PATH
+
+    if args.date_from is None and args.date_to is None:
+        year, month = args.month
+        start = pd.Timestamp(year, month, 1)
+        end = start + pd.offsets.MonthEnd(0)
+        period_label = f"{calendar.month_name[month]} {year}"
+    else:
+        start, end = args.date_from, args.date_to
+        period_label = f"{'start' if start is None else f'{start:%Y-%m-%d}'} to {'end' if end is None else f'{end:%Y-%m-%d}'}"
+
+    target_year = None
+    if args.raw_file:
+        # The raw file is dated in the source year; shift it to the analyzed period's year.
+        sales_file_paths, target_year = [args.raw_file], (start if start is not None else end).year
+    elif args.partition_dir:
+        from sales_io import partition_months, partition_paths
+        sales_file_paths = [path for year, month in partition_months(args.partition_dir, start, end)
+                            for path in partition_paths(args.partition_dir, year, month)]
+    else:
+        sales_file_paths = [args.sales_file or TRIMMED_SALES_FILE_PATH]
+    return sales_file_paths, start, end, target_year, period_label
+
+
+def command_movers(args):
+    from column_selection import CATEGORIES_FILE_PATH, PRODUCTS_FILE_PATH
+    from top_movers import print_movers, stream_movers
+
+    sales_file_paths, start, end, target_year, period_label = stream_source(args)
+    print(f"--- Streaming fast/slow movers for {period_label} ({args.method}, by {args.metric}) ---")
+    try:
+        top, bottom, stats = stream_movers(sales_file_paths, PRODUCTS_FILE_PATH, CATEGORIES_FILE_PATH, k=args.k,
+                                           metric=args.metric, start=start, end=end, target_year=target_year,
+                                           method=args.method, capacity=args.capacity,
+                                           memory_budget_mb=args.memory_budget_mb)
+    except FileNotFoundError as e:
+        print(f"Error loading file: {e}. Please ensure all necessary CSV files are in the correct location.")
+        return 1
+    print_movers(top, bottom, stats, args.metric, period_label)
+    return 0
+
+
+def command_scenarios(args):
+    from column_selection import CATEGORIES_FILE_PATH, PRODUCTS_FILE_PATH
+    from scenarios import run_scenarios
+
+    sales_file_paths, start, end, target_year, period_label = stream_source(args)
+    try:
+        run_scenarios(args.scenario_file, sales_file_paths, PRODUCTS_FILE_PATH, CATEGORIES_FILE_PATH, start=start,
+                      end=end, target_year=target_year, memory_budget_mb=args.memory_budget_mb,
+                      output_filename=args.output, period_label=period_label)
+    except FileNotFoundError as e:
+        print(f"Error loading file: {e}. Please ensure all necessary CSV files are in the correct location.")
+        return 1
+    except ValueError as e:
+        print(f"Invalid scenario file: {e}")
+        return 1
+    return 0
+
+
+def command_serve(args):
+    from query_service import run_service
+
+    def loader():
+        sales_cube, period_label, _ = load_period(args)
+        return sales_cube, period_label
+
+    try:
+        run_service(loader, host=args.host, port=args.port, socket_path=args.socket, cache_size=args.cache_size)
+    except FileNotFoundError as e:
+        print(f"Error loading file: {e}. Please ensure all necessary CSV files are in the correct location.")
+        return 1
+    return 0
+
+
+def parse_levels(value):
+    from batch_forecast import FORECAST_LEVELS
+
+    levels = [level.strip() for level in value.split(',') if level.strip()]
+    unknown = [level for level in levels if level not in FORECAST_LEVELS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown level(s) {unknown}; choose from {list(FORECAST_LEVELS)}")
+    return levels
+
+
+def parse_chart_formats(value):
+    from charts import CHART_FORMATS
+
+    formats = [fmt.strip().lower() for fmt in value.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in CHART_FORMATS]
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(f"unknown chart format(s) {unknown}; choose from {list(CHART_FORMATS)}")
+    return formats
+
+
+def parse_date(value):
+    try:
+        return pd.Timestamp(value).normalize()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a date as YYYY-MM-DD, got {value!r}")
+
+
+def add_month_arguments(parser):
+    parser.add_argument('--month', type=parse_month, default=(2024, 2),
+                        help="Month to analyze as YYYY-MM (default: 2024-02).")
+    parser.add_argument('--from', dest='date_from', type=parse_date,
+                        help="Analyze a date range starting on this date (YYYY-MM-DD) instead of --month.")
+    parser.add_argument('--to', dest='date_to', type=parse_date,
+                        help="Last day of the date range (YYYY-MM-DD). With --partition-dir, only the "
+                             "overlapping month partitions are read.")
+    parser.add_argument('--sales-file', help="Trimmed sales CSV to preprocess (default: column_selection.py's path).")
+    parser.add_argument('--partition-dir', help="Load the month (or range) from partitions written by data_trimming.py --partition-dir.")
+    parser.add_argument('--sales-store',
+                        help="Slice the month (or range) from a memory-mapped sales store built with sales_store.py.")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore the preprocessed-data and forecast caches.")
+    parser.add_argument('--engine', choices=ENGINES, default=DEFAULT_ENGINE,
+                        help="Preprocessing engine for data not yet cached: eager pandas, or a lazy out-of-core "
+                             "Polars/DuckDB query plan (default: %(default)s).")
+    parser.add_argument('--ingest-workers', type=int,
+                        help="Parse the sales CSVs in a pool of this many processes (pandas engine; default: one "
+                             "pd.read_csv per file).")
+    parser.add_argument('--memory-budget-mb', type=int, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="Memory limit of the duckdb engine, which spills to disk past it (default: %(default)s MB).")
+    add_profile_argument(parser)
+
+
+def add_stream_arguments(parser):
+    """Period and sales file options of the commands that stream the sales CSVs (movers, scenarios)."""
+    parser.add_argument('--month', type=parse_month, default=(2024, 2), help="Month as YYYY-MM (default: 2024-02).")
+    parser.add_argument('--from', dest='date_from', type=parse_date, help="A date range starting on this date instead.")
+    parser.add_argument('--to', dest='date_to', type=parse_date, help="Last day of the date range.")
+    parser.add_argument('--sales-file', help="Trimmed sales CSV (default: column_selection.py's path).")
+    parser.add_argument('--partition-dir', help="Stream the overlapping month partitions written by data_trimming.py.")
+    parser.add_argument('--raw-file', help="Stream the raw sales.csv instead, shifting its dates to the period's year.")
+    parser.add_argument('--memory-budget-mb', type=int, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="Approximate memory per chunk read (default: %(default)s MB).")
+    add_profile_argument(parser)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='bdm', description="BDM sales analysis pipeline.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Preprocess one month (or date range) once and run the analysis stages on it.")
+    add_month_arguments(run_parser)
+    run_parser.add_argument('--stages', type=parse_stages, default=list(STAGES),
+                            help=f"Comma-separated stages to run (default: {','.join(STAGES)}).")
+    run_parser.add_argument('--workers', type=int, help="Maximum number of stages to run at once (default: all).")
+    run_parser.add_argument('--memory-report', action='store_true',
+                            help="Print per-column memory of the preprocessed frame before and after the compact schema, "
+                                 "and an estimate in pandas' default dtypes.")
+    run_parser.add_argument('--forecast-backend', choices=list(FORECASTERS), default=DEFAULT_FORECAST_BACKEND,
+                            help="Backend for the forecast stage (default: %(default)s).")
+    run_parser.add_argument('--inventory-file',
+                            help="Inventory snapshots (CSV or Parquet with ProductID, SnapshotDate, StockQuantity) "
+                                 "for the turnover stage.")
+    run_parser.add_argument('--chart-dir',
+                            help="Write every stage's charts to this directory with a non-interactive backend.")
+    run_parser.add_argument('--chart-formats', type=parse_chart_formats, default=['png'],
+                            help="Comma-separated image formats for --chart-dir: png, svg (default: png).")
+    run_parser.add_argument('--chart-workers', type=int,
+                            help="Processes drawing the charts in parallel (default: one per chart, up to all CPUs).")
+    run_parser.set_defaults(handler=command_run)
+
+    batch_parser = subparsers.add_parser('forecast-batch',
+                                         help="Forecast every product and category series.")
+    add_month_arguments(batch_parser)
+    batch_parser.add_argument('--levels', type=parse_levels, default=['product', 'category'],
+                              help="Comma-separated series levels: product, category (default: both).")
+    batch_parser.add_argument('--workers', type=int, help="Worker processes (default: all CPUs).")
+    batch_parser.add_argument('--periods', type=int, default=7, help="Days to forecast ahead (default: %(default)s).")
+    batch_parser.add_argument('--backend', choices=list(FORECASTERS), default=DEFAULT_FORECAST_BACKEND,
+                              help="Forecasting backend; NumPy backends fit each level as one matrix (default: %(default)s).")
+    batch_parser.add_argument('--output', help="Forecast output file (default: batch_forecasts_<period>.parquet).")
+    batch_parser.set_defaults(handler=command_forecast_batch)
+
+    movers_parser = subparsers.add_parser('movers', help="Rank the fastest and slowest products by streaming the sales CSVs.")
+    add_stream_arguments(movers_parser)
+    movers_parser.add_argument('-k', type=int, default=10, help="Products per list (default: %(default)s).")
+    movers_parser.add_argument('--metric', choices=MOVER_METRICS, default='revenue', help="Rank by (default: %(default)s).")
+    movers_parser.add_argument('--method', choices=MOVER_METHODS, default='exact',
+                               help="Exact per-product totals, or a bounded Space-Saving summary (top list only) "
+                                    "(default: %(default)s).")
+    movers_parser.add_argument('--capacity', type=int, help="Counters in the Space-Saving summary (default: 10 * k).")
+    movers_parser.set_defaults(handler=command_movers)
+
+    scenarios_parser = subparsers.add_parser('scenarios',
+                                             help="Evaluate many assortment and COGS what-if scenarios in one pass.")
+    scenarios_parser.add_argument('scenario_file', help="JSON list (or JSON lines) of scenarios, see scenarios.py.")
+    add_stream_arguments(scenarios_parser)
+    scenarios_parser.add_argument('--output', help="Also write the results to this CSV file.")
+    scenarios_parser.set_defaults(handler=command_scenarios)
+
+    serve_parser = subparsers.add_parser('serve', help="Keep one month (or date range) loaded and answer revenue, ABC "
+                                                       "and trend queries over HTTP, with cached results.")
+    add_month_arguments(serve_parser)
+    serve_parser.add_argument('--host', default=DEFAULT_HOST, help="Address to listen on (default: %(default)s).")
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on (default: %(default)s).")
+    serve_parser.add_argument('--socket', help="Listen on this Unix socket instead of a TCP port.")
+    serve_parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                              help="Query results kept in the LRU cache (default: %(default)s).")
+    serve_parser.set_defaults(handler=command_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    enable_from_args(args)
+    try:
+        return args.handler(args)
+    except (FileNotFoundError, ImportError) as e:
+        # Missing inputs or a missing optional engine; preprocessing has printed the details.
+        print(f"bdm {args.command} stopped: {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
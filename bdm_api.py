@@ -0,0 +1,137 @@
+"""
+Library API for the analyses: plain functions for notebooks, services and long-lived workers.
+
+    import bdm_api
+
+    sales = bdm_api.load('trimmed_sales_feb_2024.csv', 'products.csv', 'categories.csv', as_cube=True)
+    bdm_api.revenue_summary(sales)      # {'TotalRevenue': ..., 'TotalCOGS': ..., ...}
+    bdm_api.abc(sales, metric='quantity')
+    bdm_api.weekly_trend(sales)
+    bdm_api.forecast(sales, periods=14, backend='holt_winters')
+
+Importing this module only imports the standard library. It reads, writes and prints nothing.
+pandas and the analysis modules are imported on the first call. matplotlib and seaborn are never
+needed, since these functions draw no charts. Prophet, Polars and DuckDB load only when a call
+selects them.
+
+The functions return data instead of printing it. The scripts' progress output is discarded,
+and no results files are written; only the preprocessing and forecast caches are used, as in the
+scripts. They never exit: a missing input raises FileNotFoundError and a bad argument raises
+ValueError. Only the calling thread's output is discarded: while a call runs, sys.stdout is
+bdm's thread-local router, so other threads keep printing.
+
+`python check_import_time.py` (or `python -m pytest test_import_time.py`) checks the import cost
+of this module and the analysis modules.
+"""
+import contextlib
+import io
+import sys
+import threading
+
+# The bdm._ThreadLocalStdout that _quiet installed as sys.stdout (with the stream it replaced),
+# and the number of calls running; the last call to finish puts the original stream back.
+_router = None
+_replaced_stdout = None
+_calls = 0
+_router_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _quiet():
+    global _router, _replaced_stdout, _calls
+    from bdm import _ThreadLocalStdout
+
+    with _router_lock:
+        if _router is None and not isinstance(sys.stdout, _ThreadLocalStdout):
+            _replaced_stdout = sys.stdout
+            _router = sys.stdout = _ThreadLocalStdout(sys.stdout)
+        stdout = sys.stdout if isinstance(sys.stdout, _ThreadLocalStdout) else _router
+        _calls += 1
+    previous = stdout.capture(io.StringIO())
+    try:
+        yield
+    finally:
+        stdout.capture(previous)
+        with _router_lock:
+            _calls -= 1
+            if _calls == 0 and _router is not None:
+                if sys.stdout is _router:
+                    sys.stdout = _replaced_stdout
+                _router, _replaced_stdout = None, None
+
+
+def load(sales_file_paths=None, products_file_path=None, categories_file_path=None, use_cache=True, engine='pandas',
+         as_cube=False):
+    """
+    The preprocessed sales of trimmed sales file(s) (default: column_selection.py's paths), as
+    column_selection.py builds them: the row-level frame, or with `as_cube` the product x day
+    SalesCube, which every analysis below accepts and which is much faster to query.
+    """
+    import column_selection
+
+    sales_file_paths = sales_file_paths or column_selection.TRIMMED_SALES_FILE_PATH
+    products_file_path = products_file_path or column_selection.PRODUCTS_FILE_PATH
+    categories_file_path = categories_file_path or column_selection.CATEGORIES_FILE_PATH
+    with _quiet():
+        if as_cube:
+            return column_selection.load_sales_cube(sales_file_paths, products_file_path, categories_file_path,
+                                                    use_cache=use_cache, engine=engine)
+        return column_selection.load_final_preprocessed_df(sales_file_paths, products_file_path, categories_file_path,
+                                                           use_cache=use_cache, engine=engine)
+
+
+def preprocess(trimmed_sales_df, products_df, categories_df, products_to_exclude=None, categories_to_include=None):
+    """
+    Preprocess sales already in memory (filter, attach product data, date features, compact
+    schema), optionally with other filter lists than column_selection.py's. Inputs are not modified.
+    """
+    from column_selection import build_final_preprocessed_df
+
+    with _quiet():
+        return build_final_preprocessed_df(trimmed_sales_df.copy(deep=False), products_df, categories_df,
+                                           exclude_products=products_to_exclude,
+                                           include_categories=categories_to_include)
+
+
+def abc(sales, metric='revenue', scheme='abc'):
+    """
+    ABC classes per product (`metric`: revenue, quantity or margin; `scheme`: a name in
+    abc_engine.CLASS_SCHEMES), ranked with cumulative percentages. No results file is written.
+    """
+    from abc_engine import CLASS_SCHEMES, product_abc
+
+    if scheme not in CLASS_SCHEMES:
+        raise ValueError(f"scheme must be one of {list(CLASS_SCHEMES)}, got {scheme!r}")
+    thresholds, labels = CLASS_SCHEMES[scheme]
+    return product_abc(sales, metric, thresholds, labels)
+
+
+def revenue_summary(sales):
+    """TotalRevenue, TotalCOGS, TotalProfit and ProfitMarginPercentage, as revenue.py computes them."""
+    from revenue import financial_figures
+
+    return financial_figures(sales)
+
+
+def weekly_trend(sales):
+    """Total sales per week of the period (RelativeWeek, TotalPrice), as sales_trend_analysis.py plots them."""
+    from sales_trend_analysis import weekly_sales_trend
+
+    return weekly_sales_trend(sales)
+
+
+def forecast(sales, periods=7, backend=None, use_cache=True):
+    """
+    Forecast total daily sales `periods` days ahead with a forecasters.py backend (default: the
+    scripts' default). Returns the frame of ds, yhat, yhat_lower and yhat_upper.
+    """
+    from forecasters import DEFAULT_FORECAST_BACKEND, FORECASTERS
+    from time_series import daily_sales_series, fit_forecast
+
+    backend = backend or DEFAULT_FORECAST_BACKEND
+    if backend not in FORECASTERS:
+        raise ValueError(f"backend must be one of {list(FORECASTERS)}, got {backend!r}")
+    daily_sales = daily_sales_series(sales)
+    with _quiet():
+        forecast_df, _ = fit_forecast(daily_sales.index, daily_sales, periods, backend, use_cache)
+    return forecast_df
@@ -0,0 +1,72 @@
+"""
+Benchmark: per-row date handling vs the vectorized date_features module.
+
+    python benchmark_date_features.py [trimmed_sales.csv] [--repeat N]
+
+Times the year shift (`apply(lambda x: x.replace(year=...))`) and the SaleYear/SaleMonth/
+SaleWeekday/SaleWeek extraction both ways on the full trimmed file, checks that the results
+match and prints the speedup.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from column_selection import TRIMMED_SALES_FILE_PATH
+from date_features import extract_date_features, shift_to_year
+
+TARGET_YEAR = 2024
+
+
+def shift_per_row(sales_dates):
+    return sales_dates.apply(lambda x: x.replace(year=TARGET_YEAR) if pd.notna(x) else x)
+
+
+def features_per_row(sales_dates):
+    return pd.DataFrame({
+        'SaleYear': sales_dates.dt.year,
+        'SaleMonth': sales_dates.dt.month_name(),
+        'SaleWeekday': sales_dates.dt.day_name(),
+        'SaleWeek': sales_dates.dt.isocalendar().week.astype(int),
+    })
+
+
+def best_time(function, argument, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-row vs vectorized date features.")
+    parser.add_argument('sales_file', nargs='?', default=TRIMMED_SALES_FILE_PATH)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    sales_dates = pd.to_datetime(pd.read_csv(args.sales_file, usecols=['SalesDate'])['SalesDate'])
+    print(f"Benchmarking on {len(sales_dates)} rows from '{args.sales_file}' (best of {args.repeat}).\n")
+
+    old_shift_seconds, old_shifted = best_time(shift_per_row, sales_dates, args.repeat)
+    new_shift_seconds, new_shifted = best_time(lambda d: shift_to_year(d, TARGET_YEAR), sales_dates, args.repeat)
+    assert (old_shifted.to_numpy('datetime64[ns]') == new_shifted.to_numpy('datetime64[ns]')).all()
+
+    old_features_seconds, old_features = best_time(features_per_row, sales_dates, args.repeat)
+    new_features_seconds, new_features = best_time(extract_date_features, sales_dates, args.repeat)
+    for column in old_features.columns:
+        assert (old_features[column].astype(str).to_numpy() == new_features[column].astype(str).to_numpy()).all(), column
+
+    print(f"{'step':<20}{'per-row (s)':>14}{'vectorized (s)':>16}{'speedup':>10}")
+    for step, old_seconds, new_seconds in [('year shift', old_shift_seconds, new_shift_seconds),
+                                           ('date features', old_features_seconds, new_features_seconds)]:
+        print(f"{step:<20}{old_seconds:>14.3f}{new_seconds:>16.3f}{old_seconds / new_seconds:>9.1f}x")
+
+    old_bytes = old_features.memory_usage(deep=True).sum()
+    new_bytes = new_features.memory_usage(deep=True).sum()
+    print(f"\nFeature columns memory: {old_bytes / 1e6:.1f} MB per-row strings vs {new_bytes / 1e6:.1f} MB categoricals.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: forecasting backends on fit time and holdout error.
+
+    python benchmark_forecasters.py [trimmed_sales.csv] [--level product] [--holdout 7]
+                                    [--prophet-series 20] [--tile 1]
+
+Builds the daily series of every product (or category), holds out the last `--holdout` days,
+fits each backend on the rest and scores the forecast of the held-out days. The NumPy backends
+fit every series at once; Prophet (skipped if it is not installed) is fitted one series at a
+time on the first `--prophet-series` series, and all backends are also scored on that subset so
+the errors are comparable. `--tile N` repeats the series N times to time thousands of series.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_forecast import FORECAST_LEVELS, daily_series
+from column_selection import TRIMMED_SALES_FILE_PATH, load_final_preprocessed_df
+from forecasters import FORECASTERS, get_forecaster
+
+
+def holdout_errors(actual, predicted):
+    """MAE, RMSE and WAPE (total absolute error over total actual) across all series and days."""
+    error = predicted - actual
+    total = np.abs(actual).sum()
+    return {
+        'MAE': np.abs(error).mean(),
+        'RMSE': np.sqrt((error ** 2).mean()),
+        'WAPE': np.abs(error).sum() / total if total else np.nan,
+    }
+
+
+def fit_and_score(backend, train, test, ds):
+    forecaster = get_forecaster(backend)
+    start = time.perf_counter()
+    yhat, _, _ = forecaster.fit_predict(train, test.shape[1], ds=ds)
+    seconds = time.perf_counter() - start
+    return seconds, yhat[:, train.shape[1]:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark forecasting backends.")
+    parser.add_argument('sales_file', nargs='?', default=TRIMMED_SALES_FILE_PATH)
+    parser.add_argument('--level', choices=list(FORECAST_LEVELS), default='product')
+    parser.add_argument('--holdout', type=int, default=7, help="Days held out for scoring (default: %(default)s).")
+    parser.add_argument('--prophet-series', type=int, default=20,
+                        help="Series fitted with Prophet, which is slow (default: %(default)s).")
+    parser.add_argument('--tile', type=int, default=1, help="Repeat the series this many times (default: %(default)s).")
+    args = parser.parse_args()
+
+    final_preprocessed_df = load_final_preprocessed_df(args.sales_file)
+    matrix, _ = daily_series(final_preprocessed_df, args.level)
+    Y = np.tile(matrix.to_numpy().T, (args.tile, 1))
+    train, test = Y[:, :-args.holdout], Y[:, -args.holdout:]
+    ds = matrix.index[:-args.holdout]
+    subset = slice(0, args.prophet_series)
+    print(f"{Y.shape[0]} {args.level} series x {Y.shape[1]} days; "
+          f"training on {train.shape[1]} days, scoring the last {args.holdout}.\n")
+
+    rows = []
+    for backend in FORECASTERS:
+        if backend == 'prophet':
+            try:
+                import prophet  # noqa: F401
+            except ImportError:
+                print("Prophet is not installed; skipping it.")
+                continue
+            seconds, predicted = fit_and_score(backend, train[subset], test[subset], ds)
+            n_series, all_errors = len(predicted), {}
+        else:
+            seconds, predicted_all = fit_and_score(backend, train, test, ds)
+            n_series, all_errors = len(predicted_all), holdout_errors(test, predicted_all)
+            predicted = predicted_all[subset]
+        subset_errors = holdout_errors(test[subset], predicted)
+        rows.append({
+            'backend': backend,
+            'series': n_series,
+            'fit_s': seconds,
+            'ms_per_series': seconds / n_series * 1000,
+            'subset_MAE': subset_errors['MAE'],
+            'subset_WAPE': subset_errors['WAPE'],
+            'all_MAE': all_errors.get('MAE', np.nan),
+            'all_RMSE': all_errors.get('RMSE', np.nan),
+            'all_WAPE': all_errors.get('WAPE', np.nan),
+        })
+
+    results = pd.DataFrame(rows).set_index('backend')
+    print(f"Holdout error on the first {args.prophet_series} series ('subset_') and on all series ('all_'):")
+    print(results.to_string(float_format=lambda value: f"{value:,.3f}"))
+
+
+if __name__ == '__main__':
+    main()
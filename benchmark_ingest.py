@@ -0,0 +1,72 @@
+"""
+Benchmark: CSV ingest throughput by worker count.
+
+    python benchmark_ingest.py [sales.csv] [--workers 1,2,4,8] [--parsers c,pyarrow] [--repeat 3]
+
+Parses the sales columns of one CSV with a single pd.read_csv (the current path) and with
+parallel_ingest.read_csv_parallel for every parser and worker count, checks that each result
+equals the single-process one, and prints the best-of-`--repeat` MB/s and the speedup. The
+default worker counts go up to the number of cores.
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from column_selection import TRIMMED_SALES_FILE_PATH
+from parallel_ingest import PARSERS, read_csv_parallel
+from sales_io import SALES_COLUMNS, SALES_DTYPES
+
+
+def default_worker_counts():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < cores:
+        counts.append(counts[-1] * 2)
+    return counts + [cores] if cores > 1 else counts
+
+
+def read_single(path):
+    dtypes = {col: SALES_DTYPES[col] for col in SALES_COLUMNS if col in SALES_DTYPES}
+    sales_df = pd.read_csv(path, usecols=lambda col: col in SALES_COLUMNS, dtype=dtypes)
+    sales_df['SalesDate'] = pd.to_datetime(sales_df['SalesDate'], errors='coerce')
+    return sales_df.dropna(subset=['SalesDate']).reset_index(drop=True)
+
+
+def best_time(function, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel CSV ingestion.")
+    parser.add_argument('sales_file', nargs='?', default=TRIMMED_SALES_FILE_PATH)
+    parser.add_argument('--workers', default=','.join(map(str, default_worker_counts())),
+                        help="Comma-separated worker counts (default: %(default)s).")
+    parser.add_argument('--parsers', default=','.join(PARSERS), help="Comma-separated parsers (default: %(default)s).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per configuration; the best is kept (default: %(default)s).")
+    args = parser.parse_args()
+
+    megabytes = os.path.getsize(args.sales_file) / 1e6
+    baseline_seconds, expected = best_time(lambda: read_single(args.sales_file), args.repeat)
+    print(f"{megabytes:,.1f} MB, {len(expected)} rows, {os.cpu_count()} cores\n")
+    print(f"{'mode':<22}{'workers':>8}{'seconds':>10}{'MB/s':>10}{'speedup':>9}  result")
+    print(f"{'pd.read_csv':<22}{1:>8}{baseline_seconds:>10.2f}{megabytes / baseline_seconds:>10.1f}{1:>9.2f}  reference")
+
+    for parser_name in args.parsers.split(','):
+        for workers in map(int, args.workers.split(',')):
+            seconds, (result, _) = best_time(
+                lambda: read_csv_parallel(args.sales_file, SALES_COLUMNS, workers=workers, parser=parser_name),
+                args.repeat)
+            status = 'match' if result.equals(expected) else 'MISMATCH'
+            print(f"{'parallel ' + parser_name:<22}{workers:>8}{seconds:>10.2f}{megabytes / seconds:>10.1f}"
+                  f"{baseline_seconds / seconds:>9.2f}  {status}")
+
+
+if __name__ == '__main__':
+    main()
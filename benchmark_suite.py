@@ -0,0 +1,257 @@
+"""
+Benchmark suite: the whole pipeline on synthetic sales at several scales, against a baseline.
+
+    python benchmark_suite.py [--scales 1e5,1e6,1e7] [--baseline benchmark_baseline.json]
+                              [--save-baseline] [--tolerance 0.25] [--repeat 5]
+
+For each scale (rows of synthetic sales.csv, see generate_sales.py), this times:
+- ingest: a chunked pd.read_csv of every row;
+- trim: the streaming trim to February 2024;
+- preprocess: column_selection.py, uncached;
+- cube: the sales cube build;
+- the abc, revenue, trend and forecast stages on the cube.
+
+Each stage also records a few of its results, such as row counts, total revenue, class counts
+and the forecast sum. The generated data depends only on its size and seed, so these checks
+must match the baseline exactly (floats to 1e-9 relative).
+
+Each stage's time is the median of `--repeat` runs, in the baseline too, since a single run of a
+0.2 s stage varies by 30% or more on a shared machine. Timings are compared only when the
+Python, pandas, NumPy, platform and CPU count match the baseline's (see environment()) and the
+seed, engine and backend are the same. Elsewhere only the checks are compared, so the suite can
+gate results in CI on any machine. A stage counts as a regression when its median is slower
+than the baseline by more than `--tolerance`, and by at least 50 ms. The suite exits with status
+1 on any check mismatch or regression. `--save-baseline` stores the current results instead.
+
+Synthetic files are kept in `--work-dir` and reused. Stage output is silenced; timings come from
+instrumentation.py, so `--profile run.jsonl` also records every nested step.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from generate_sales import generate_sales_csv, parse_row_count, read_product_ids
+from sales_io import SALES_COLUMNS, SALES_DTYPES, trim_sales_streaming
+
+BASELINE_FILE_PATH = 'benchmark_baseline.json'
+WORK_DIR = os.path.join('.bdm_cache', 'benchmark')
+STAGES = ['ingest', 'trim', 'preprocess', 'cube', 'abc', 'revenue', 'trend', 'forecast']
+
+# The trimmed period: February of the analysis year, as data_trimming.py.
+TARGET_YEAR = 2024
+PERIOD_START = pd.Timestamp(TARGET_YEAR, 2, 1)
+PERIOD_END = pd.Timestamp(TARGET_YEAR, 3, 1)
+
+# Stages faster than this are not flagged: their timings are mostly noise.
+MIN_REGRESSION_SECONDS = 0.05
+CHECK_RTOL = 1e-9
+
+
+def synthetic_sales_file(work_dir, rows, seed, products_file_path):
+    path = os.path.join(work_dir, f"sales_{rows}_seed{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(work_dir, exist_ok=True)
+        _, size, seconds = generate_sales_csv(path + '.tmp', rows, read_product_ids(products_file_path), seed)
+        os.replace(path + '.tmp', path)
+        print(f"Generated {rows:,} rows ({size / 1e6:,.1f} MB) in {seconds:.1f}s: '{path}'.")
+    return path
+
+
+def ingest(sales_file_path):
+    dtypes = {col: SALES_DTYPES[col] for col in SALES_COLUMNS if col in SALES_DTYPES}
+    rows = 0
+    for chunk in pd.read_csv(sales_file_path, usecols=SALES_COLUMNS, dtype=dtypes, chunksize=1_000_000):
+        rows += len(chunk)
+    return {'rows': rows}
+
+
+def run_stages(sales_file_path, trimmed_file_path, products_file_path, categories_file_path, engine, backend):
+    """Run every stage once; yields (stage, checks) while each stage runs inside an instrumentation step."""
+    from ABC_analysis import run_abc_analysis
+    from column_selection import load_final_preprocessed_df
+    from revenue import run_financial_overview
+    from sales_cube import SalesCube
+    from sales_trend_analysis import run_sales_trend_analysis
+    from time_series import run_forecast
+
+    abc_filename = os.path.join(os.path.dirname(trimmed_file_path), 'abc_results.csv')
+    state = {}
+
+    def trim():
+        rows_read, rows_written, _, _ = trim_sales_streaming(sales_file_path, trimmed_file_path, PERIOD_START,
+                                                             PERIOD_END, TARGET_YEAR, columns=SALES_COLUMNS)
+        return {'rows_read': rows_read, 'rows_written': rows_written}
+
+    def preprocess():
+        state['rows'] = load_final_preprocessed_df(trimmed_file_path, products_file_path, categories_file_path,
+                                                   use_cache=False, engine=engine)
+        return {'rows': len(state['rows']), 'total_price': float(state['rows']['TotalPrice'].sum())}
+
+    def cube():
+        state['cube'] = SalesCube.from_rows(state.pop('rows'))
+        return {'cells': len(state['cube'].cells)}
+
+    def abc():
+        classes = run_abc_analysis(state['cube'], output_filename=abc_filename)['ABC_Category'].value_counts()
+        return {f'class_{label}': int(count) for label, count in classes.sort_index().items()}
+
+    def revenue():
+        figures = run_financial_overview(state['cube'])
+        return {'total_revenue': float(figures['TotalRevenue']), 'total_profit': float(figures['TotalProfit'])}
+
+    def trend():
+        weekly_sales, sales_by_product = run_sales_trend_analysis(state['cube'], show_plots=False)
+        return {'weeks': len(weekly_sales), 'weekly_total': float(weekly_sales['TotalPrice'].sum()),
+                'top_product': str(sales_by_product.index[0])}
+
+    def forecast():
+        forecast_df = run_forecast(state['cube'], show_plots=False, backend=backend, use_cache=False)
+        return {'forecast_total': float(forecast_df['yhat'].sum())}
+
+    stage_functions = {'ingest': lambda: ingest(sales_file_path), 'trim': trim, 'preprocess': preprocess,
+                       'cube': cube, 'abc': abc, 'revenue': revenue, 'trend': trend, 'forecast': forecast}
+    for stage in STAGES:
+        with instrumentation.step(stage), contextlib.redirect_stdout(io.StringIO()):
+            checks = stage_functions[stage]()
+        yield stage, checks
+
+
+def benchmark_scale(rows, args):
+    """Median wall and CPU time over `--repeat` runs, peak RSS and the checks of each stage at one scale."""
+    sales_file_path = synthetic_sales_file(args.work_dir, rows, args.seed, args.products)
+    trimmed_file_path = os.path.join(args.work_dir, f"trimmed_{rows}_seed{args.seed}.csv")
+    runs = {}
+    for _ in range(args.repeat):
+        for stage, checks in run_stages(sales_file_path, trimmed_file_path, args.products, args.categories,
+                                        args.engine, args.backend):
+            runs.setdefault(stage, []).append((instrumentation.records()[-1], checks))
+
+    results = {}
+    for stage, stage_runs in runs.items():
+        peaks = [record['peak_rss_mb'] for record, _ in stage_runs if record['peak_rss_mb'] is not None]
+        results[stage] = {
+            'seconds': float(np.median([record['wall_s'] for record, _ in stage_runs])),
+            'cpu_seconds': float(np.median([record['cpu_s'] for record, _ in stage_runs])),
+            'peak_rss_mb': max(peaks) if peaks else None,
+            'checks': stage_runs[0][1],
+        }
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'platform': platform.platform(), 'cpu_count': os.cpu_count()}
+
+
+def compare_checks(current, baseline):
+    """Names of the checks that differ from the baseline."""
+    mismatched = []
+    for name, expected in baseline.items():
+        actual = current.get(name)
+        if isinstance(expected, float) and isinstance(actual, float):
+            same = np.isclose(actual, expected, rtol=CHECK_RTOL, atol=0)
+        else:
+            same = actual == expected
+        if not same:
+            mismatched.append(name)
+    return mismatched + [name for name in current if name not in baseline]
+
+
+def print_scale_report(rows, results, baseline, tolerance, compare_timings=True):
+    """
+    Print one scale's table; returns the number of regressions and check mismatches. Without
+    `compare_timings`, only the checks are compared with the baseline.
+    """
+    print(f"\n--- {rows:,} rows ---")
+    print(f"{'stage':<12}{'wall (s)':>10}{'cpu (s)':>10}{'peak RSS (MB)':>15}{'baseline (s)':>14}{'ratio':>8}  status")
+    problems = 0
+    for stage, result in results.items():
+        expected = (baseline or {}).get(stage)
+        status, baseline_seconds, ratio = 'no baseline', '-', '-'
+        if expected is not None:
+            baseline_seconds = f"{expected['seconds']:.3f}"
+            ratio = f"{result['seconds'] / expected['seconds']:.2f}" if expected['seconds'] else '-'
+            mismatched = compare_checks(result['checks'], expected['checks'])
+            slower = result['seconds'] - expected['seconds']
+            if mismatched:
+                status = f"CHECK MISMATCH ({', '.join(mismatched)})"
+            elif (compare_timings and slower > MIN_REGRESSION_SECONDS
+                  and result['seconds'] > expected['seconds'] * (1 + tolerance)):
+                status = 'REGRESSION'
+            else:
+                status = 'ok'
+            problems += status != 'ok'
+        peak = f"{result['peak_rss_mb']:,.1f}" if result['peak_rss_mb'] is not None else '-'
+        print(f"{stage:<12}{result['seconds']:>10.3f}{result['cpu_seconds']:>10.3f}{peak:>15}"
+              f"{baseline_seconds:>14}{ratio:>8}  {status}")
+    return problems
+
+
+def main():
+    from column_selection import CATEGORIES_FILE_PATH, PRODUCTS_FILE_PATH
+    from forecasters import FORECASTERS
+    from preprocess_engines import DEFAULT_ENGINE, ENGINES
+
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic sales at several scales.")
+    parser.add_argument('--scales', default='1e5,1e6',
+                        help="Comma-separated row counts of synthetic sales.csv, up to 1e8 (default: %(default)s).")
+    parser.add_argument('--seed', type=int, default=0, help="Synthetic data seed (default: %(default)s).")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Runs per scale; each stage's median time is kept (default: %(default)s).")
+    parser.add_argument('--baseline', default=BASELINE_FILE_PATH, help="Baseline results file (default: %(default)s).")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown against the baseline, as a fraction (default: %(default)s).")
+    parser.add_argument('--engine', choices=ENGINES, default=DEFAULT_ENGINE,
+                        help="Preprocessing engine (default: %(default)s).")
+    parser.add_argument('--backend', choices=list(FORECASTERS), default='holt_winters',
+                        help="Forecasting backend (default: %(default)s).")
+    parser.add_argument('--work-dir', default=WORK_DIR, help="Where synthetic files are kept (default: %(default)s).")
+    parser.add_argument('--products', default=PRODUCTS_FILE_PATH)
+    parser.add_argument('--categories', default=CATEGORIES_FILE_PATH)
+    instrumentation.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    instrumentation.enable(None if args.profile in (None, True) else args.profile, summary_at_exit=bool(args.profile))
+    baseline = None
+    compare_timings = True
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['environment'] != environment():
+            print(f"Note: the baseline was recorded on a different environment: {baseline['environment']}; "
+                  f"comparing checks only, not timings.")
+            compare_timings = False
+        settings = {'seed': args.seed, 'engine': args.engine, 'backend': args.backend}
+        if any(baseline[name] != value for name, value in settings.items()):
+            print(f"Note: the baseline used other settings: { {name: baseline[name] for name in settings} }; "
+                  f"comparing checks only, not timings.")
+            compare_timings = False
+
+    scales = {}
+    problems = 0
+    for rows in map(parse_row_count, args.scales.split(',')):
+        scales[str(rows)] = benchmark_scale(rows, args)
+        scale_baseline = baseline['scales'].get(str(rows)) if baseline else None
+        problems += print_scale_report(rows, scales[str(rows)], scale_baseline, args.tolerance, compare_timings)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'environment': environment(), 'seed': args.seed, 'engine': args.engine, 'backend': args.backend,
+                       'repeat': args.repeat, 'scales': scales}, f, indent=2)
+        print(f"\nBaseline saved to '{args.baseline}'.")
+    elif problems:
+        print(f"\n{problems} stage(s) regressed or changed results against '{args.baseline}'.")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
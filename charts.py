@@ -0,0 +1,241 @@
+"""
+Charts for the analyses, shown interactively or written to image files.
+
+Each analysis describes its figure as a ChartSpec: a name, a drawing function from this module
+and the plain data it needs (DataFrames and labels, no figure objects). emit_chart() either
+draws and shows it right away, as the scripts always did, or adds it to a ChartBatch. A batch
+collects every figure of a run, and ChartBatch.render() writes them as PNG/SVG files with the
+non-interactive Agg backend. Independent figures are drawn in a process pool.
+
+matplotlib and seaborn are imported only when a figure is drawn. An analysis that makes no
+charts never loads them.
+
+    python -m bdm run --month 2024-02 --chart-dir charts --chart-formats png,svg
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+CHART_FORMATS = ('png', 'svg')
+CHART_DPI = 100
+
+
+class ChartSpec:
+    """One figure: `draw(**data)` returns a matplotlib Figure; `name` is its file name stem."""
+
+    def __init__(self, name, draw, **data):
+        self.name = name
+        self.draw = draw
+        self.data = data
+
+
+# --- Drawing functions (run in the worker processes when rendering a batch) ---
+
+def _draw_abc(abc_summary, percentage_column, order, value_name, period_label):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(10, 6))
+    sns.barplot(x='ABC_Category', y=percentage_column, data=abc_summary, hue='ABC_Category',
+                palette='viridis', order=order, hue_order=order, legend=False)
+
+    title = f'ABC Analysis: Percentage of Total {value_name} by Category'
+    plt.title(f'{title} ({period_label})' if period_label else title)
+    plt.xlabel('ABC Category')
+    plt.ylabel(f'Percentage of Total {value_name} (%)')
+    plt.ylim(0, 100) # Ensure Y-axis goes from 0 to 100%
+
+    # Add text labels for percentages on top of bars
+    for _, row in abc_summary.iterrows():
+        if row['ABC_Category'] in order:
+            plt.text(order.index(row['ABC_Category']), row[percentage_column] + 2, f"{row[percentage_column]:.2f}%",
+                     color='black', ha="center")
+
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    return fig
+
+
+def _draw_weekly_trend(weekly_sales, period_label):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(10, 6)) # Adjusted figure size for weekly data
+    sns.lineplot(
+        data=weekly_sales,
+        x='RelativeWeek',
+        y='TotalPrice',
+        marker='o', # Add markers for each data point
+        color='skyblue', # Single color for a single line
+        linewidth=2
+    )
+
+    plt.title(f'Weekly Sales Trend for {period_label}')
+    plt.xlabel('Week Number (within period)')
+    plt.ylabel('Total Sales')
+    plt.xticks(weekly_sales['RelativeWeek'].unique()) # Ensure only actual week numbers are shown
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    return fig
+
+
+def _draw_forecast(ds, y, forecast, title):
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(10, 6))
+    plt.plot(ds, y, 'k.', label='Actual')
+    plt.plot(forecast['ds'], forecast['yhat'], label='Forecast')
+    plt.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'], alpha=0.2)
+    plt.title(title)
+    plt.xlabel('Date')
+    plt.ylabel('Total Sales (₹)')
+    plt.legend()
+    plt.grid(True, linestyle='--', alpha=0.6)
+    fig.autofmt_xdate()
+    plt.tight_layout()
+    return fig
+
+
+def _draw_forecast_components(forecast, components, title):
+    import matplotlib.pyplot as plt
+
+    # One panel per component (trend, then each seasonality), over the forecast dates.
+    fig, axes = plt.subplots(len(components), 1, figsize=(10, 3 * len(components)), sharex=True,
+                             squeeze=False)
+    for ax, component in zip(axes[:, 0], components):
+        ax.plot(forecast['ds'], forecast[component])
+        if f'{component}_lower' in forecast.columns:
+            ax.fill_between(forecast['ds'], forecast[f'{component}_lower'], forecast[f'{component}_upper'], alpha=0.2)
+        ax.set_ylabel(component)
+        ax.grid(True, linestyle='--', alpha=0.6)
+    axes[0, 0].set_title(title)
+    axes[-1, 0].set_xlabel('Date')
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return fig
+
+
+def _draw_cogs_by_category(cogs_by_category, period_label):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(12, 6))
+    sns.barplot(x='CategoryName', y='CostOfGoodsSold', data=cogs_by_category, hue='CategoryName',
+                palette='viridis', legend=False)
+    plt.title(f'Cost of Goods Sold (COGS) by Product Category ({period_label})')
+    plt.xlabel('Category Name')
+    plt.ylabel('Total COGS (₹)') # Updated label to reflect Rupees
+    plt.xticks(rotation=45, ha='right') # Rotate labels for readability
+    plt.tight_layout()
+    return fig
+
+
+# --- Chart specs for each analysis ---
+
+def abc_chart(abc_summary, order, period_label=None, value_name='Revenue'):
+    """Bar chart of each class's share of the total, from ABC_analysis.summarize_abc's table."""
+    return ChartSpec('abc_categories', _draw_abc, abc_summary=abc_summary,
+                     percentage_column=f'PercentageOfTotal{value_name}', order=list(order),
+                     value_name=value_name, period_label=period_label)
+
+
+def weekly_trend_chart(weekly_sales, period_label):
+    return ChartSpec('weekly_trend', _draw_weekly_trend, weekly_sales=weekly_sales, period_label=period_label)
+
+
+def forecast_chart(ds, y, forecast, title):
+    """Actual daily sales (`ds`, `y`) with the forecast and its uncertainty interval."""
+    return ChartSpec('forecast', _draw_forecast, ds=list(ds), y=list(y), forecast=forecast, title=title)
+
+
+def forecast_components_chart(forecast, title):
+    """Trend and seasonal components of a Prophet forecast frame; None if it has none."""
+    components = [column for column in ('trend', 'yearly', 'weekly', 'daily') if column in forecast.columns]
+    if not components:
+        return None
+    return ChartSpec('forecast_components', _draw_forecast_components, forecast=forecast,
+                     components=components, title=title)
+
+
+def cogs_by_category_chart(cogs_by_category, period_label):
+    return ChartSpec('cogs_by_category', _draw_cogs_by_category, cogs_by_category=cogs_by_category,
+                     period_label=period_label)
+
+
+# --- Showing and rendering ---
+
+def show_chart(spec):
+    """Draw one spec and show it with the current (interactive) backend."""
+    import matplotlib.pyplot as plt
+
+    spec.draw(**spec.data)
+    plt.show()
+
+
+def emit_chart(spec, charts=None, show_plots=True):
+    """Add `spec` to `charts` (a ChartBatch) when one is given; otherwise show it if `show_plots`."""
+    if spec is None:
+        return
+    if charts is not None:
+        charts.add(spec)
+    elif show_plots:
+        show_chart(spec)
+
+
+def _render_spec(spec, paths):
+    """Worker: draw one spec with the Agg backend and save it to each of `paths`."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig = spec.draw(**spec.data)
+    try:
+        for path in paths:
+            fig.savefig(path, dpi=CHART_DPI)
+    finally:
+        plt.close(fig)
+    return paths
+
+
+def render_charts(specs, output_dir, formats=CHART_FORMATS, suffix=None, workers=None):
+    """
+    Write each spec to `output_dir`/<name>[_<suffix>].<format> for every format, drawing
+    independent figures in a pool of `workers` processes (default: one per figure, up to the
+    number of cores). Returns (paths written, seconds).
+    """
+    unknown = [fmt for fmt in formats if fmt not in CHART_FORMATS]
+    if unknown:
+        raise ValueError(f"unknown chart format(s) {unknown}; choose from {CHART_FORMATS}")
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = []
+    for spec in specs:
+        stem = f"{spec.name}_{suffix}" if suffix else spec.name
+        tasks.append((spec, [os.path.join(output_dir, f"{stem}.{fmt}") for fmt in formats]))
+
+    start = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        written = [_render_spec(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            written = list(executor.map(_render_spec, *zip(*tasks)))
+    return [path for paths in written for path in paths], time.perf_counter() - start
+
+
+class ChartBatch:
+    """Collects the charts of a run (stages may add from several threads) and renders them together."""
+
+    def __init__(self, output_dir, formats=CHART_FORMATS, suffix=None):
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.suffix = suffix
+        self.specs = []
+        self._lock = threading.Lock()
+
+    def add(self, spec):
+        with self._lock:
+            self.specs.append(spec)
+
+    def render(self, workers=None):
+        return render_charts(self.specs, self.output_dir, self.formats, self.suffix, workers)
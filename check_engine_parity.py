@@ -0,0 +1,89 @@
+"""
+Parity check: the lazy preprocessing engines against the pandas path.
+
+    python check_engine_parity.py [trimmed_sales.csv ...] [--engines polars,duckdb]
+
+Builds final_preprocessed_df from the same files with every engine (bypassing the cache) and
+compares each lazy result with the pandas one: same columns, same rows (compared after sorting,
+since the engines do not keep the pandas row order), identical keys, dates and names, and
+TotalPrice equal to within floating-point summation noise. Prints the build time of each engine
+and exits with status 1 on any mismatch. Engines that are not installed are skipped.
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+
+from column_selection import CATEGORIES_FILE_PATH, PRODUCTS_FILE_PATH, TRIMMED_SALES_FILE_PATH, load_final_preprocessed_df
+from preprocess_engines import ENGINES
+
+SORT_COLUMNS = ['SalesDate', 'ProductID', 'Quantity', 'Discount']
+FLOAT_COLUMNS = ['TotalPrice', 'Discount', 'Price']
+TOTAL_PRICE_RTOL = 1e-12
+
+
+def build(engine, sales_file_paths, products_file_path=PRODUCTS_FILE_PATH, categories_file_path=CATEGORIES_FILE_PATH):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        final_df = load_final_preprocessed_df(sales_file_paths, products_file_path, categories_file_path,
+                                              use_cache=False, engine=engine)
+    return final_df, time.perf_counter() - start
+
+
+def compare(expected, actual):
+    """A list of differences between two final_preprocessed_df frames; empty if they match."""
+    if list(actual.columns) != list(expected.columns):
+        return [f"columns differ: {list(actual.columns)}"]
+    if len(actual) != len(expected):
+        return [f"{len(actual)} rows instead of {len(expected)}"]
+
+    expected = expected.sort_values(SORT_COLUMNS, kind='stable').reset_index(drop=True)
+    actual = actual.sort_values(SORT_COLUMNS, kind='stable').reset_index(drop=True)
+    problems = []
+    for column in expected.columns:
+        if column in FLOAT_COLUMNS:
+            want, got = expected[column].to_numpy(np.float64), actual[column].to_numpy(np.float64)
+            if not np.allclose(got, want, rtol=TOTAL_PRICE_RTOL, atol=0):
+                problems.append(f"{column}: max abs difference {np.abs(got - want).max():.3g}")
+        else:
+            # Undated rows carry missing date features on every engine, and missing never equals missing.
+            want, got = expected[column], actual[column]
+            if column == 'SalesDate':
+                want_values, got_values = want.to_numpy('datetime64[us]'), got.to_numpy('datetime64[us]')
+            else:
+                want_values, got_values = want.astype(str).to_numpy(), got.astype(str).to_numpy()
+            missing = want.isna().to_numpy()
+            if not ((missing == got.isna().to_numpy()).all() and (want_values == got_values)[~missing].all()):
+                problems.append(f"{column}: values differ")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the lazy preprocessing engines against the pandas path.")
+    parser.add_argument('sales_files', nargs='*', default=[TRIMMED_SALES_FILE_PATH])
+    parser.add_argument('--engines', default=','.join(ENGINES[1:]),
+                        help="Comma-separated engines to check (default: %(default)s).")
+    args = parser.parse_args()
+
+    expected, seconds = build('pandas', args.sales_files)
+    print(f"{'engine':<10}{'rows':>10}{'build (s)':>12}  result")
+    print(f"{'pandas':<10}{len(expected):>10}{seconds:>12.2f}  reference")
+
+    failed = False
+    for engine in args.engines.split(','):
+        try:
+            actual, seconds = build(engine, args.sales_files)
+        except ImportError:
+            print(f"{engine:<10}{'':>10}{'':>12}  skipped (not installed)")
+            continue
+        problems = compare(expected, actual)
+        failed |= bool(problems)
+        print(f"{engine:<10}{len(actual):>10}{seconds:>12.2f}  {'; '.join(problems) or 'match'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
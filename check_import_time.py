@@ -0,0 +1,114 @@
+"""
+Import-time budget check for the library API and the analysis modules.
+
+    python check_import_time.py [--budget-ms 100] [--api-budget-ms 25] [--repeat 3]
+
+Each module is imported in a fresh interpreter under `python -X importtime`, from an empty
+working directory, so that a module reading data files at import would fail. A module fails the
+check if:
+- its import prints anything, or raises;
+- it loads a plotting or optional heavy dependency (matplotlib, seaborn, Prophet, Polars,
+  DuckDB, statsmodels), which must be imported lazily on first use;
+- it is slower than its budget.
+pandas and NumPy are imported before the analysis modules and are not counted, so their budget
+covers the project's own import work. bdm_api must not import pandas or NumPy at all, and has its
+own budget. The best of `--repeat` runs is kept. Exits with status 1 on any failure.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+API_MODULE = 'bdm_api'
+ANALYSIS_MODULES = ['column_selection', 'ABC_analysis', 'revenue', 'sales_trend_analysis', 'time_series',
+                    'inventory_turnover_ratio_analysis', 'visualize', 'top_movers', 'scenarios', 'sales_store', 'bdm']
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'prophet', 'polars', 'duckdb', 'statsmodels']
+API_FORBIDDEN_MODULES = HEAVY_MODULES + ['pandas', 'numpy']
+
+DEFAULT_BUDGET_MS = 100
+DEFAULT_API_BUDGET_MS = 25
+DEFAULT_REPEAT = 3
+
+_PROBE = """
+import sys
+{preload}
+import {module}
+print('\\n' + __import__('json').dumps(sorted({{name.split('.')[0] for name in sys.modules}})))
+"""
+
+
+def import_cost(module, preload, repo_dir, work_dir):
+    """(microseconds to import `module`, top-level packages loaded, unexpected output) in a fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [repo_dir, os.environ.get('PYTHONPATH')])))
+    env.pop('BDM_PROFILE', None)
+    code = _PROBE.format(preload='\n'.join(f'import {name}' for name in preload), module=module)
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=work_dir, env=env,
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    # -X importtime lines: "import time: <self us> | <cumulative us> | <indent><name>"
+    cumulative = None
+    for line in completed.stderr.splitlines():
+        # The module's own top-level (unindented) entry; nested entries are its dependencies.
+        if line.startswith('import time:') and line.rsplit('| ', 1)[-1] == module:
+            cumulative = int(line.split('|')[1])
+    output, _, loaded = completed.stdout.rstrip('\n').rpartition('\n')
+    return cumulative, set(json.loads(loaded)), output.strip()
+
+
+def check_module(module, preload, forbidden, budget_ms, repeat, repo_dir, work_dir):
+    """(best milliseconds, list of problems) for one module."""
+    best, problems = None, []
+    for _ in range(repeat):
+        try:
+            microseconds, loaded, output = import_cost(module, preload, repo_dir, work_dir)
+        except RuntimeError as e:
+            return None, [f"import failed: {e}"]
+        if output:
+            problems.append(f"prints at import: {output.splitlines()[0]!r}")
+        heavy = sorted(loaded.intersection(forbidden))
+        if heavy:
+            problems.append(f"imports {', '.join(heavy)}")
+        if microseconds is not None and (best is None or microseconds < best):
+            best = microseconds
+        if problems:
+            break
+    milliseconds = best / 1000 if best is not None else None
+    if milliseconds is not None and milliseconds > budget_ms:
+        problems.append(f"{milliseconds:.1f} ms is over the {budget_ms:g} ms budget")
+    return milliseconds, sorted(set(problems))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time and lazy dependencies of the modules.")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help="Budget per analysis module, with pandas and NumPy already imported (default: %(default)s).")
+    parser.add_argument('--api-budget-ms', type=float, default=DEFAULT_API_BUDGET_MS,
+                        help="Budget for importing bdm_api (default: %(default)s).")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Imports per module; the fastest counts (default: %(default)s).")
+    args = parser.parse_args()
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    checks = [(API_MODULE, [], API_FORBIDDEN_MODULES, args.api_budget_ms)] + \
+             [(module, ['numpy', 'pandas'], HEAVY_MODULES, args.budget_ms) for module in ANALYSIS_MODULES]
+
+    failures = 0
+    print(f"{'module':<36}{'import (ms)':>12}{'budget (ms)':>13}  status")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for module, preload, forbidden, budget_ms in checks:
+            milliseconds, problems = check_module(module, preload, forbidden, budget_ms, args.repeat, repo_dir,
+                                                  work_dir)
+            shown = f"{milliseconds:.1f}" if milliseconds is not None else '-'
+            print(f"{module:<36}{shown:>12}{budget_ms:>13g}  {'; '.join(problems) or 'ok'}")
+            failures += bool(problems)
+
+    if failures:
+        print(f"\n{failures} module(s) failed the import check.")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,18 @@
+import argparse
+import calendar
+
 import pandas as pd
 
+from date_features import add_date_features
+from instrumentation import add_profile_argument, enable_from_args, instrumented, step
+from parallel_ingest import format_throughput, read_csv_parallel
+from preprocess_cache import cache_key, load_cached_frame, store_cached_frame
+from preprocess_engines import DEFAULT_ENGINE, ENGINES, preprocess_lazy
+from product_lookup import build_product_lookup, filter_and_attach
+from sales_cube import SalesCube, filter_rows
+from sales_io import DEFAULT_MEMORY_BUDGET_MB, SALES_COLUMNS, SALES_DTYPES, partition_months, partition_paths
+from schema import CATEGORIES_DTYPES, PRODUCTS_DTYPES, apply_compact_schema, as_float64, print_memory_report, to_default_dtypes
+
 # --- Configuration ---
 # Assuming the trimmed sales data for February 2024 has already been generated
 # by the 'Generate Trimmed Sales Data for February 2024' immersive.
@@ -7,49 +20,9 @@ TRIMMED_SALES_FILE_PATH = r'C:\Users\Pavan\Downloads\archive (1)\trimmed_sales_f
 PRODUCTS_FILE_PATH = r'C:\Users\Pavan\Downloads\archive (1)\products.csv'
 CATEGORIES_FILE_PATH = r'C:\Users\Pavan\Downloads\archive (1)\categories.csv'
 
-print("--- Step 1: Loading Trimmed Sales Data and Auxiliary Files ---")
-try:
-    trimmed_sales_df = pd.read_csv(TRIMMED_SALES_FILE_PATH)
-    products_df = pd.read_csv(PRODUCTS_FILE_PATH)
-    categories_df = pd.read_csv(CATEGORIES_FILE_PATH)
-    print(f"Successfully loaded '{TRIMMED_SALES_FILE_PATH}', '{PRODUCTS_FILE_PATH}', and '{CATEGORIES_FILE_PATH}'.")
-    print(f"Trimmed sales data size: {len(trimmed_sales_df)} rows.")
-except FileNotFoundError as e:
-    print(f"Error loading file: {e}. Please ensure all necessary CSV files are in the correct location.")
-    exit()
-
-# Ensure 'SalesDate' is datetime type for consistency, as it might become object after saving/loading CSV
-trimmed_sales_df['SalesDate'] = pd.to_datetime(trimmed_sales_df['SalesDate'])
-print(" 'SalesDate' column in trimmed_sales_df ensured as datetime format.")
-
-
-print("\n--- Step 2: Merging with Product and Category Data & Recalculating TotalPrice ---")
-
-# Keep only necessary columns from products_df before merging
-products_relevant_cols = ['ProductID', 'ProductName', 'Price', 'CategoryID']
-merged_df = pd.merge(trimmed_sales_df, products_df[products_relevant_cols], on='ProductID', how='left')
-
-# Merge with categories_df on CategoryID to get CategoryName
-categories_relevant_cols = ['CategoryID', 'CategoryName']
-merged_df = pd.merge(merged_df, categories_df[categories_relevant_cols], on='CategoryID', how='left')
-
-print("Products and Categories data merged with trimmed sales data.")
-
-# Recalculate TotalPrice (important after merging with 'Price' from products_df)
-# This uses the 'Price' from products.csv which is assumed to be the base price
-merged_df['TotalPrice'] = merged_df['Quantity'] * merged_df['Price'] * (1 - merged_df['Discount'])
-print("TotalPrice recalculated using merged product prices.")
-
-# --- Feature Engineering (Time-based) ---
-# Re-extract time-based features as they might be needed for consistency or re-calculation
-merged_df['SaleYear'] = merged_df['SalesDate'].dt.year
-merged_df['SaleMonth'] = merged_df['SalesDate'].dt.month_name()
-merged_df['SaleWeekday'] = merged_df['SalesDate'].dt.day_name()
-merged_df['SaleWeek'] = merged_df['SalesDate'].dt.isocalendar().week.astype(int)
-print("Time-based features extracted.")
-
-
-print("\n--- Step 3: Filtering Products and Categories for Indian Grocery Store Relevance ---")
+# Reuse the final preprocessed DataFrame from the on-disk cache (see preprocess_cache.py)
+# when none of the input files or filter lists have changed since it was built.
+USE_PREPROCESSED_CACHE = True
 
 # Define a list of product names to exclude that are not typically found in Indian grocery stores.
 products_to_exclude = [
@@ -70,30 +43,336 @@ categories_to_include = [
     'Grain'
 ]
 
-# Apply filters sequentially
-# Filter out products not typically found in Indian grocery stores
-filtered_by_product_exclusion = merged_df[~merged_df['ProductName'].isin(products_to_exclude)].copy()
-print(f"Filtered by product exclusion. Rows remaining: {len(filtered_by_product_exclusion)}")
-
-# Further filter by the specified categories
-final_preprocessed_df = filtered_by_product_exclusion[
-    filtered_by_product_exclusion['CategoryName'].isin(categories_to_include)
-].copy()
-print(f"Further filtered by category inclusion ({categories_to_include}). Final rows: {len(final_preprocessed_df)}")
-
-
-print("\n--- Step 4: Remove Unnecessary Columns from the final filtered DataFrame ---")
 # Only keep columns that are useful for the analysis (Sales Trend, Forecasting, Inventory Turnover, ABC Analysis)
 columns_to_keep = [
     'ProductID', 'ProductName', 'CategoryID', 'CategoryName', 'Quantity', 'Discount', 'TotalPrice', 'SalesDate',
     'SaleYear', 'SaleMonth', 'SaleWeekday', 'SaleWeek', 'Price' # 'Price' is retained for COGS calculation in Inventory Turnover
 ]
 
-final_preprocessed_df = final_preprocessed_df[columns_to_keep].copy()
 
-print("\n--- Data Preprocessing Complete ---")
-print("Final preprocessed DataFrame (final_preprocessed_df) ready for analysis.")
-print("\nFirst 5 rows of final_preprocessed_df:")
-print(final_preprocessed_df.head())
-print("\nInformation about final_preprocessed_df:")
-print(final_preprocessed_df.info())
+def build_final_preprocessed_df(trimmed_sales_df, products_df, categories_df, memory_report=False,
+                                exclude_products=None, include_categories=None):
+    """
+    Filter, attach product data, feature-engineer and project the trimmed sales data (Steps 2-4), returning
+    the frame in the compact schema from schema.py. With `memory_report`, print per-column
+    memory of the frame measured before and after the compact schema, plus an estimate of the
+    same frame in pandas' default dtypes. `exclude_products` and
+    `include_categories` replace this module's filter lists when given.
+    """
+    exclude_products = products_to_exclude if exclude_products is None else exclude_products
+    include_categories = categories_to_include if include_categories is None else include_categories
+    # Ensure 'SalesDate' is datetime type for consistency, as it might become object after saving/loading CSV
+    with step('parse_sales_dates'):
+        trimmed_sales_df['SalesDate'] = pd.to_datetime(trimmed_sales_df['SalesDate'])
+    print(" 'SalesDate' column in trimmed_sales_df ensured as datetime format.")
+
+
+    print("\n--- Step 2: Filtering Products and Categories for Indian Grocery Store Relevance ---")
+
+    # Resolve both filters once against the few hundred products (see product_lookup.py),
+    # then drop sales rows by a ProductID mask before any product columns are attached.
+    with step('filter_and_attach') as current:
+        product_lookup = build_product_lookup(products_df, categories_df)
+        final_df, rows_after_exclusion = filter_and_attach(trimmed_sales_df, product_lookup,
+                                                           exclude_products, include_categories)
+        current.record(final_df)
+    # Filter out products not typically found in Indian grocery stores
+    print(f"Filtered by product exclusion. Rows remaining: {rows_after_exclusion}")
+    # Further filter by the specified categories
+    print(f"Further filtered by category inclusion ({include_categories}). Final rows: {len(final_df)}")
+
+
+    print("\n--- Step 3: Attaching Product and Category Data & Recalculating TotalPrice ---")
+    print("ProductName, Price, CategoryID and CategoryName attached by ProductID lookup.")
+
+    # Recalculate TotalPrice (important after attaching 'Price' from products_df)
+    # This uses the 'Price' from products.csv which is assumed to be the base price
+    with step('total_price'):
+        final_df['TotalPrice'] = final_df['Quantity'] * as_float64(final_df['Price']) * (1 - as_float64(final_df['Discount']))
+    print("TotalPrice recalculated using product prices.")
+
+    # --- Feature Engineering (Time-based) ---
+    # Re-extract time-based features as they might be needed for consistency or re-calculation
+    # (vectorized; SaleMonth and SaleWeekday are categoricals, see date_features.py)
+    with step('date_features'):
+        add_date_features(final_df)
+    print("Time-based features extracted.")
+
+    # --- Compact Schema: categorical names, downcast numerics (see schema.py) ---
+    with step('compact_schema'):
+        uncompacted_df = final_df[columns_to_keep] if memory_report else None
+        final_df = apply_compact_schema(final_df)
+
+
+    print("\n--- Step 4: Remove Unnecessary Columns from the final filtered DataFrame ---")
+    with step('project_columns') as current:
+        final_df = final_df[columns_to_keep].reset_index(drop=True)
+        current.record(final_df)
+
+    if memory_report:
+        print_memory_report(uncompacted_df, final_df, title="Memory Report: final_preprocessed_df before vs after the compact schema")
+        # Not a frame this pipeline builds: the compact frame converted back to object strings and int64/float64.
+        print_memory_report(to_default_dtypes(final_df), final_df,
+                            title="Memory Report (estimate): final_preprocessed_df in pandas' default dtypes vs the compact schema")
+    return final_df
+
+
+def build_final_preprocessed_df_lazy(engine, sales_file_paths, products_file_path, categories_file_path,
+                                     memory_limit_mb=None):
+    """
+    Steps 1-4 with an out-of-core engine ('polars' or 'duckdb', see preprocess_engines.py):
+    loading, filtering, the product join and TotalPrice run as one lazy query plan, then the
+    date features, compact schema and column projection are applied as on the pandas path.
+    DuckDB spills to disk past `memory_limit_mb`; Polars streams and ignores it.
+    """
+    print(f"--- Steps 1-3: Lazy '{engine}' query plan (read, filter, attach product data, TotalPrice) ---")
+    try:
+        with step('lazy_plan', engine=engine) as current:
+            final_df = preprocess_lazy(engine, sales_file_paths, products_file_path, categories_file_path,
+                                       products_to_exclude, categories_to_include, memory_limit_mb)
+            current.record(final_df)
+    except ImportError as e:
+        print(f"Error: the '{engine}' engine is not installed ({e}). Use --engine pandas or install it.")
+        raise
+    except FileNotFoundError as e:
+        print(f"Error loading file: {e}. Please ensure all necessary CSV files are in the correct location.")
+        raise
+    print(f"Filtered by product exclusion and category inclusion ({categories_to_include}). Final rows: {len(final_df)}")
+
+    # --- Feature Engineering (Time-based) and Compact Schema, as in build_final_preprocessed_df ---
+    with step('date_features'):
+        add_date_features(final_df)
+    print("Time-based features extracted.")
+    with step('compact_schema'):
+        final_df = apply_compact_schema(final_df)
+
+    print("\n--- Step 4: Remove Unnecessary Columns from the final filtered DataFrame ---")
+    with step('project_columns') as current:
+        final_df = final_df[columns_to_keep].reset_index(drop=True)
+        current.record(final_df)
+    return final_df
+
+
+@instrumented('preprocess')
+def load_final_preprocessed_df(sales_file_paths=TRIMMED_SALES_FILE_PATH, products_file_path=PRODUCTS_FILE_PATH,
+                               categories_file_path=CATEGORIES_FILE_PATH, use_cache=USE_PREPROCESSED_CACHE,
+                               memory_report=False, engine=DEFAULT_ENGINE, ingest_workers=None, memory_limit_mb=None):
+    """
+    Load the trimmed sales file(s) and auxiliary CSVs and return the final preprocessed DataFrame,
+    reusing the on-disk cache when the inputs and filter lists are unchanged.
+
+    `sales_file_paths` may be a single path or a list of paths (e.g. day partitions of one month).
+    A `memory_report` always rebuilds the frame, since it compares dtypes during the build.
+    `engine` selects how a cache miss is built: eager 'pandas', or a lazy 'polars'/'duckdb' plan
+    (see preprocess_engines.py); all produce the same columns, so they share the cache. The
+    duckdb engine spills to disk past `memory_limit_mb`; pandas and polars ignore it.
+    With `ingest_workers`, the pandas engine parses each sales file in a pool of that many
+    processes (see parallel_ingest.py) instead of with a single pd.read_csv. A missing input
+    raises FileNotFoundError (and a missing lazy engine ImportError) after printing the error.
+    """
+    if isinstance(sales_file_paths, str):
+        sales_file_paths = [sales_file_paths]
+    input_file_paths = [*sales_file_paths, products_file_path, categories_file_path]
+
+    preprocessed_cache_key = None
+    if use_cache and not memory_report:
+        try:
+            with step('cache_lookup') as current:
+                preprocessed_cache_key = cache_key(input_file_paths, products_to_exclude, categories_to_include)
+                final_df = load_cached_frame(preprocessed_cache_key)
+                current.record(final_df, hit=final_df is not None)
+        except FileNotFoundError:
+            final_df = None # Missing inputs are reported by the normal loading step below.
+        if final_df is not None:
+            print(f"--- Loaded preprocessed data from cache (key {preprocessed_cache_key}) ---")
+            return final_df
+
+    if engine != 'pandas' and not memory_report:
+        final_df = build_final_preprocessed_df_lazy(engine, sales_file_paths, products_file_path, categories_file_path,
+                                                    memory_limit_mb)
+        if preprocessed_cache_key is not None:
+            with step('cache_store'):
+                cache_path = store_cached_frame(final_df, preprocessed_cache_key)
+            if cache_path:
+                print(f"Preprocessed data cached to '{cache_path}'.")
+        return final_df
+
+    print("--- Step 1: Loading Trimmed Sales Data and Auxiliary Files ---")
+    try:
+        # Parse only the sales columns the analysis needs, with compact dtypes, at load time.
+        sales_dtypes = {col: SALES_DTYPES[col] for col in SALES_COLUMNS if col in SALES_DTYPES}
+        with step('read_sales_csv', files=len(sales_file_paths), workers=ingest_workers or 1) as current:
+            if ingest_workers:
+                sales_parts = []
+                for path in sales_file_paths:
+                    sales_part, ingest_stats = read_csv_parallel(path, SALES_COLUMNS, workers=ingest_workers)
+                    print(f"Parsed '{path}' in parallel: {format_throughput(ingest_stats)}.")
+                    sales_parts.append(sales_part)
+            else:
+                sales_parts = [pd.read_csv(path, usecols=lambda col: col in SALES_COLUMNS, dtype=sales_dtypes)
+                               for path in sales_file_paths]
+            trimmed_sales_df = pd.concat(sales_parts, ignore_index=True)
+            current.record(trimmed_sales_df)
+        with step('read_products_categories'):
+            products_df = pd.read_csv(products_file_path, dtype=PRODUCTS_DTYPES)
+            categories_df = pd.read_csv(categories_file_path, dtype=CATEGORIES_DTYPES)
+        print(f"Successfully loaded '{', '.join(sales_file_paths)}', '{products_file_path}', and '{categories_file_path}'.")
+        print(f"Trimmed sales data size: {len(trimmed_sales_df)} rows.")
+    except FileNotFoundError as e:
+        print(f"Error loading file: {e}. Please ensure all necessary CSV files are in the correct location.")
+        raise
+
+    final_df = build_final_preprocessed_df(trimmed_sales_df, products_df, categories_df, memory_report=memory_report)
+
+    if preprocessed_cache_key is not None:
+        with step('cache_store'):
+            cache_path = store_cached_frame(final_df, preprocessed_cache_key)
+        if cache_path:
+            print(f"Preprocessed data cached to '{cache_path}'.")
+    return final_df
+
+
+def load_sales_cube(sales_file_paths=TRIMMED_SALES_FILE_PATH, products_file_path=PRODUCTS_FILE_PATH,
+                    categories_file_path=CATEGORIES_FILE_PATH, use_cache=USE_PREPROCESSED_CACHE, engine=DEFAULT_ENGINE,
+                    ingest_workers=None, memory_limit_mb=None):
+    """
+    The pre-aggregated product x day sales cube of the preprocessed data (see sales_cube.py),
+    cached next to the preprocessed frame. On a cache hit the row-level frame is loaded only if
+    a query needs a dimension the cube does not have.
+    """
+    if isinstance(sales_file_paths, str):
+        sales_file_paths = [sales_file_paths]
+
+    def load_rows():
+        return load_final_preprocessed_df(sales_file_paths, products_file_path, categories_file_path, use_cache=use_cache,
+                                          engine=engine, ingest_workers=ingest_workers, memory_limit_mb=memory_limit_mb)
+
+    cube_cache_key = None
+    if use_cache:
+        try:
+            input_file_paths = [*sales_file_paths, products_file_path, categories_file_path]
+            with step('cube_cache_lookup') as current:
+                cube_cache_key = cache_key(input_file_paths, products_to_exclude, categories_to_include) + '_cube'
+                cells = load_cached_frame(cube_cache_key)
+                current.record(cells, hit=cells is not None)
+        except FileNotFoundError:
+            cells = None # Missing inputs are reported when the rows are loaded below.
+        if cells is not None:
+            print(f"--- Loaded sales cube from cache ({len(cells)} product x day cells) ---")
+            return SalesCube(cells, raw_loader=load_rows)
+
+    rows = load_rows()
+    with step('build_cube') as current:
+        cube = SalesCube.from_rows(rows)
+        current.record(cube)
+    print(f"Sales cube built: {len(cube.rows)} rows -> {len(cube.cells)} product x day cells.")
+    if cube_cache_key is not None:
+        store_cached_frame(cube.cells, cube_cache_key)
+    return cube
+
+
+def load_sales_cube_range(start=None, end=None, partition_dir=None, sales_file_paths=TRIMMED_SALES_FILE_PATH,
+                          use_cache=USE_PREPROCESSED_CACHE, engine=DEFAULT_ENGINE, ingest_workers=None,
+                          memory_limit_mb=None):
+    """
+    The sales cube of the dates [start, end] (either may be None for an open range).
+
+    From a partition directory, only the month partitions overlapping the range are read; each
+    month is preprocessed (or loaded from the cache) and aggregated on its own, and only its
+    product x day cells are kept, so a year needs about the memory of one month of rows. Without
+    partitions, the given trimmed sales file(s) are loaded as one cube and filtered.
+    """
+    if not partition_dir:
+        return load_sales_cube(sales_file_paths, use_cache=use_cache, engine=engine, ingest_workers=ingest_workers,
+                               memory_limit_mb=memory_limit_mb).filter_days(start, end)
+
+    months = partition_months(partition_dir, start, end)
+    if not months:
+        raise FileNotFoundError(f"No partition in '{partition_dir}' overlaps {start} to {end}.")
+
+    month_cells = []
+    for year, month in months:
+        print(f"\n=== {calendar.month_name[month]} {year} ===")
+        month_cube = load_sales_cube(partition_paths(partition_dir, year, month), use_cache=use_cache, engine=engine,
+                                     ingest_workers=ingest_workers, memory_limit_mb=memory_limit_mb)
+        month_cells.append(month_cube.filter_days(start, end).cells)
+        del month_cube # Release the month's rows before the next one is loaded.
+
+    def load_rows():
+        # Only for queries the cube cannot answer: the rows of the whole range, one month at a time.
+        rows = [filter_rows(load_final_preprocessed_df(partition_paths(partition_dir, year, month), use_cache=use_cache,
+                                                       engine=engine, ingest_workers=ingest_workers,
+                                                       memory_limit_mb=memory_limit_mb), start, end)
+                for year, month in months]
+        return pd.concat(rows, ignore_index=True)
+
+    return SalesCube(pd.concat(month_cells, ignore_index=True), raw_loader=load_rows)
+
+
+def load_sales_cube_store(store_dir, start=None, end=None, products_file_path=PRODUCTS_FILE_PATH,
+                          categories_file_path=CATEGORIES_FILE_PATH):
+    """
+    The sales cube of the dates [start, end] from a memory-mapped sales store (see
+    sales_store.py). Only the range's rows are read from the store, and they are preprocessed
+    directly, without the preprocessed-data cache: slicing the store costs less than a cache lookup.
+    """
+    from sales_store import SalesStore
+
+    with step('store_slice') as current:
+        sales_store = SalesStore(store_dir)
+        trimmed_sales_df = sales_store.to_frame(start, None if end is None else end + pd.Timedelta(days=1))
+        current.record(trimmed_sales_df)
+    if sales_store.is_stale():
+        print(f"Warning: '{sales_store.meta['source']}' has changed since the sales store '{store_dir}' was built.")
+    print(f"--- Sliced {len(trimmed_sales_df)} rows from the sales store '{store_dir}' ---")
+    final_preprocessed_df = build_final_preprocessed_df(trimmed_sales_df, pd.read_csv(products_file_path, dtype=PRODUCTS_DTYPES),
+                                                        pd.read_csv(categories_file_path, dtype=CATEGORIES_DTYPES))
+    with step('build_cube') as current:
+        cube = SalesCube.from_rows(final_preprocessed_df)
+        current.record(cube.cells)
+    return cube
+
+
+def _load_default_final_preprocessed_df(**kwargs):
+    try:
+        final_df = load_final_preprocessed_df(**kwargs)
+    except (FileNotFoundError, ImportError):
+        exit() # Scripts stop here; the error has been printed.
+
+    print("\n--- Data Preprocessing Complete ---")
+    print("Final preprocessed DataFrame (final_preprocessed_df) ready for analysis.")
+    print("\nFirst 5 rows of final_preprocessed_df:")
+    print(final_df.head())
+    print("\nInformation about final_preprocessed_df:")
+    print(final_df.info())
+    return final_df
+
+
+def __getattr__(name):
+    # `from column_selection import final_preprocessed_df` builds (or loads) the default month on
+    # first access only, so importing this module for its functions does no I/O.
+    if name == 'final_preprocessed_df':
+        final_df = _load_default_final_preprocessed_df()
+        globals()['final_preprocessed_df'] = final_df
+        return final_df
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Preprocess the trimmed sales data for analysis.")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print per-column memory before vs after the compact schema, and an estimate in pandas' default dtypes.")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore the preprocessed-data cache.")
+    parser.add_argument('--engine', choices=ENGINES, default=DEFAULT_ENGINE,
+                        help="Preprocessing engine: eager pandas, or a lazy out-of-core Polars/DuckDB plan (default: %(default)s).")
+    parser.add_argument('--ingest-workers', type=int,
+                        help="Parse the sales CSV in a pool of this many processes (pandas engine; default: one pd.read_csv).")
+    parser.add_argument('--memory-budget-mb', type=int, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="Memory limit of the duckdb engine, which spills to disk past it (default: %(default)s MB).")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    enable_from_args(args)
+    final_preprocessed_df = _load_default_final_preprocessed_df(use_cache=USE_PREPROCESSED_CACHE and not args.no_cache,
+                                                                memory_report=args.memory_report, engine=args.engine,
+                                                                ingest_workers=args.ingest_workers,
+                                                                memory_limit_mb=args.memory_budget_mb)
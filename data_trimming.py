@@ -1,7 +1,15 @@
+import argparse
 import pandas as pd
 from datetime import timedelta
 import calendar
 
+from instrumentation import add_profile_argument, enable_from_args, step
+from parallel_ingest import PARSERS, format_throughput, read_csv_parallel
+from preprocess_engines import DEFAULT_ENGINE, ENGINES, trim_sales_lazy
+from sales_io import (DEFAULT_MEMORY_BUDGET_MB, PARTITION_GRANULARITIES, TRIM_COLUMN_SETS, partition_sales, shift_sales_year,
+                      trim_sales_streaming)
+from sales_store import SalesStore
+
 # --- Configuration ---
 # IMPORTANT: Use the correct path to your large sales dataset file
 SALES_FILE_PATH = r'C:\Users\Pavan\Downloads\archive (1)\sales.csv' 
@@ -10,60 +18,238 @@ SALES_FILE_PATH = r'C:\Users\Pavan\Downloads\archive (1)\sales.csv'
 TARGET_YEAR = 2024
 TARGET_MONTH = 2 # February
 
-# --- Data Loading ---
-try:
-    sales_df = pd.read_csv(SALES_FILE_PATH)
-    print(f"Successfully loaded '{SALES_FILE_PATH}'. Initial dataset size: {len(sales_df)} rows.")
-except FileNotFoundError:
-    print(f"Error: The file '{SALES_FILE_PATH}' was not found. Please check the path and filename.")
-    exit()
-
-# --- Data Cleaning: Convert 'SalesDate' to datetime ---
-if 'SalesDate' in sales_df.columns:
-    initial_rows = len(sales_df)
-    sales_df.dropna(subset=['SalesDate'], inplace=True)
-    if len(sales_df) < initial_rows:
-        print(f"Removed {initial_rows - len(sales_df)} rows with missing 'SalesDate'.")
+# --- Command-line Options ---
+parser = argparse.ArgumentParser(description="Trim sales.csv down to the target month.")
+parser.add_argument('--stream', action='store_true',
+                    help="Read sales.csv in bounded chunks instead of loading the whole file into memory.")
+parser.add_argument('--memory-budget-mb', type=int, default=DEFAULT_MEMORY_BUDGET_MB,
+                    help="Approximate peak memory for --stream/--partition-dir modes; sets the chunk size (default: %(default)s MB).")
+parser.add_argument('--engine', choices=ENGINES, default=DEFAULT_ENGINE,
+                    help="Trim with eager pandas, or with a lazy, multi-threaded Polars/DuckDB query plan that "
+                         "streams sales.csv (DuckDB spills to disk past --memory-budget-mb) (default: %(default)s).")
+parser.add_argument('--workers', type=int,
+                    help="Parse sales.csv in byte ranges across this many processes, each shifting and filtering "
+                         "its own rows (pandas engine).")
+parser.add_argument('--parser', choices=PARSERS, default='c',
+                    help="CSV parser used by each --workers process (default: %(default)s).")
+parser.add_argument('--partition-dir',
+                    help="Scan sales.csv once and write every month (or day) to its own partition file in this directory.")
+parser.add_argument('--partition-by', choices=PARTITION_GRANULARITIES, default='month',
+                    help="Partition granularity for --partition-dir (default: %(default)s).")
+parser.add_argument('--store',
+                    help="Slice the period from a memory-mapped sales store (built with 'python sales_store.py build') "
+                         "instead of reading sales.csv.")
+parser.add_argument('--columns', choices=TRIM_COLUMN_SETS, default='all',
+                    help="Keep every column of sales.csv, or only the columns the analyses read (SalesDate, ProductID, "
+                         "Quantity, Discount), in every mode (default: %(default)s).")
+parser.add_argument('--from', dest='date_from', type=pd.Timestamp,
+                    help="Trim to a date range starting on this date (YYYY-MM-DD) instead of the target month; "
+                         "sales are shifted to this date's year.")
+parser.add_argument('--to', dest='date_to', type=pd.Timestamp,
+                    help="Last day (YYYY-MM-DD) of the --from date range (default: the end of the --from year).")
+add_profile_argument(parser)
+args = parser.parse_args()
+if args.date_to is not None and args.date_from is None:
+    parser.error("--to requires --from")
+enable_from_args(args)
+columns = TRIM_COLUMN_SETS[args.columns]  # None keeps every column.
 
-    sales_df['SalesDate'] = pd.to_datetime(sales_df['SalesDate'])
-    print(" 'SalesDate' column converted to datetime format.")
+if args.date_from is not None:
+    TARGET_YEAR = args.date_from.year
 
-    # --- Shift SalesDate year from 2018 to 2024 ---
-    # This assumes the original data primarily contains years around 2018.
-    # It will add 6 years to all dates to effectively shift them from 2018 to 2024.
-    sales_df['SalesDate'] = sales_df['SalesDate'] + pd.DateOffset(years=TARGET_YEAR - 2018)
-    print(f"Sales dates shifted from 2018 to {TARGET_YEAR} for analysis purposes.")
+# --- Partitioning: one scan of sales.csv for every month (or day) ---
+if args.partition_dir:
+    print(f"Partitioning '{SALES_FILE_PATH}' by {args.partition_by} into '{args.partition_dir}'.")
+    try:
+        with step('partition_sales') as current:
+            manifest = partition_sales(SALES_FILE_PATH, args.partition_dir, TARGET_YEAR,
+                                       granularity=args.partition_by, memory_budget_mb=args.memory_budget_mb,
+                                       columns=columns)
+            current.record(rows=manifest['rows_read'], partitions=len(manifest['partitions']))
+    except FileNotFoundError:
+        print(f"Error: The file '{SALES_FILE_PATH}' was not found. Please check the path and filename.")
+        exit()
 
-else:
-    print("Error: 'SalesDate' column not found in the sales data. Please check your dataset.")
+    print(f"\nScanned {manifest['rows_read']} rows into {len(manifest['partitions'])} partitions:")
+    for key, entry in manifest['partitions'].items():
+        print(f"  {key}: {entry['rows']} rows ({entry['min_date']} to {entry['max_date']}) -> {entry['path']}")
+    print(f"\nManifest saved to '{args.partition_dir}'.")
     exit()
 
-# --- Define the 1-month period based on the TARGET_YEAR and TARGET_MONTH ---
-num_days_in_month = calendar.monthrange(TARGET_YEAR, TARGET_MONTH)[1]
-start_date_of_period = pd.Timestamp(TARGET_YEAR, TARGET_MONTH, 1)
-end_date_of_period = pd.Timestamp(TARGET_YEAR, TARGET_MONTH, num_days_in_month) + timedelta(days=1)
+if args.date_from is not None:
+    # --- Define the period from --from/--to ---
+    last_day = args.date_to if args.date_to is not None else pd.Timestamp(TARGET_YEAR, 12, 31)
+    start_date_of_period = args.date_from.normalize()
+    end_date_of_period = last_day.normalize() + timedelta(days=1)
+    period_description = "the requested date range"
+    output_filename = f"trimmed_sales_{start_date_of_period:%Y%m%d}_{last_day:%Y%m%d}.csv"
+else:
+    # --- Define the 1-month period based on the TARGET_YEAR and TARGET_MONTH ---
+    num_days_in_month = calendar.monthrange(TARGET_YEAR, TARGET_MONTH)[1]
+    start_date_of_period = pd.Timestamp(TARGET_YEAR, TARGET_MONTH, 1)
+    end_date_of_period = pd.Timestamp(TARGET_YEAR, TARGET_MONTH, num_days_in_month) + timedelta(days=1)
+    period_description = "a full month period"
+    output_filename = f"trimmed_sales_feb_{TARGET_YEAR}.csv"
 
 print(f"\nTargeting data from: {start_date_of_period.strftime('%Y-%m-%d')}")
-print(f"To: {(end_date_of_period - timedelta(days=1)).strftime('%Y-%m-%d')} (a full month period).")
+print(f"To: {(end_date_of_period - timedelta(days=1)).strftime('%Y-%m-%d')} ({period_description}).")
+
+if args.store:
+    # --- Store Trim: binary search of the date-sorted store, copying only the period's rows ---
+    print(f"\nSlicing the period from the sales store '{args.store}'.")
+    try:
+        with step('store_slice') as current:
+            sales_store = SalesStore(args.store)
+            missing_columns = [] if columns is None else [col for col in columns if col not in sales_store.columns]
+            if columns is None or missing_columns:
+                print(f"Error: the sales store holds only {', '.join(sales_store.columns)}. "
+                      f"Use --columns analysis to trim those columns from it.")
+                exit()
+            trimmed_sales_df = sales_store.to_frame(start_date_of_period, end_date_of_period,
+                                                    [col for col in sales_store.columns if col in columns])
+            current.record(trimmed_sales_df)
+    except FileNotFoundError:
+        print(f"Error: '{args.store}' is not a sales store. Build it with 'python sales_store.py build'.")
+        exit()
+    if sales_store.target_year != TARGET_YEAR:
+        print(f"Error: the store's sales are shifted to {sales_store.target_year}, not {TARGET_YEAR}. "
+              f"Rebuild it with --target-year {TARGET_YEAR}.")
+        exit()
+    if sales_store.is_stale():
+        print(f"Warning: '{sales_store.meta['source']}' has changed since the store was built; rebuild it to include the changes.")
+
+    print(f"\nData trimming complete. Trimmed dataset size: {len(trimmed_sales_df)} rows for the target period.")
+    if trimmed_sales_df.empty:
+        print("No data found within the specified period. Please verify your target period, and ensure data exists for that period.")
+        exit()
+    print(f"Date range of trimmed data: {trimmed_sales_df['SalesDate'].min()} to {trimmed_sales_df['SalesDate'].max()}")
+    with step('write_csv'):
+        trimmed_sales_df.to_csv(output_filename, index=False)
+    print(f"\nTrimmed sales data saved to '{output_filename}'.")
+
+elif args.engine != 'pandas':
+    # --- Lazy Trim: one query plan reads, shifts, filters and writes the rows ---
+    print(f"\nTrimming '{SALES_FILE_PATH}' with the lazy '{args.engine}' engine.")
+    try:
+        with step('lazy_trim', engine=args.engine) as current:
+            rows_written, min_date, max_date = trim_sales_lazy(
+                args.engine, SALES_FILE_PATH, output_filename, start_date_of_period, end_date_of_period, TARGET_YEAR,
+                memory_limit_mb=args.memory_budget_mb, columns=columns,
+            )
+            current.record(rows=rows_written)
+    except ImportError as e:
+        print(f"Error: the '{args.engine}' engine is not installed ({e}). Use --engine pandas or install it.")
+        exit()
+    except FileNotFoundError:
+        print(f"Error: The file '{SALES_FILE_PATH}' was not found. Please check the path and filename.")
+        exit()
+
+    print(f"\nData trimming complete. Kept {rows_written} rows for the target period.")
+    if rows_written == 0:
+        print("No data found within the specified period. Please verify your target period, and ensure data exists for that period.")
+        exit()
+    print(f"Date range of trimmed data: {min_date} to {max_date}")
+    print(f"\nTrimmed sales data saved to '{output_filename}'.")
 
-# --- Trim the DataFrame ---
-trimmed_sales_df = sales_df[
-    (sales_df['SalesDate'] >= start_date_of_period) &
-    (sales_df['SalesDate'] < end_date_of_period)
-].copy()
+elif args.workers:
+    # --- Parallel Trim: byte ranges of sales.csv parsed, shifted and filtered in a process pool ---
+    print(f"\nParsing '{SALES_FILE_PATH}' with {args.workers} worker processes ({args.parser} parser).")
+    try:
+        with step('parallel_read_csv', workers=args.workers, parser=args.parser) as current:
+            trimmed_sales_df, ingest_stats = read_csv_parallel(
+                SALES_FILE_PATH, columns, start_date=start_date_of_period, end_date=end_date_of_period,
+                target_year=TARGET_YEAR, workers=args.workers, parser=args.parser,
+            )
+            current.record(trimmed_sales_df)
+    except FileNotFoundError:
+        print(f"Error: The file '{SALES_FILE_PATH}' was not found. Please check the path and filename.")
+        exit()
+    print(f"Ingest throughput: {format_throughput(ingest_stats)}")
 
-print(f"\nData trimming complete. Trimmed dataset size: {len(trimmed_sales_df)} rows for the target month.")
-if not trimmed_sales_df.empty:
+    print(f"\nData trimming complete. Trimmed dataset size: {len(trimmed_sales_df)} rows for the target period.")
+    if trimmed_sales_df.empty:
+        print("No data found within the specified period. Please verify your target period, and ensure data exists for that period.")
+        exit()
     print(f"Date range of trimmed data: {trimmed_sales_df['SalesDate'].min()} to {trimmed_sales_df['SalesDate'].max()}")
+    with step('write_csv'):
+        trimmed_sales_df.to_csv(output_filename, index=False)
+    print(f"\nTrimmed sales data saved to '{output_filename}'.")
+
+elif args.stream:
+    # --- Streaming Trim: parse, shift and filter one bounded chunk at a time ---
+    print(f"\nStreaming '{SALES_FILE_PATH}' with a memory budget of ~{args.memory_budget_mb} MB.")
+    try:
+        with step('streaming_trim') as current:
+            rows_read, rows_written, min_date, max_date = trim_sales_streaming(
+                SALES_FILE_PATH, output_filename, start_date_of_period, end_date_of_period, TARGET_YEAR,
+                memory_budget_mb=args.memory_budget_mb, columns=columns,
+            )
+            current.record(rows=rows_written, rows_read=rows_read)
+    except FileNotFoundError:
+        print(f"Error: The file '{SALES_FILE_PATH}' was not found. Please check the path and filename.")
+        exit()
+
+    print(f"\nData trimming complete. Scanned {rows_read} rows, kept {rows_written} rows for the target period.")
+    if rows_written == 0:
+        print("No data found within the specified period. Please verify your target period, and ensure data exists for that period.")
+        exit()
+    print(f"Date range of trimmed data: {min_date} to {max_date}")
+    print(f"\nTrimmed sales data saved to '{output_filename}'.")
+
 else:
-    print("No data found within the specified month. Please verify your target month and year, and ensure data exists for that period.")
-    exit()
+    # --- Data Loading ---
+    try:
+        with step('read_csv') as current:
+            sales_df = pd.read_csv(SALES_FILE_PATH, usecols=columns)
+            current.record(sales_df)
+        print(f"Successfully loaded '{SALES_FILE_PATH}'. Initial dataset size: {len(sales_df)} rows.")
+    except FileNotFoundError:
+        print(f"Error: The file '{SALES_FILE_PATH}' was not found. Please check the path and filename.")
+        exit()
+
+    # --- Data Cleaning: Convert 'SalesDate' to datetime ---
+    if 'SalesDate' in sales_df.columns:
+        initial_rows = len(sales_df)
+        with step('drop_missing_dates'):
+            sales_df.dropna(subset=['SalesDate'], inplace=True)
+        if len(sales_df) < initial_rows:
+            print(f"Removed {initial_rows - len(sales_df)} rows with missing 'SalesDate'.")
+
+        with step('parse_sales_dates'):
+            sales_df['SalesDate'] = pd.to_datetime(sales_df['SalesDate'])
+        print(" 'SalesDate' column converted to datetime format.")
+
+        # --- Shift SalesDate year from 2018 to 2024 ---
+        # This assumes the original data primarily contains years around 2018.
+        # It will add 6 years to all dates to effectively shift them from 2018 to 2024.
+        with step('shift_year'):
+            sales_df['SalesDate'] = shift_sales_year(sales_df['SalesDate'], TARGET_YEAR)
+        print(f"Sales dates shifted from 2018 to {TARGET_YEAR} for analysis purposes.")
+
+    else:
+        print("Error: 'SalesDate' column not found in the sales data. Please check your dataset.")
+        exit()
+
+    # --- Trim the DataFrame ---
+    with step('filter_period') as current:
+        trimmed_sales_df = sales_df[
+            (sales_df['SalesDate'] >= start_date_of_period) &
+            (sales_df['SalesDate'] < end_date_of_period)
+        ].copy()
+        current.record(trimmed_sales_df)
+
+    print(f"\nData trimming complete. Trimmed dataset size: {len(trimmed_sales_df)} rows for the target period.")
+    if not trimmed_sales_df.empty:
+        print(f"Date range of trimmed data: {trimmed_sales_df['SalesDate'].min()} to {trimmed_sales_df['SalesDate'].max()}")
+    else:
+        print("No data found within the specified period. Please verify your target period, and ensure data exists for that period.")
+        exit()
 
-# --- Save the trimmed data to a new CSV file ---
-output_filename = f"trimmed_sales_feb_{TARGET_YEAR}.csv"
-trimmed_sales_df.to_csv(output_filename, index=False)
-print(f"\nTrimmed sales data saved to '{output_filename}'.")
+    # --- Save the trimmed data to a new CSV file ---
+    with step('write_csv'):
+        trimmed_sales_df.to_csv(output_filename, index=False)
+    print(f"\nTrimmed sales data saved to '{output_filename}'.")
 
-# Display head of the saved file for verification
-print(f"\nHead of the saved '{output_filename}':")
-print(pd.read_csv(output_filename).head())
+    # Display head of the saved file for verification
+    print(f"\nHead of the saved '{output_filename}':")
+    print(pd.read_csv(output_filename).head())
@@ -0,0 +1,102 @@
+"""
+Vectorized date shifting and time-based feature extraction.
+
+Everything here works on NumPy datetime64 arrays, so there is no per-row Python call:
+year shifts clamp Feb 29 to Feb 28 instead of failing, and month/weekday names come back
+as categoricals rather than one Python string per sales row.
+"""
+import calendar
+
+import numpy as np
+import pandas as pd
+
+MONTH_NAMES = list(calendar.month_name)[1:]
+WEEKDAY_NAMES = list(calendar.day_name)
+
+MONTH_DTYPE = pd.CategoricalDtype(MONTH_NAMES, ordered=True)
+WEEKDAY_DTYPE = pd.CategoricalDtype(WEEKDAY_NAMES, ordered=True)
+
+
+def _as_datetime64(dates):
+    dates = pd.Series(dates)
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    return dates, dates.to_numpy(dtype='datetime64[ns]')
+
+
+def _rebuild_year(dates, values, new_years):
+    """Replace the year of every value, keeping month, day and time; Feb 29 becomes Feb 28 when needed."""
+    nat = np.isnat(values)
+    months = values.astype('datetime64[M]')
+    month_of_year = months.astype(np.int64) % 12
+    day_start = values.astype('datetime64[D]')
+    day_of_month = (day_start - months.astype('datetime64[D]')).astype(np.int64)
+    time_of_day = values - day_start
+
+    new_months = ((np.asarray(new_years, dtype=np.int64) - 1970) * 12 + month_of_year).astype('datetime64[M]')
+    new_month_days = ((new_months + 1).astype('datetime64[D]') - new_months.astype('datetime64[D]')).astype(np.int64)
+    shifted = (new_months.astype('datetime64[D]') + np.minimum(day_of_month, new_month_days - 1)) + time_of_day
+    shifted[nat] = np.datetime64('NaT')
+    return pd.Series(shifted, index=dates.index, name=dates.name)
+
+
+def years_of(values):
+    """Calendar year of each datetime64 value."""
+    return values.astype('datetime64[Y]').astype(np.int64) + 1970
+
+
+def shift_to_year(dates, target_year):
+    """Vectorized `date.replace(year=target_year)` that clamps Feb 29 to Feb 28 in non-leap years."""
+    dates, values = _as_datetime64(dates)
+    return _rebuild_year(dates, values, np.full(len(values), target_year))
+
+
+def add_years(dates, years):
+    """Vectorized `dates + pd.DateOffset(years=years)`."""
+    dates, values = _as_datetime64(dates)
+    if years == 0:
+        return dates
+    return _rebuild_year(dates, values, years_of(values) + years)
+
+
+def iso_week(values):
+    """ISO-8601 week number of each datetime64 value, matching `Series.dt.isocalendar().week`."""
+    days = values.astype('datetime64[D]')
+    weekday = (days.astype(np.int64) + 3) % 7  # Monday == 0; 1970-01-01 was a Thursday.
+    thursday = days - weekday + 3  # The ISO year is the year holding the Thursday of that week.
+    iso_year_start = thursday.astype('datetime64[Y]').astype('datetime64[D]')
+    return (thursday - iso_year_start).astype(np.int64) // 7 + 1
+
+
+def extract_date_features(dates):
+    """
+    SaleYear, SaleMonth, SaleWeekday and SaleWeek for every date.
+
+    SaleMonth and SaleWeekday are ordered categoricals (same labels as `dt.month_name()` /
+    `dt.day_name()`); missing dates give missing features.
+    """
+    dates, values = _as_datetime64(dates)
+    nat = np.isnat(values)
+    month_codes = values.astype('datetime64[M]').astype(np.int64) % 12
+    weekday_codes = (values.astype('datetime64[D]').astype(np.int64) + 3) % 7
+    month_codes[nat] = -1
+    weekday_codes[nat] = -1
+
+    features = pd.DataFrame({
+        'SaleYear': years_of(values).astype(np.int32),
+        'SaleMonth': pd.Categorical.from_codes(month_codes, dtype=MONTH_DTYPE),
+        'SaleWeekday': pd.Categorical.from_codes(weekday_codes, dtype=WEEKDAY_DTYPE),
+        'SaleWeek': iso_week(values),
+    }, index=dates.index)
+    if nat.any():
+        features['SaleYear'] = features['SaleYear'].astype('Int32').mask(nat)
+        features['SaleWeek'] = features['SaleWeek'].astype('Int64').mask(nat)
+    return features
+
+
+def add_date_features(df, date_column='SalesDate'):
+    """Add the SaleYear/SaleMonth/SaleWeekday/SaleWeek columns to `df` in place and return it."""
+    features = extract_date_features(df[date_column])
+    for column in features.columns:
+        df[column] = features[column]
+    return df
@@ -0,0 +1,200 @@
+"""
+On-disk cache of fitted forecast models and their forecasts.
+
+Each series is cached under a hash of its values, its dates and the forecaster configuration
+(backend, parameters, horizon), so an unchanged series returns its stored forecast without
+fitting. A series that only gained days since it was cached is found by hashing its prefixes
+(up to MAX_WARM_START_DAYS shorter) and is refitted warm from the stored model state (see
+forecasters.py). Each fit call stores its series together in one .npz file, and a JSON index
+maps every series key to its file and row; the least recently used files are evicted once the
+cache directory exceeds MAX_FORECAST_CACHE_BYTES.
+"""
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from preprocess_cache import CACHE_DIR
+
+FORECAST_CACHE_DIR = os.path.join(CACHE_DIR, 'forecasts')
+FORECAST_CACHE_VERSION = 2
+MAX_FORECAST_CACHE_BYTES = 64 * 1024 * 1024
+
+# How many newly gained days are searched for a cached shorter version of a series.
+MAX_WARM_START_DAYS = 31
+
+
+def _config_digest(forecaster, periods):
+    config = {name: np.asarray(value).tolist() for name, value in sorted(vars(forecaster).items())}
+    payload = json.dumps({'version': FORECAST_CACHE_VERSION, 'backend': forecaster.name,
+                          'config': config, 'periods': periods}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode())
+
+
+def series_keys(config_digest, y, ds=None, max_prefixes=0):
+    """
+    Cache keys of one series and of up to `max_prefixes` of its prefixes, as {length: key}.
+    Values and dates are hashed day by day, so every prefix key comes from one pass.
+    """
+    values = np.ascontiguousarray(y, dtype=np.float64).view(np.int64)
+    if ds is None:
+        days = values[:, None]
+    else:
+        days = np.column_stack([values, np.asarray(ds, dtype='datetime64[ns]').view(np.int64)])
+    n_days = len(days)
+    first = max(n_days - max_prefixes, 1)
+    digest = config_digest.copy()
+    digest.update(days[:first].tobytes())
+    keys = {first: digest.hexdigest()[:32]}
+    for length in range(first + 1, n_days + 1):
+        digest.update(days[length - 1].tobytes())
+        keys[length] = digest.hexdigest()[:32]
+    return keys
+
+
+def _index_path(cache_dir):
+    return os.path.join(cache_dir, 'index.json')
+
+
+def _load_index(cache_dir):
+    """{series key: [entry file name, row]}; empty if the cache does not exist yet."""
+    try:
+        with open(_index_path(cache_dir)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_index(index, cache_dir):
+    tmp_path = f"{_index_path(cache_dir)}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, _index_path(cache_dir))
+
+
+def _read_entries(locations, cache_dir):
+    """Read the cached rows at {row: (file name, entry row)}, opening each entry file once."""
+    by_file = {}
+    for row, (file_name, entry_row) in locations.items():
+        by_file.setdefault(file_name, []).append((row, entry_row))
+
+    results = {}
+    for file_name, rows in by_file.items():
+        path = os.path.join(cache_dir, file_name)
+        try:
+            with np.load(path) as entry:
+                arrays = {name: entry[name] for name in entry.files if name != 'keys'}
+        except (FileNotFoundError, ValueError, OSError):
+            continue
+        os.utime(path)  # Mark as recently used for eviction.
+        for row, entry_row in rows:
+            state = {name[len('state_'):]: value[entry_row] for name, value in arrays.items()
+                     if name.startswith('state_')}
+            results[row] = (arrays['yhat'][entry_row], arrays['yhat_lower'][entry_row],
+                            arrays['yhat_upper'][entry_row], state)
+    return results
+
+
+def lookup_forecasts(forecaster, Y, periods, ds=None, cache_dir=FORECAST_CACHE_DIR):
+    """
+    Look every row of Y up in the cache. Returns (keys, hits, warm_states): the cache key of
+    each row, {row: (yhat, yhat_lower, yhat_upper, state)} for unchanged series, and {row: state}
+    for series whose cached shorter version can seed a warm refit.
+    """
+    config_digest = _config_digest(forecaster, periods)
+    Y = np.asarray(Y, dtype=np.float64)
+    index = _load_index(cache_dir)
+    n_days = Y.shape[1]
+    keys, hit_locations, warm_locations = [], {}, {}
+    for row, y in enumerate(Y):
+        row_keys = series_keys(config_digest, y, ds, MAX_WARM_START_DAYS if index else 0)
+        keys.append(row_keys[n_days])
+        if row_keys[n_days] in index:
+            hit_locations[row] = index[row_keys[n_days]]
+            continue
+        for length in range(n_days - 1, min(row_keys) - 1, -1):
+            if row_keys[length] in index:
+                warm_locations[row] = index[row_keys[length]]
+                break
+
+    hits = _read_entries(hit_locations, cache_dir)
+    warm_states = {row: entry[3] for row, entry in _read_entries(warm_locations, cache_dir).items()}
+    return keys, hits, warm_states
+
+
+def store_forecasts(keys, yhat, yhat_lower, yhat_upper, states, cache_dir=FORECAST_CACHE_DIR):
+    """
+    Write the fitted series of one call to a single entry file, index them, then evict least
+    recently used entry files over the size limit.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    file_name = f"forecast_{hashlib.sha256(''.join(keys).encode()).hexdigest()[:32]}.npz"
+    path = os.path.join(cache_dir, file_name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    state = {f'state_{name}': np.stack([np.asarray(row_state[name]) for row_state in states])
+             for name in (states[0] if states else {})}
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, keys=np.array(keys), yhat=yhat, yhat_lower=yhat_lower, yhat_upper=yhat_upper, **state)
+    os.replace(tmp_path, path)
+
+    index = _load_index(cache_dir)
+    index.update({key: [file_name, row] for row, key in enumerate(keys)})
+    _save_index(evict_forecasts(cache_dir, index=index), cache_dir)
+
+
+def evict_forecasts(cache_dir=FORECAST_CACHE_DIR, max_bytes=MAX_FORECAST_CACHE_BYTES, index=None):
+    """
+    Remove the least recently used entry files until the cache fits in `max_bytes`.
+    Returns the index without the evicted (or otherwise missing) entries.
+    """
+    index = _load_index(cache_dir) if index is None else index
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, 'forecast_*.npz')):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    kept = {os.path.basename(path) for _, _, path in entries}
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        kept.discard(os.path.basename(path))
+        total -= size
+    return {key: location for key, location in index.items() if location[0] in kept}
+
+
+def cached_fit_predict(forecaster, Y, periods, ds=None, cache_dir=FORECAST_CACHE_DIR):
+    """
+    forecaster.fit_predict through the cache: unchanged series are served from disk, series that
+    gained days are refitted warm, the rest are fitted cold, and every fitted series is stored.
+    Returns (yhat, yhat_lower, yhat_upper, counts, states): counts of 'cached', 'warm' and 'cold'
+    series (warm only where the backend uses the cached state) and each series' fitted state.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    keys, hits, warm_states = lookup_forecasts(forecaster, Y, periods, ds, cache_dir)
+    shape = (len(Y), Y.shape[1] + periods)
+    yhat, yhat_lower, yhat_upper = np.empty(shape), np.empty(shape), np.empty(shape)
+    states = [None] * len(Y)
+    for row, cached in hits.items():
+        yhat[row], yhat_lower[row], yhat_upper[row], states[row] = cached
+
+    misses = [row for row in range(len(Y)) if row not in hits]
+    if misses:
+        init = [warm_states.get(row) for row in misses]
+        fitted = forecaster.fit_predict_state(Y[misses], periods, ds, init=init)
+        yhat[misses], yhat_lower[misses], yhat_upper[misses] = fitted[:3]
+        for row, state in zip(misses, fitted[3]):
+            states[row] = state
+        store_forecasts([keys[row] for row in misses], *fitted, cache_dir=cache_dir)
+
+    warm = sum(forecaster.warm_startable(state, Y.shape[1]) for state in warm_states.values())
+    counts = {'cached': len(hits), 'warm': warm, 'cold': len(misses) - warm}
+    return yhat, yhat_lower, yhat_upper, counts, states
@@ -0,0 +1,273 @@
+"""
+Pluggable forecasting backends.
+
+Every backend forecasts a whole batch of regular daily series at once:
+`fit_predict(Y, periods, ds=None)` takes an (n_series, n_days) array (and optionally the dates of
+its days, which only Prophet uses) and returns (yhat, yhat_lower, yhat_upper), each of shape
+(n_series, n_days + periods) -- in-sample fitted values followed by the forecast.
+
+`fit_predict_state(Y, periods, ds=None, init=None)` also returns each series' fitted state (a
+dict of arrays) and accepts the states of an earlier fit of the same series, so a series that
+only gained days can be refitted warm (see forecast_cache.py).
+
+The NumPy backends (seasonal naive, Holt-Winters with weekly seasonality, linear trend) fit
+thousands of series as matrix operations. Prophet is an optional backend, imported only when
+it is used.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_FORECAST_BACKEND = 'prophet'
+WEEKLY_SEASON = 7
+
+# Prophet's default uncertainty interval is 80%; the NumPy backends use the same width.
+INTERVAL_Z = 1.2816
+
+
+def _intervals(Y, fitted, forecast, horizon_scale):
+    """Intervals from the in-sample residual spread, widening with the forecast horizon."""
+    residuals = Y - fitted
+    spread = np.sqrt(np.nanmean(residuals ** 2, axis=1, keepdims=True))
+    spread = np.nan_to_num(spread)
+    yhat = np.concatenate([fitted, forecast], axis=1)
+    scale = np.concatenate([np.ones(fitted.shape[1]), horizon_scale])
+    width = INTERVAL_Z * spread * scale
+    return np.nan_to_num(yhat), np.nan_to_num(yhat - width), np.nan_to_num(yhat + width)
+
+
+class Forecaster:
+    """Base class: backends implement fit_predict_state; those without a warm start ignore `init`."""
+
+    name = None
+
+    def fit_predict(self, Y, periods, ds=None):
+        yhat, yhat_lower, yhat_upper, _ = self.fit_predict_state(Y, periods, ds)
+        return yhat, yhat_lower, yhat_upper
+
+    def fit_predict_state(self, Y, periods, ds=None, init=None):
+        raise NotImplementedError
+
+    def warm_startable(self, state, n_days):
+        """True if fit_predict_state refits a series of `n_days` days warm from `state`, instead of cold."""
+        return False
+
+
+class SeasonalNaiveForecaster(Forecaster):
+    """Each future day repeats the value from one season (a week) earlier."""
+
+    name = 'seasonal_naive'
+
+    def __init__(self, season=WEEKLY_SEASON):
+        self.season = season
+
+    def fit_predict_state(self, Y, periods, ds=None, init=None):
+        Y = np.asarray(Y, dtype=float)
+        n_days = Y.shape[1]
+        if n_days < self.season:
+            raise ValueError(f"seasonal naive needs at least {self.season} days, got {n_days}")
+        fitted = np.full_like(Y, np.nan)
+        fitted[:, self.season:] = Y[:, :-self.season]
+        last_season = Y[:, -self.season:]
+        steps = np.arange(periods)
+        forecast = last_season[:, steps % self.season]
+        horizon_scale = np.sqrt(steps // self.season + 1)
+        return (*_intervals(Y, fitted, forecast, horizon_scale), [{} for _ in Y])
+
+
+class LinearTrendForecaster(Forecaster):
+    """Ordinary least-squares line per series, solved for all series at once."""
+
+    name = 'linear_trend'
+
+    def fit_predict_state(self, Y, periods, ds=None, init=None):
+        Y = np.asarray(Y, dtype=float)
+        t = np.arange(Y.shape[1], dtype=float)
+        t_mean = t.mean()
+        y_mean = Y.mean(axis=1, keepdims=True)
+        denominator = ((t - t_mean) ** 2).sum()
+        slope = ((Y - y_mean) * (t - t_mean)).sum(axis=1, keepdims=True) / denominator if denominator else 0.0
+        intercept = y_mean - slope * t_mean
+
+        fitted = intercept + slope * t
+        future_t = np.arange(Y.shape[1], Y.shape[1] + periods, dtype=float)
+        forecast = intercept + slope * future_t
+        horizon_scale = np.ones(periods)
+        return (*_intervals(Y, fitted, forecast, horizon_scale), [{} for _ in Y])
+
+
+class HoltWintersForecaster(Forecaster):
+    """
+    Additive Holt-Winters (level, trend, weekly seasonality).
+
+    The smoothing parameters are chosen per series from a small grid by one-step-ahead squared
+    error. Every series x parameter combination is smoothed together, so the only Python loop is
+    over days. A warm refit keeps each series' parameters and smooths only the new days,
+    starting from the stored level, trend and seasonal state.
+    """
+
+    name = 'holt_winters'
+
+    def __init__(self, season=WEEKLY_SEASON, alphas=(0.1, 0.3, 0.5), betas=(0.0, 0.05, 0.2),
+                 gammas=(0.05, 0.2, 0.4)):
+        self.season = season
+        self.grid = np.array(list(itertools.product(alphas, betas, gammas)))
+
+    def _initial_state(self, Y):
+        season = self.season
+        level = Y[:, :season].mean(axis=1)
+        if Y.shape[1] >= 2 * season:
+            trend = (Y[:, season:2 * season].mean(axis=1) - level) / season
+        else:
+            trend = np.zeros(len(Y))
+        return level, trend, Y[:, :season] - level[:, None]
+
+    def warm_startable(self, state, n_days):
+        return state is not None and 'level' in state and self.season <= int(state['n_days']) <= n_days
+
+    def _smooth(self, Y, alpha, beta, gamma, level, trend, seasonal, first_day=0):
+        """Smooth days first_day.. of Y from the given state; returns (fitted, level, trend, seasonal)."""
+        seasonal = seasonal.copy()
+        fitted = np.empty((len(Y), Y.shape[1] - first_day))
+        for t in range(first_day, Y.shape[1]):
+            position = t % self.season
+            fitted[:, t - first_day] = level + trend + seasonal[:, position]
+            previous_level = level
+            level = alpha * (Y[:, t] - seasonal[:, position]) + (1 - alpha) * (level + trend)
+            trend = beta * (level - previous_level) + (1 - beta) * trend
+            seasonal[:, position] = gamma * (Y[:, t] - level) + (1 - gamma) * seasonal[:, position]
+        return fitted, level, trend, seasonal
+
+    def _fit_cold(self, Y):
+        """Smooth every (series, parameter set) pair in one stacked batch and keep each series' best."""
+        n_series = len(Y)
+        n_grid = len(self.grid)
+        stacked = np.repeat(Y, n_grid, axis=0)
+        alpha, beta, gamma = (np.tile(self.grid[:, i], n_series) for i in range(3))
+        fitted, level, trend, seasonal = self._smooth(stacked, alpha, beta, gamma, *self._initial_state(stacked))
+
+        errors = ((stacked[:, self.season:] - fitted[:, self.season:]) ** 2).mean(axis=1).reshape(n_series, n_grid)
+        best = np.arange(n_series) * n_grid + errors.argmin(axis=1)
+        return alpha[best], beta[best], gamma[best], fitted[best], level[best], trend[best], seasonal[best]
+
+    def _fit_warm(self, Y, states):
+        """Continue smoothing series that share the same number of previously fitted days."""
+        first_day = int(states[0]['n_days'])
+        alpha, beta, gamma, level, trend = (np.array([state[key] for state in states], dtype=float)
+                                            for key in ('alpha', 'beta', 'gamma', 'level', 'trend'))
+        seasonal = np.stack([state['seasonal'] for state in states])
+        fitted_new, level, trend, seasonal = self._smooth(Y, alpha, beta, gamma, level, trend, seasonal, first_day)
+        fitted = np.concatenate([np.stack([state['fitted'] for state in states]), fitted_new], axis=1)
+        return alpha, beta, gamma, fitted, level, trend, seasonal
+
+    def fit_predict_state(self, Y, periods, ds=None, init=None):
+        Y = np.asarray(Y, dtype=float)
+        n_series, n_days = Y.shape
+        if n_days < self.season + 1:
+            raise ValueError(f"Holt-Winters needs at least {self.season + 1} days, got {n_days}")
+
+        # Group rows by how they are fitted: cold, or warm from a state covering n_days_before days.
+        init = init or [None] * n_series
+        groups = {}
+        for row, state in enumerate(init):
+            groups.setdefault(int(state['n_days']) if self.warm_startable(state, n_days) else None, []).append(row)
+
+        fit = [np.empty(n_series) for _ in range(3)] + [np.empty((n_series, n_days))] + \
+              [np.empty(n_series), np.empty(n_series), np.empty((n_series, self.season))]
+        for n_days_before, rows in groups.items():
+            if n_days_before is None:
+                parts = self._fit_cold(Y[rows])
+            else:
+                parts = self._fit_warm(Y[rows], [init[row] for row in rows])
+            for target, part in zip(fit, parts):
+                target[rows] = part
+        alpha, beta, gamma, fitted, level, trend, seasonal = fit
+
+        steps = np.arange(1, periods + 1)
+        season_positions = (n_days + steps - 1) % self.season
+        forecast = level[:, None] + trend[:, None] * steps + seasonal[:, season_positions]
+        horizon_scale = np.sqrt(1 + (steps - 1) / self.season)
+        states = [{'n_days': n_days, 'alpha': alpha[i], 'beta': beta[i], 'gamma': gamma[i], 'level': level[i],
+                   'trend': trend[i], 'seasonal': seasonal[i], 'fitted': fitted[i]} for i in range(n_series)]
+        return (*_intervals(Y, fitted, forecast, horizon_scale), states)
+
+
+class ProphetForecaster(Forecaster):
+    """
+    Prophet, fitted one series at a time. Imported lazily: it pulls in the Stan backend.
+    A warm refit starts Stan's optimizer from the previous fit's parameters. The state also keeps
+    the forecast's components (see forecast_components), so a cached forecast can still chart them.
+    """
+
+    name = 'prophet'
+    STATE_PARAMS = ('k', 'm', 'sigma_obs', 'delta', 'beta')
+    COMPONENTS = ('trend', 'yearly', 'weekly', 'daily')
+
+    def __init__(self, seasonality_mode='additive', daily_seasonality=True, start_date='2000-01-01'):
+        self.params = {'seasonality_mode': seasonality_mode, 'daily_seasonality': daily_seasonality}
+        self.start_date = start_date
+
+    @staticmethod
+    def _warm_start_init(model, state, n_rows):
+        """Stan initial values from a previous fit, dropping `delta` if the changepoint count changed."""
+        init = {name: state[name] for name in ProphetForecaster.STATE_PARAMS if name in state}
+        history_size = int(np.floor(n_rows * model.changepoint_range))
+        n_changepoints = min(model.n_changepoints, history_size - 1)
+        if 'delta' in init and np.size(init['delta']) != max(n_changepoints, 1):
+            del init['delta']
+        return {name: value.tolist() if isinstance(value, np.ndarray) else float(value)
+                for name, value in init.items()}
+
+    def warm_startable(self, state, n_days):
+        return state is not None and any(name in state for name in self.STATE_PARAMS)
+
+    def fit_predict_state(self, Y, periods, ds=None, init=None):
+        import logging
+        logging.getLogger('prophet').setLevel(logging.WARNING)
+        logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+        from prophet import Prophet
+
+        Y = np.asarray(Y, dtype=float)
+        if ds is None:
+            ds = pd.date_range(self.start_date, periods=Y.shape[1], freq='D')
+        init = init or [None] * len(Y)
+        outputs, states = [], []
+        for y, state in zip(Y, init):
+            model = Prophet(**self.params)
+            history = pd.DataFrame({'ds': ds, 'y': y})
+            if self.warm_startable(state, len(history)):
+                model.fit(history, init=self._warm_start_init(model, state, len(history)))
+            else:
+                model.fit(history)
+            forecast = model.predict(model.make_future_dataframe(periods=periods, include_history=True))
+            outputs.append(forecast[['yhat', 'yhat_lower', 'yhat_upper']].to_numpy().T)
+            states.append({name: np.asarray(model.params[name][0]).squeeze() for name in self.STATE_PARAMS})
+            states[-1].update({f'component_{column}': forecast[column].to_numpy(np.float64)
+                               for column in self.COMPONENTS if column in forecast.columns})
+        stacked = np.stack(outputs) if outputs else np.empty((0, 3, Y.shape[1] + periods))
+        return stacked[:, 0], stacked[:, 1], stacked[:, 2], states
+
+
+FORECASTERS = {
+    forecaster.name: forecaster
+    for forecaster in (ProphetForecaster, HoltWintersForecaster, SeasonalNaiveForecaster, LinearTrendForecaster)
+}
+
+
+def forecast_components(state):
+    """The forecast components (Prophet's trend and seasonalities) kept in a fitted state, as {column: values}."""
+    return {name[len('component_'):]: value for name, value in (state or {}).items() if name.startswith('component_')}
+
+
+def get_forecaster(name=DEFAULT_FORECAST_BACKEND, **params):
+    if name not in FORECASTERS:
+        raise ValueError(f"unknown forecasting backend {name!r}; choose from {list(FORECASTERS)}")
+    return FORECASTERS[name](**params)
+
+
+def forecast_frame(ds, yhat, yhat_lower, yhat_upper, periods):
+    """One series' output as a Prophet-style DataFrame (ds, yhat, yhat_lower, yhat_upper)."""
+    ds = pd.DatetimeIndex(ds)
+    all_ds = ds.append(pd.date_range(ds[-1] + pd.Timedelta(days=1), periods=periods, freq='D'))
+    return pd.DataFrame({'ds': all_ds, 'yhat': yhat, 'yhat_lower': yhat_lower, 'yhat_upper': yhat_upper})
@@ -0,0 +1,135 @@
+"""
+Synthetic sales.csv at any scale, for benchmarks.
+
+    python generate_sales.py synthetic_sales.csv --rows 1000000 [--seed 0] [--products products.csv]
+
+Writes the raw sales.csv schema read by data_trimming.py (SalesID, SalesPersonID, CustomerID,
+ProductID, Quantity, Discount, TotalPrice, SalesDate, TransactionNumber). Values follow the
+ranges of the real file:
+- ProductID is drawn from the ProductIDs in products.csv, uniformly or skewed by `--skew`.
+- Quantity is 1-25 and Discount is 0, 0.1 or 0.2. TotalPrice is 0, since it is recalculated
+  downstream.
+- SalesDate has millisecond times between 2018-01-01 and 2018-05-09, and about 1% is missing.
+
+Rows are generated and written in fixed-size chunks, so 10^8 rows need the memory of one chunk.
+The output depends only on the row count, seed and products. With pyarrow installed the chunks
+are written with its CSV writer; otherwise pandas is used.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from schema import PRODUCTS_DTYPES
+
+SALES_CSV_COLUMNS = ['SalesID', 'SalesPersonID', 'CustomerID', 'ProductID', 'Quantity', 'Discount', 'TotalPrice',
+                     'SalesDate', 'TransactionNumber']
+
+# Ranges of the real sales.csv.
+FIRST_SALE = pd.Timestamp('2018-01-01')
+LAST_SALE = pd.Timestamp('2018-05-09 23:59:59.999')
+SALES_PEOPLE = 23
+CUSTOMERS = 98759
+MAX_QUANTITY = 25
+DISCOUNTS = np.array([0.0, 0.1, 0.2])
+MISSING_DATE_FRACTION = 0.01
+
+# Rows per generated chunk; fixed so that the output does not depend on memory settings.
+CHUNK_ROWS = 1_000_000
+
+
+def product_weights(n_products, skew):
+    """Sale probability per product: uniform for skew 0, Zipf-like (rank ** -skew) otherwise."""
+    weights = np.arange(1, n_products + 1, dtype=np.float64) ** -skew
+    return weights / weights.sum()
+
+
+def generate_chunk(first_sales_id, n_rows, product_ids, weights, seed):
+    """One chunk of synthetic sales as a dict of NumPy arrays (SalesDate as datetime64[ms], NaT if missing)."""
+    rng = np.random.default_rng([seed, first_sales_id])
+    span_ms = int((LAST_SALE - FIRST_SALE) / pd.Timedelta(milliseconds=1))
+    sales_dates = np.datetime64(FIRST_SALE, 'ms') + rng.integers(0, span_ms + 1, n_rows).astype('timedelta64[ms]')
+    sales_dates[rng.random(n_rows) < MISSING_DATE_FRACTION] = np.datetime64('NaT')
+    sales_ids = np.arange(first_sales_id, first_sales_id + n_rows, dtype=np.int64)
+    return {
+        'SalesID': sales_ids,
+        'SalesPersonID': rng.integers(1, SALES_PEOPLE + 1, n_rows),
+        'CustomerID': rng.integers(1, CUSTOMERS + 1, n_rows),
+        'ProductID': rng.choice(product_ids, n_rows, p=weights),
+        'Quantity': rng.integers(1, MAX_QUANTITY + 1, n_rows),
+        'Discount': rng.choice(DISCOUNTS, n_rows),
+        'TotalPrice': np.zeros(n_rows),
+        'SalesDate': sales_dates,
+        'TransactionNumber': sales_ids - 1,  # Written as 'T<n>'.
+    }
+
+
+def _write_chunk_arrow(columns, f):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+
+    arrays = {name: pa.array(values) for name, values in columns.items() if name != 'SalesDate'}
+    arrays['SalesDate'] = pa.array(columns['SalesDate'], type=pa.timestamp('ms'),
+                                   mask=np.isnat(columns['SalesDate']))
+    arrays['TransactionNumber'] = pc.binary_join_element_wise(
+        'T', pc.cast(arrays['TransactionNumber'], pa.string()), '')
+    table = pa.table([arrays[name] for name in SALES_CSV_COLUMNS], names=SALES_CSV_COLUMNS)
+    pa_csv.write_csv(table, f, pa_csv.WriteOptions(include_header=False, quoting_style='none'))
+
+
+def _write_chunk_pandas(columns, f):
+    chunk = pd.DataFrame(columns)[SALES_CSV_COLUMNS]
+    chunk['TransactionNumber'] = 'T' + chunk['TransactionNumber'].astype(str)
+    chunk.to_csv(f, header=False, index=False, date_format='%Y-%m-%d %H:%M:%S.%f')
+
+
+def generate_sales_csv(output_filename, n_rows, product_ids, seed=0, skew=0.0):
+    """Write `n_rows` synthetic sales to `output_filename`; returns (rows, bytes, seconds)."""
+    try:
+        import pyarrow.csv  # noqa: F401
+        write_chunk = _write_chunk_arrow
+    except ImportError:
+        write_chunk = _write_chunk_pandas
+
+    product_ids = np.sort(np.asarray(product_ids, dtype=np.int64))
+    weights = product_weights(len(product_ids), skew)
+    start = time.perf_counter()
+    with open(output_filename, 'wb') as f:
+        f.write((','.join(SALES_CSV_COLUMNS) + '\n').encode())
+        for first_row in range(0, n_rows, CHUNK_ROWS):
+            columns = generate_chunk(first_row + 1, min(CHUNK_ROWS, n_rows - first_row), product_ids, weights, seed)
+            write_chunk(columns, f)
+    return n_rows, os.path.getsize(output_filename), time.perf_counter() - start
+
+
+def read_product_ids(products_file_path):
+    return pd.read_csv(products_file_path, usecols=['ProductID'], dtype=PRODUCTS_DTYPES)['ProductID'].to_numpy()
+
+
+def parse_row_count(value):
+    """Row counts such as 100000, 1e6 or 1_000_000."""
+    return int(float(value.replace('_', '')))
+
+
+def main():
+    from column_selection import PRODUCTS_FILE_PATH
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic sales.csv.")
+    parser.add_argument('output', help="CSV file to write.")
+    parser.add_argument('--rows', type=parse_row_count, default=1_000_000, help="Rows to generate, e.g. 1e6 (default: %(default)s).")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: %(default)s).")
+    parser.add_argument('--skew', type=float, default=0.0,
+                        help="Product popularity skew: 0 is uniform, 1 is Zipf-like (default: %(default)s).")
+    parser.add_argument('--products', default=PRODUCTS_FILE_PATH, help="products.csv to draw ProductIDs from.")
+    args = parser.parse_args()
+
+    rows, size, seconds = generate_sales_csv(args.output, args.rows, read_product_ids(args.products), args.seed,
+                                             args.skew)
+    print(f"Wrote {rows:,} rows ({size / 1e6:,.1f} MB) to '{args.output}' in {seconds:.2f}s.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Per-step timing and memory instrumentation.
+
+Wrap a step in `with step('read_csv') as s: ...` (optionally `s.record(df)` for its output), or
+decorate a function with @instrumented('abc'). While instrumentation is enabled, each step
+records:
+- wall time and process CPU time;
+- the process's peak RSS when the step ends (a step that raised the high-water mark shows it);
+- rows and in-memory bytes of the recorded DataFrame, Series, SalesCube or array. These are
+  measured after the step's clock has stopped.
+
+Steps nest per thread, and each record carries its depth and parent step. print_summary() prints them as a
+table, and with a JSON lines file every record is also appended as it finishes. CPU time is
+process-wide, so steps that run at the same time (bdm's concurrent stages) count each other's
+CPU.
+
+When disabled (the default), step() returns a shared no-op object and @instrumented calls the
+function directly, so the cost is one flag check per step. Enable it with enable(), with
+`--profile [FILE.jsonl]` on bdm, column_selection.py and data_trimming.py, or for any script by
+setting BDM_PROFILE=1 (or BDM_PROFILE=<file.jsonl>) in the environment.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+PROFILE_ENV_VAR = 'BDM_PROFILE'
+
+_enabled = False
+_jsonl_path = None
+_jsonl_file = None
+_records = []
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _peak_rss_bytes():
+    """The process's peak resident set size so far, or None where it cannot be read."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return getattr(psutil.Process().memory_info(), 'peak_wset', None)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, KiB elsewhere
+
+
+def _measure(obj):
+    """(rows, bytes) of a DataFrame/Series, SalesCube (its cells), array, or a tuple/list of them."""
+    if isinstance(obj, (tuple, list)):
+        sizes = [size for size in map(_measure, obj) if size is not None]
+        return (sum(rows for rows, _ in sizes), sum(nbytes for _, nbytes in sizes)) if sizes else None
+    if hasattr(obj, 'cells'):
+        obj = obj.cells
+    if hasattr(obj, 'memory_usage'):
+        usage = obj.memory_usage(deep=True)
+        return len(obj), int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if hasattr(obj, 'nbytes') and hasattr(obj, '__len__'):
+        return len(obj), int(obj.nbytes)
+    return None
+
+
+class _NullStep:
+    """Stand-in for a step while instrumentation is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def record(self, obj=None, **fields):
+        pass
+
+
+_NULL_STEP = _NullStep()
+
+
+class _Step:
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.output = None
+
+    def record(self, obj=None, **fields):
+        """Measure `obj` (rows, bytes) when the step ends, and/or attach extra fields to its record."""
+        if obj is not None:
+            self.output = obj
+        self.fields.update(fields)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.depth = len(stack)
+        self.parent = stack[-1].name if stack else None
+        self.started = time.time()
+        self.root_started = stack[0].started if stack else self.started
+        stack.append(self)
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        _local.stack.pop()
+
+        peak_rss = _peak_rss_bytes()
+        size = _measure(self.output) if self.output is not None else None
+        record = {
+            'step': self.name,
+            'depth': self.depth,
+            'parent': self.parent,
+            'started': round(self.started, 6),
+            'root_started': round(self.root_started, 6),
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'peak_rss_mb': round(peak_rss / 2**20, 1) if peak_rss is not None else None,
+            'rows': size[0] if size else None,
+            'bytes': size[1] if size else None,
+            'status': 'failed' if exc_type else 'ok',
+            'pid': os.getpid(),
+            **self.fields,
+        }
+        _add_record(record)
+        return False
+
+
+def _add_record(record):
+    global _jsonl_file
+    with _lock:
+        _records.append(record)
+        if _jsonl_path is not None:
+            if _jsonl_file is None:
+                _jsonl_file = open(_jsonl_path, 'a', encoding='utf-8')
+            _jsonl_file.write(json.dumps(record, default=str) + '\n')
+            _jsonl_file.flush()  # Keep the records of a run that stops part-way.
+
+
+def step(name, **fields):
+    """Context manager timing one step; extra `fields` are added to its record."""
+    if not _enabled:
+        return _NULL_STEP
+    return _Step(name, fields)
+
+
+def instrumented(name):
+    """Decorator recording each call as a step; the return value is measured as the step's output."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Step(name, {}) as current:
+                result = function(*args, **kwargs)
+                current.record(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def enable(jsonl_path=None, summary_at_exit=True):
+    """Start recording steps; append them to `jsonl_path` too if given, and print the summary at exit."""
+    global _enabled, _jsonl_path
+    _enabled = True
+    _jsonl_path = jsonl_path
+    if summary_at_exit:
+        atexit.unregister(print_summary)
+        atexit.register(print_summary)
+
+
+def disable():
+    global _enabled, _jsonl_path, _jsonl_file
+    _enabled = False
+    with _lock:
+        if _jsonl_file is not None:
+            _jsonl_file.close()
+        _jsonl_path = _jsonl_file = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def records():
+    """The steps recorded so far, in the order they finished."""
+    with _lock:
+        return list(_records)
+
+
+def print_summary(step_records=None):
+    step_records = records() if step_records is None else step_records
+    if not step_records:
+        return
+    print("\n--- Instrumentation Summary ---")
+    print(f"{'step':<36}{'wall (s)':>10}{'cpu (s)':>10}{'peak RSS (MB)':>15}{'rows':>12}{'MB':>10}")
+    # Nested steps finish before their parent: list each top-level step (in start order) followed
+    # by its own nested steps, even when concurrent steps interleave.
+    for record in sorted(step_records, key=lambda r: (r['pid'], r['root_started'], r['started'])):
+        name = '  ' * record['depth'] + record['step'] + (' (failed)' if record['status'] != 'ok' else '')
+        peak = f"{record['peak_rss_mb']:,.1f}" if record['peak_rss_mb'] is not None else '-'
+        rows = f"{record['rows']:,}" if record['rows'] is not None else '-'
+        megabytes = f"{record['bytes'] / 2**20:,.1f}" if record['bytes'] is not None else '-'
+        print(f"{name:<36}{record['wall_s']:>10.3f}{record['cpu_s']:>10.3f}{peak:>15}{rows:>12}{megabytes:>10}")
+
+
+def add_profile_argument(parser):
+    """The --profile [FILE.jsonl] option shared by the command-line scripts."""
+    parser.add_argument('--profile', nargs='?', const=True, metavar='FILE.jsonl',
+                        help="Record wall/CPU time, peak RSS and rows/bytes per step and print a summary; "
+                             "with a file, also append the records to it as JSON lines.")
+
+
+def enable_from_args(args):
+    if getattr(args, 'profile', None):
+        enable(None if args.profile is True else args.profile)
+
+
+_env_setting = os.environ.get(PROFILE_ENV_VAR, '')
+if _env_setting and _env_setting.lower() not in ('0', 'false', 'no'):
+    enable(None if _env_setting.lower() in ('1', 'true', 'yes') else _env_setting)
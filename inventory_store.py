@@ -0,0 +1,129 @@
+"""
+Inventory snapshot store and inventory turnover.
+
+Snapshots are stock levels per ProductID on given dates (daily, weekly or once per period),
+read from CSV or Parquet with the columns in INVENTORY_COLUMNS. The store indexes them as a
+dense ProductID x day matrix of stock on hand, like product_lookup.py's ProductID-indexed
+table: row position is the ProductID and column position is the day offset, and each day
+carries the latest snapshot on or before it. A daily year of every product is a few hundred
+thousand floats, and any period is a column slice of that matrix.
+
+Turnover is computed for all products of a period at once: average inventory is the mean
+daily stock over the period, valued at the same cost basis as the COGS (see
+inventory_turnover_ratio_analysis.py); turnover is COGS / average inventory, and days of
+inventory is the number of days in the period divided by the turnover.
+"""
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from sales_cube import aggregate
+from schema import as_float64
+
+INVENTORY_COLUMNS = ['ProductID', 'SnapshotDate', 'StockQuantity']
+
+
+def read_inventory_snapshots(path):
+    """Read snapshots from a .parquet file or a CSV; returns the INVENTORY_COLUMNS with SnapshotDate as days."""
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        snapshots = pd.read_parquet(path, columns=INVENTORY_COLUMNS)
+    else:
+        snapshots = pd.read_csv(path, usecols=INVENTORY_COLUMNS)
+    snapshots['SnapshotDate'] = pd.to_datetime(snapshots['SnapshotDate']).dt.normalize()
+    return snapshots
+
+
+class InventoryStore:
+    """Stock on hand per ProductID and day, forward-filled from the snapshots."""
+
+    def __init__(self, snapshots):
+        snapshots = snapshots.dropna(subset=INVENTORY_COLUMNS)
+        if snapshots.empty:
+            raise ValueError("no inventory snapshots to index")
+        product_ids = snapshots['ProductID'].to_numpy(np.int64)
+        days = snapshots['SnapshotDate'].to_numpy('datetime64[D]')
+        self.first_day = days.min()
+        n_days = int((days.max() - self.first_day).astype(np.int64)) + 1
+
+        # Later rows win when a product has several snapshots on one day.
+        stock = np.full((int(product_ids.max()) + 1, n_days), np.nan)
+        stock[product_ids, (days - self.first_day).astype(np.int64)] = snapshots['StockQuantity'].to_numpy(np.float64)
+
+        # Forward-fill along days: each day takes the column of the latest snapshot so far
+        # (column 0, still NaN, until the product's first snapshot).
+        has_snapshot = ~np.isnan(stock)
+        latest = np.where(has_snapshot, np.arange(n_days), 0)
+        np.maximum.accumulate(latest, axis=1, out=latest)
+        self.stock = np.take_along_axis(stock, latest, axis=1)
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(read_inventory_snapshots(path))
+
+    @property
+    def last_day(self):
+        return self.first_day + np.timedelta64(self.stock.shape[1] - 1, 'D')
+
+    def levels(self, product_ids, start, end):
+        """Stock per day in [start, end] for each product, as (len(product_ids), days); NaN where unknown."""
+        start, end = np.datetime64(pd.Timestamp(start).date()), np.datetime64(pd.Timestamp(end).date())
+        days = np.arange(start, end + np.timedelta64(1, 'D'), dtype='datetime64[D]')
+        columns = (days - self.first_day).astype(np.int64)
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        rows = np.clip(product_ids, 0, len(self.stock) - 1)
+        in_store = (product_ids >= 0) & (product_ids < len(self.stock))
+        levels = self.stock[np.ix_(rows, np.clip(columns, 0, self.stock.shape[1] - 1))]
+        # Days after the last snapshot keep its level; days before the first have none.
+        levels[:, columns < 0] = np.nan
+        levels[~in_store] = np.nan
+        return levels
+
+    def average_inventory(self, product_ids, start, end):
+        """(beginning, ending, average) units on hand per product over [start, end]."""
+        levels = self.levels(product_ids, start, end)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # Products without any stock level average to NaN.
+            average = np.nanmean(levels, axis=1)
+        return levels[:, 0], levels[:, -1], average
+
+
+def inventory_turnover(data, store, cogs_percentage, start=None, end=None):
+    """
+    Turnover per product and per category over [start, end] (default: the days covered by the
+    sales data), from a SalesCube or preprocessed rows and an InventoryStore.
+
+    COGS is TotalPrice x `cogs_percentage`, and inventory is valued at Price x `cogs_percentage`
+    per unit, so both sides use the same cost basis. Returns (by_product, by_category) DataFrames
+    with COGS, BeginningInventory, EndingInventory, AverageInventory (values), TurnoverRatio and
+    DaysOfInventory; category totals cover only the products that have inventory data.
+    """
+    if start is None or end is None:
+        days = aggregate(data, ['SalesDay'], ['TotalPrice'])['SalesDay']
+        start = days.min() if start is None else start
+        end = days.max() if end is None else end
+    period_days = (pd.Timestamp(end).normalize() - pd.Timestamp(start).normalize()).days + 1
+
+    products = aggregate(data, ['ProductID', 'ProductName', 'CategoryName', 'Price'], ['TotalPrice'])
+    unit_cost = as_float64(products['Price']).to_numpy() * cogs_percentage
+    beginning, ending, average = store.average_inventory(products['ProductID'], start, end)
+    by_product = pd.DataFrame({
+        'ProductID': products['ProductID'],
+        'ProductName': products['ProductName'],
+        'CategoryName': products['CategoryName'],
+        'COGS': products['TotalPrice'].to_numpy(np.float64) * cogs_percentage,
+        'BeginningInventory': beginning * unit_cost,
+        'EndingInventory': ending * unit_cost,
+        'AverageInventory': average * unit_cost,
+    })
+    by_category = (by_product[by_product['AverageInventory'].notna()]
+                   .groupby('CategoryName', observed=True)[['COGS', 'BeginningInventory', 'EndingInventory',
+                                                            'AverageInventory']].sum().reset_index())
+    for table in (by_product, by_category):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table['TurnoverRatio'] = table['COGS'] / table['AverageInventory']
+            table['DaysOfInventory'] = period_days / table['TurnoverRatio']
+    by_product = by_product.sort_values('TurnoverRatio', ascending=False, na_position='last').reset_index(drop=True)
+    by_category = by_category.sort_values('TurnoverRatio', ascending=False).reset_index(drop=True)
+    return by_product, by_category
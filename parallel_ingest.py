@@ -0,0 +1,130 @@
+"""
+Parallel CSV ingestion: one file parsed by many processes.
+
+pd.read_csv parses on one core. Here the file is split into byte ranges that start and end on
+line boundaries, and a process pool parses the ranges with the C or pyarrow parser. Each worker
+parses only the requested columns with compact dtypes, then applies the year shift and the date
+filter, so only the rows that are kept travel back. The workers return Arrow tables (DataFrames
+without pyarrow). These are copied by the pickling that sends them to the parent, then once more
+by to_pandas() and the final astype to the compact dtypes. Only pa.concat_tables itself avoids a
+copy, since it just collects the chunks.
+
+The pool only pays off when parsing dominates. That needs several free cores, and files large
+enough that each worker parses many ranges. Each worker costs a process start-up, and each row
+kept costs the copies above. On a single core it is slower than one pd.read_csv: 0.6x with 2
+workers on the 200k-row sample. `python benchmark_ingest.py` measures it on a given machine.
+
+Rows come back in file order. The split assumes no quoted field spans a line break, which holds
+for sales.csv and the trimmed/partitioned files written from it.
+"""
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from sales_io import SALES_DTYPES, shift_sales_year
+
+PARSERS = ('c', 'pyarrow')
+
+# Bytes of CSV text per task: enough to amortize the task overhead, small enough that several
+# tasks per worker balance the load and that a worker's text, parsed columns and mask stay bounded.
+DEFAULT_RANGE_MB = 32
+
+
+def byte_ranges(path, n_ranges):
+    """
+    Split the data lines of a CSV into up to `n_ranges` (start, end) byte ranges that begin
+    and end on line boundaries. Returns (header_bytes, ranges).
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        body_start = f.tell()
+        bounds = [body_start]
+        step = max((size - body_start) // max(n_ranges, 1), 1)
+        for target in range(body_start + step, size, step):
+            if target <= bounds[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()  # Finish the line the target falls in (or the one ending at it).
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+    return header, ranges
+
+
+def _parse_range(path, header, start, end, columns, parser, start_date, end_date, target_year):
+    """Worker: parse one byte range, shift and filter its dates, and return an Arrow table (or DataFrame)."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    dtypes = {col: SALES_DTYPES[col] for col in columns if col in SALES_DTYPES}
+    if parser == 'pyarrow' and 'SalesDate' in columns:
+        dtypes['SalesDate'] = 'str'  # Parsed below, as with the C parser (pyarrow would pick its own resolution).
+    chunk = pd.read_csv(io.BytesIO(header + data), usecols=columns, dtype=dtypes, engine=parser)[columns]
+    if 'SalesDate' in chunk.columns:
+        chunk['SalesDate'] = pd.to_datetime(chunk['SalesDate'], errors='coerce')
+        chunk = chunk.dropna(subset=['SalesDate'])
+        if target_year is not None:
+            chunk['SalesDate'] = shift_sales_year(chunk['SalesDate'], target_year)
+        if start_date is not None:
+            chunk = chunk[chunk['SalesDate'] >= start_date]
+        if end_date is not None:
+            chunk = chunk[chunk['SalesDate'] < end_date]
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return chunk.reset_index(drop=True)
+    return pa.Table.from_pandas(chunk, preserve_index=False)
+
+
+def read_csv_parallel(path, columns=None, start_date=None, end_date=None, target_year=None, workers=None,
+                      parser='c', range_mb=DEFAULT_RANGE_MB):
+    """
+    Parse `columns` (default: every column) of one CSV in a process pool of `workers`
+    (default: all cores). SalesDate is parsed (unparseable dates dropped), shifted from the
+    source year to `target_year` if one is given (see sales_io.shift_sales_year), and kept in
+    [start_date, end_date) when either bound is given.
+
+    Returns (DataFrame, stats) where stats holds the bytes read, seconds, MB/s, workers and ranges.
+    """
+    if parser not in PARSERS:
+        raise ValueError(f"parser must be one of {PARSERS}, got {parser!r}")
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    n_ranges = max(workers, -(-size // (range_mb * 1024 * 1024)))
+
+    start = time.perf_counter()
+    header, ranges = byte_ranges(path, n_ranges)
+    # File order, as read_csv.
+    columns = [col for col in header.decode().rstrip('\r\n').split(',') if columns is None or col in columns]
+    task_args = [(path, header, range_start, range_end, columns, parser, start_date, end_date, target_year)
+                 for range_start, range_end in ranges]
+    if workers == 1:
+        parts = [_parse_range(*args) for args in task_args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_parse_range, *zip(*task_args)))
+
+    if not parts:
+        result = pd.DataFrame(columns=columns)
+    elif isinstance(parts[0], pd.DataFrame):
+        result = pd.concat(parts, ignore_index=True)
+    else:
+        import pyarrow as pa
+        result = pa.concat_tables(parts).to_pandas()  # concat_tables only collects chunks; to_pandas copies.
+    result = result.astype({col: SALES_DTYPES[col] for col in result.columns if col in SALES_DTYPES})
+    seconds = time.perf_counter() - start
+
+    stats = {'bytes': size, 'seconds': seconds, 'mb_per_s': size / 1e6 / seconds if seconds else float('inf'),
+             'workers': workers, 'ranges': len(ranges)}
+    return result, stats
+
+
+def format_throughput(stats):
+    return (f"{stats['bytes'] / 1e6:,.1f} MB in {stats['seconds']:.2f}s = {stats['mb_per_s']:,.1f} MB/s "
+            f"({stats['workers']} workers, {stats['ranges']} ranges)")
@@ -0,0 +1,77 @@
+import glob
+import hashlib
+import json
+import os
+
+# --- Configuration ---
+# Cached frames are stored as uncompressed Arrow IPC (Feather v2) files so that a warm
+# run can memory-map them instead of re-parsing the CSVs and redoing the merges.
+CACHE_DIR = '.bdm_cache'
+CACHE_FORMAT_VERSION = 3
+MAX_CACHED_FRAMES = 8  # Preprocessed frames and their (small) sales cubes each count as one.
+
+# Only this many bytes from each end of a large input are hashed; together with the size
+# and mtime this catches in-place edits without reading a multi-GB file on every run.
+FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+
+
+def file_fingerprint(path):
+    """Size, mtime and a content hash (head and tail sample for large files) of one input."""
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        if stat.st_size <= 2 * FINGERPRINT_SAMPLE_BYTES:
+            digest.update(f.read())
+        else:
+            digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+            f.seek(-FINGERPRINT_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(f.read())
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+
+def cache_key(input_paths, products_to_exclude, categories_to_include):
+    """Key a cached frame on its input files and on the product/category filter lists."""
+    payload = {
+        'version': CACHE_FORMAT_VERSION,
+        'inputs': [file_fingerprint(path) for path in input_paths],
+        'products_to_exclude': sorted(products_to_exclude),
+        'categories_to_include': sorted(categories_to_include),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def _cache_path(key, cache_dir):
+    return os.path.join(cache_dir, f"final_preprocessed_{key}.arrow")
+
+
+def load_cached_frame(key, cache_dir=CACHE_DIR):
+    """Memory-map a cached frame; returns None on a cache miss or when pyarrow is unavailable."""
+    path = _cache_path(key, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        from pyarrow import feather
+    except ImportError:
+        return None
+    os.utime(path)  # Mark as recently used for eviction.
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+
+def store_cached_frame(df, key, cache_dir=CACHE_DIR):
+    """Write `df` to the cache and evict the least recently used entries. Returns the path, or None."""
+    try:
+        from pyarrow import feather
+    except ImportError:
+        print("Note: pyarrow is not installed; the preprocessed data will not be cached.")
+        return None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+    cached = sorted(glob.glob(os.path.join(cache_dir, 'final_preprocessed_*.arrow')), key=os.path.getmtime)
+    for stale_path in cached[:-MAX_CACHED_FRAMES]:
+        os.remove(stale_path)
+    return path
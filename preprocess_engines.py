@@ -0,0 +1,196 @@
+"""
+Out-of-core execution engines for the preprocessing steps.
+
+The pandas path (column_selection.py, data_trimming.py) parses whole files into memory on one
+core. The engines here run the same steps -- read, year shift, date filter, product/category
+join, exclusion/inclusion filters, TotalPrice and column projection -- as one lazy query plan:
+only the needed columns are read, filters are applied while scanning, the work is spread over
+all cores, and the plan streams (Polars) or spills to disk under SPILL_DIR (DuckDB) instead of
+holding the whole input in memory.
+
+Polars and DuckDB are optional and imported only when their engine is selected. The engines
+return the filtered rows with TotalPrice; column_selection.py then adds the date features and
+the compact schema exactly as on the pandas path, so every engine yields the same columns.
+Row order is not guaranteed to match the pandas path (DuckDB joins in parallel).
+"""
+import os
+
+from preprocess_cache import CACHE_DIR
+from sales_io import SOURCE_YEAR
+
+ENGINES = ('pandas', 'polars', 'duckdb')
+DEFAULT_ENGINE = 'pandas'
+
+# DuckDB writes intermediate results here when a query outgrows its memory limit.
+SPILL_DIR = os.path.join(CACHE_DIR, 'spill')
+
+# Sales columns the lazy preprocessing reads, in the order of the raw sales.csv (the lazy trim
+# keeps every column unless given these), and each engine's spelling of a SalesDate format with
+# milliseconds.
+TRIMMED_COLUMNS = ['ProductID', 'Quantity', 'Discount', 'SalesDate']
+TRIMMED_DATE_FORMATS = {'polars': '%Y-%m-%d %H:%M:%S%.3f', 'duckdb': '%Y-%m-%d %H:%M:%S.%g'}
+
+
+def _as_list(paths):
+    return [paths] if isinstance(paths, str) else list(paths)
+
+
+def _require_files(*paths):
+    # Report missing inputs up front, the same way for every engine (DuckDB raises IOException).
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No such file: '{path}'")
+
+
+# --- Polars: lazy frames, collected with the streaming engine ---
+
+def _polars_sales(sales_file_paths, start_date=None, end_date=None, shift_years=0, columns=TRIMMED_COLUMNS):
+    import polars as pl
+
+    sales = pl.scan_csv(_as_list(sales_file_paths), schema_overrides={'Discount': pl.Float64, 'SalesDate': pl.String})
+    if columns is not None:
+        sales = sales.select(columns)
+    # Rows without a SalesDate are kept, as on the pandas path; a date filter drops them.
+    sales = sales.with_columns(pl.col('SalesDate').str.to_datetime(time_unit='us', strict=False))
+    if shift_years:
+        # offset_by clamps Feb 29 to Feb 28, like date_features.add_years.
+        sales = sales.with_columns(pl.col('SalesDate').dt.offset_by(f'{shift_years}y'))
+    if start_date is not None:
+        sales = sales.filter(pl.col('SalesDate') >= start_date)
+    if end_date is not None:
+        sales = sales.filter(pl.col('SalesDate') < end_date)
+    return sales
+
+
+def _polars_preprocess(sales_file_paths, products_file_path, categories_file_path, products_to_exclude,
+                       categories_to_include):
+    import polars as pl
+
+    categories = pl.scan_csv(categories_file_path).select('CategoryID', 'CategoryName')
+    products = (pl.scan_csv(products_file_path, schema_overrides={'Price': pl.Float64})
+                .select('ProductID', 'ProductName', 'Price', 'CategoryID')
+                .join(categories, on='CategoryID', how='left')
+                .filter(~pl.col('ProductName').is_in(products_to_exclude).fill_null(False)
+                        & pl.col('CategoryName').is_in(categories_to_include).fill_null(False)))
+    plan = (_polars_sales(sales_file_paths)
+            .join(products, on='ProductID', how='inner', maintain_order='left')
+            .with_columns(TotalPrice=pl.col('Quantity') * pl.col('Price') * (1 - pl.col('Discount'))))
+    return plan.collect(engine='streaming').to_pandas()
+
+
+def _polars_trim(sales_file_path, output_filename, start_date, end_date, shift_years, columns):
+    import polars as pl
+
+    _polars_sales(sales_file_path, start_date, end_date, shift_years, columns).sink_csv(
+        output_filename, datetime_format=TRIMMED_DATE_FORMATS['polars'])
+    summary = pl.scan_csv(output_filename, try_parse_dates=True).select(
+        pl.len().alias('rows'), pl.col('SalesDate').min().alias('min'), pl.col('SalesDate').max().alias('max'),
+    ).collect()
+    return summary.row(0)
+
+
+# --- DuckDB: SQL over read_csv, with a memory limit and a spill directory ---
+
+def _sql_string(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _duckdb_connect(memory_limit_mb=None):
+    import duckdb
+
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    con = duckdb.connect()
+    con.execute(f"SET temp_directory = {_sql_string(SPILL_DIR)}")
+    if memory_limit_mb:
+        con.execute(f"SET memory_limit = '{int(memory_limit_mb)}MB'")
+    return con
+
+
+def _duckdb_sales_sql(sales_file_paths, start_date=None, end_date=None, shift_years=0, columns=TRIMMED_COLUMNS):
+    paths = ', '.join(_sql_string(path) for path in _as_list(sales_file_paths))
+    conditions = ['TRUE']  # Rows without a SalesDate are kept, as on the pandas path; a date filter drops them.
+    if start_date is not None:
+        conditions.append(f"SalesDate >= TIMESTAMP {_sql_string(start_date)}")
+    if end_date is not None:
+        conditions.append(f"SalesDate < TIMESTAMP {_sql_string(end_date)}")
+    # Adding years clamps Feb 29 to Feb 28, like date_features.add_years.
+    converted = {'Discount': 'CAST(Discount AS DOUBLE) AS Discount',
+                 'SalesDate': f'TRY_CAST(SalesDate AS TIMESTAMP) + to_years({int(shift_years)}) AS SalesDate'}
+    if columns is None:
+        select = f"* REPLACE ({', '.join(converted.values())})"
+    else:
+        select = ', '.join(converted.get(column, column) for column in columns)
+    return f"""
+        SELECT * FROM (
+            SELECT {select}
+            FROM read_csv([{paths}], types = {{'SalesDate': 'VARCHAR'}})
+        ) WHERE {' AND '.join(conditions)}"""
+
+
+def _duckdb_preprocess(sales_file_paths, products_file_path, categories_file_path, products_to_exclude,
+                       categories_to_include, memory_limit_mb=None):
+    query = f"""
+        WITH sales AS ({_duckdb_sales_sql(sales_file_paths)}),
+        products AS (
+            SELECT p.ProductID, p.ProductName, CAST(p.Price AS DOUBLE) AS Price, p.CategoryID, c.CategoryName
+            FROM read_csv({_sql_string(products_file_path)}) AS p
+            LEFT JOIN read_csv({_sql_string(categories_file_path)}) AS c ON p.CategoryID = c.CategoryID
+            WHERE NOT coalesce(list_contains($exclude, p.ProductName), false)
+              AND coalesce(list_contains($include, c.CategoryName), false)
+        )
+        SELECT s.ProductID, s.Quantity, s.Discount, s.SalesDate,
+               p.ProductName, p.Price, p.CategoryID, p.CategoryName,
+               s.Quantity * p.Price * (1 - s.Discount) AS TotalPrice
+        FROM sales AS s JOIN products AS p ON s.ProductID = p.ProductID"""
+    with _duckdb_connect(memory_limit_mb) as con:
+        return con.execute(query, {'exclude': list(products_to_exclude),
+                                   'include': list(categories_to_include)}).df()
+
+
+def _duckdb_trim(sales_file_path, output_filename, start_date, end_date, shift_years, columns, memory_limit_mb=None):
+    with _duckdb_connect(memory_limit_mb) as con:
+        con.execute(f"COPY ({_duckdb_sales_sql(sales_file_path, start_date, end_date, shift_years, columns)}) "
+                    f"TO {_sql_string(output_filename)} (HEADER, TIMESTAMPFORMAT {_sql_string(TRIMMED_DATE_FORMATS['duckdb'])})")
+        return con.execute(f"SELECT count(*), min(SalesDate), max(SalesDate) "
+                           f"FROM read_csv({_sql_string(output_filename)})").fetchone()
+
+
+# --- Entry points ---
+
+def preprocess_lazy(engine, sales_file_paths, products_file_path, categories_file_path, products_to_exclude,
+                    categories_to_include, memory_limit_mb=None):
+    """
+    Steps 1-3 of column_selection.py as one query plan: the sales rows whose product survives
+    the exclusion and inclusion filters, with ProductName, Price, CategoryID, CategoryName and
+    TotalPrice attached, as a pandas DataFrame (date features and compact dtypes not yet applied).
+    DuckDB spills to disk past `memory_limit_mb`; Polars streams and ignores it.
+    """
+    _require_files(*_as_list(sales_file_paths), products_file_path, categories_file_path)
+    if engine == 'polars':
+        return _polars_preprocess(sales_file_paths, products_file_path, categories_file_path,
+                                  products_to_exclude, categories_to_include)
+    if engine == 'duckdb':
+        return _duckdb_preprocess(sales_file_paths, products_file_path, categories_file_path,
+                                  products_to_exclude, categories_to_include, memory_limit_mb)
+    raise ValueError(f"unknown lazy engine {engine!r}; expected one of {ENGINES[1:]}")
+
+
+def trim_sales_lazy(engine, sales_file_path, output_filename, start_date, end_date, target_year,
+                    memory_limit_mb=None, source_year=SOURCE_YEAR, columns=None):
+    """
+    data_trimming.py's read, year shift and date filter as one query plan that writes the rows
+    in [start_date, end_date), with `columns` (default: all), straight to `output_filename`.
+    Returns (rows_written, min_date, max_date).
+    """
+    _require_files(sales_file_path)
+    shift_years = target_year - source_year
+    if columns is not None:
+        with open(sales_file_path) as f:
+            header = f.readline().rstrip('\r\n').split(',')
+        columns = [column for column in header if column in columns]  # The raw file's order, as pandas' usecols.
+    if engine == 'polars':
+        return _polars_trim(sales_file_path, output_filename, start_date, end_date, shift_years, columns)
+    if engine == 'duckdb':
+        return _duckdb_trim(sales_file_path, output_filename, start_date, end_date, shift_years, columns,
+                            memory_limit_mb)
+    raise ValueError(f"unknown lazy engine {engine!r}; expected one of {ENGINES[1:]}")
@@ -0,0 +1,100 @@
+"""
+Dense ProductID-indexed lookup of product and category attributes.
+
+products.csv has a few hundred rows, so instead of merging them onto millions of sales rows
+(twice: products, then categories), the attributes are joined once into a small table whose
+row position *is* the ProductID. The exclusion/inclusion filters are resolved against that
+table into a boolean mask, sales rows are filtered by `mask[ProductID]`, and only the
+surviving rows get their attributes gathered with `take`.
+"""
+import numpy as np
+import pandas as pd
+
+PRODUCT_ATTRIBUTES = ['ProductName', 'Price', 'CategoryID', 'CategoryName']
+
+
+def build_product_lookup(products_df, categories_df):
+    """
+    Return a DataFrame with one row per ProductID from 0 to max(ProductID), holding ProductName,
+    Price, CategoryID and CategoryName, plus a 'Known' flag that is False for IDs missing from
+    products.csv. Column dtypes (including categoricals) are preserved.
+    """
+    if products_df['ProductID'].duplicated().any():
+        raise ValueError("products.csv has duplicate ProductID values; a ProductID lookup needs them unique.")
+
+    products = products_df[['ProductID', 'ProductName', 'Price', 'CategoryID']].reset_index(drop=True)
+    category_names = categories_df.drop_duplicates('CategoryID').set_index('CategoryID')['CategoryName']
+    products['CategoryName'] = category_names.reindex(products['CategoryID']).array
+
+    product_ids = products['ProductID'].to_numpy()
+    size = int(product_ids.max()) + 1
+    known = np.zeros(size, dtype=bool)
+    known[product_ids] = True
+
+    lookup = {}
+    for column in PRODUCT_ATTRIBUTES:
+        source = products[column]
+        if isinstance(source.dtype, pd.CategoricalDtype):
+            codes = np.full(size, -1, dtype=source.cat.codes.dtype)
+            codes[product_ids] = source.cat.codes.to_numpy()
+            lookup[column] = pd.Categorical.from_codes(codes, dtype=source.dtype)
+        elif pd.api.types.is_numeric_dtype(source) and not pd.api.types.is_extension_array_dtype(source):
+            dense = np.zeros(size, dtype=source.dtype)
+            dense[product_ids] = source.to_numpy()
+            lookup[column] = dense
+        else:
+            dense = np.full(size, None, dtype=object)
+            dense[product_ids] = source.to_numpy(dtype=object)
+            lookup[column] = dense
+    lookup['Known'] = known
+    return pd.DataFrame(lookup, index=pd.RangeIndex(size, name='ProductID'))
+
+
+def _lookup_positions(lookup, product_ids):
+    """Row positions in `lookup` for the given IDs, plus a mask of IDs present in products.csv."""
+    product_ids = np.asarray(product_ids)
+    in_range = (product_ids >= 0) & (product_ids < len(lookup))
+    positions = np.where(in_range, product_ids, 0).astype(np.intp)
+    return positions, in_range & lookup['Known'].to_numpy()[positions]
+
+
+def product_filter_masks(lookup, products_to_exclude, categories_to_include):
+    """
+    Resolve the filters once per product: (kept_after_exclusion, kept_after_inclusion), two
+    boolean arrays indexed by ProductID. Unknown products pass the exclusion filter but fail the
+    category filter, exactly as they would after a left merge.
+    """
+    known = lookup['Known'].to_numpy()
+    not_excluded = ~(known & lookup['ProductName'].isin(products_to_exclude).to_numpy())
+    included = not_excluded & known & lookup['CategoryName'].isin(categories_to_include).to_numpy()
+    return not_excluded, included
+
+
+def attach_product_attributes(sales_df, lookup, columns=PRODUCT_ATTRIBUTES):
+    """
+    Gather product/category attributes onto sales rows by ProductID with array indexing.
+    Rows whose product is unknown get missing values, as with a left merge.
+    """
+    positions, known = _lookup_positions(lookup, sales_df['ProductID'])
+    all_known = known.all()
+    attributes = {}
+    for column in columns:
+        values = lookup[column].array.take(positions)
+        if not all_known:
+            values = pd.Series(values).where(known).array
+        attributes[column] = values
+    return sales_df.assign(**attributes)
+
+
+def filter_and_attach(sales_df, lookup, products_to_exclude, categories_to_include):
+    """
+    Keep the sales rows whose product survives both filters, then attach the product attributes.
+    Returns (filtered_df, rows_after_exclusion).
+    """
+    not_excluded, included = product_filter_masks(lookup, products_to_exclude, categories_to_include)
+    positions, known = _lookup_positions(lookup, sales_df['ProductID'])
+    row_not_excluded = np.where(known, not_excluded[positions], True)
+    row_included = known & included[positions]
+
+    filtered_df = sales_df[row_included].reset_index(drop=True)
+    return attach_product_attributes(filtered_df, lookup), int(row_not_excluded.sum())
@@ -0,0 +1,356 @@
+"""
+Local query service: the preprocessed sales kept in memory, analyses served as HTTP queries.
+
+    python -m bdm serve --month 2024-02 [--port 8765 | --socket /tmp/bdm.sock] [--cache-size 1024]
+    curl 'http://127.0.0.1:8765/revenue?category=Beverages&from=2024-02-01&to=2024-02-14'
+
+The period is loaded once as a SalesCube (see sales_cube.py), as `bdm run` does. Every request
+then computes from that cube with the same functions as the scripts:
+- /revenue: revenue.run_financial_overview's figures;
+- /abc: ABC classes (ABC_analysis.py/abc_engine.py) with the class summary. Pass `product=<id>`
+  for one product's class, or `top=<n>` for the n highest ranked products;
+- /trend: sales_trend_analysis.run_sales_trend_analysis's weekly sales and fast/slow movers.
+Each accepts `category=<name>` and `from`/`to` dates (YYYY-MM-DD) to narrow the period; any other
+parameter is rejected with 400 Bad Request. /status describes the loaded data and the cache.
+/reload reloads it, through the preprocessing cache, so that new input files are picked up.
+
+Responses are JSON. Each one is cached in an LRU cache keyed on the query's parameters and the
+data version, a hash of the cube's contents. A repeated query is answered from the cache
+without touching the data. A reload that changes the data changes the version, so stale
+results are never served.
+
+Queries are computed one at a time in a worker thread, with their printed output discarded.
+The event loop keeps answering cache hits meanwhile. Identical queries that arrive while one is
+being computed wait for that result instead of computing it again. The server only uses the
+standard library (asyncio); a request is one HTTP/1.1 GET or POST, and connections are kept
+alive.
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+
+from instrumentation import step
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 1024
+MAX_HEADER_BYTES = 64 * 1024
+
+QUERIES = {}
+QUERY_PARAMS = {}  # Query name -> the parameter names it accepts.
+
+# Parameters every query accepts to narrow the period (see select).
+SELECT_PARAMS = ('category', 'from', 'to')
+
+
+class QueryError(Exception):
+    """A bad query parameter; reported to the client as 400 Bad Request."""
+
+
+def query(name, params=()):
+    """
+    Register a query function, called as function(sales_cube, params) and returning a JSON-able
+    dict. It accepts SELECT_PARAMS and `params`; any other parameter is a 400 error.
+    """
+    def decorator(function):
+        QUERIES[name] = function
+        QUERY_PARAMS[name] = frozenset(SELECT_PARAMS).union(params)
+        return function
+    return decorator
+
+
+# --- Parameters ---
+
+def _date_param(params, name):
+    if name not in params:
+        return None
+    try:
+        return pd.Timestamp(params[name]).normalize()
+    except ValueError:
+        raise QueryError(f"'{name}' must be a date as YYYY-MM-DD, got {params[name]!r}")
+
+
+def _int_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        raise QueryError(f"'{name}' must be an integer, got {params[name]!r}")
+
+
+def select(sales_cube, params):
+    """The cube narrowed to `params`' category and from/to dates, if given."""
+    start, end = _date_param(params, 'from'), _date_param(params, 'to')
+    selected = sales_cube.filter_days(start, end) if start is not None or end is not None else sales_cube
+    category = params.get('category')
+    if category is None:
+        return selected
+
+    from sales_cube import SalesCube
+
+    cells = selected.cells
+    if category not in set(cells['CategoryName'].unique()):
+        raise QueryError(f"no sales in category {category!r} for this period")
+    return SalesCube(cells[cells['CategoryName'] == category].reset_index(drop=True),
+                     raw_loader=lambda: selected.rows[selected.rows['CategoryName'] == category].reset_index(drop=True))
+
+
+def _records(df):
+    """DataFrame rows as JSON-able dicts; dates become YYYY-MM-DD strings."""
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime('%Y-%m-%d')
+        elif isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+    return df.to_dict(orient='records')
+
+
+# --- Queries ---
+
+@query('revenue')
+def revenue_query(sales_cube, params):
+    from revenue import run_financial_overview
+
+    figures = run_financial_overview(select(sales_cube, params))
+    return {name: float(value) for name, value in figures.items()}
+
+
+@query('abc', params=('metric', 'product', 'top'))
+def abc_query(sales_cube, params):
+    from ABC_analysis import summarize_abc
+    from abc_engine import METRICS, product_abc
+
+    metric = params.get('metric', 'revenue')
+    if metric not in METRICS:
+        raise QueryError(f"'metric' must be one of {list(METRICS)}, got {metric!r}")
+    product_totals = product_abc(select(sales_cube, params), metric)
+    total_column = f'Total{METRICS[metric][0]}'
+    result = {'metric': metric, 'products': len(product_totals),
+              'summary': _records(summarize_abc(product_totals, total_column))}
+    if 'product' in params:
+        product = product_totals[product_totals['ProductID'] == _int_param(params, 'product', None)]
+        if product.empty:
+            raise QueryError(f"product {params['product']} has no sales in this selection")
+        result['product'] = _records(product)[0]
+    else:
+        result['top'] = _records(product_totals.head(_int_param(params, 'top', 10)))
+    return result
+
+
+@query('trend', params=('top',))
+def trend_query(sales_cube, params):
+    from sales_trend_analysis import run_sales_trend_analysis
+
+    weekly_sales, sales_by_product = run_sales_trend_analysis(select(sales_cube, params), show_plots=False)
+    top = _int_param(params, 'top', 10)
+    movers = sales_by_product.rename('TotalPrice').rename_axis('ProductName').reset_index()
+    return {'weekly_sales': _records(weekly_sales), 'fast_movers': _records(movers.head(top)),
+            'slow_movers': _records(movers.tail(top))}
+
+
+# --- Cache ---
+
+class QueryCache:
+    """LRU cache of encoded responses, keyed on (data version, query name, sorted parameters)."""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        body = self.entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        self.entries[key] = body
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+def data_version(sales_cube):
+    """A short hash of the cube's cells: equal data, equal version."""
+    return f"{pd.util.hash_pandas_object(sales_cube.cells, index=False).sum() & 0xFFFFFFFFFFFF:012x}"
+
+
+# --- Service ---
+
+class QueryService:
+    """
+    Holds one loaded SalesCube and answers queries on it. `loader()` returns
+    (sales_cube, period_label); it is called at start and on every reload.
+    """
+
+    def __init__(self, loader, cache_size=DEFAULT_CACHE_SIZE):
+        self.loader = loader
+        self.cache = QueryCache(cache_size)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bdm-query')
+        self.pending = {}
+        self.sales_cube = self.period_label = self.version = None
+        self.loaded_at = None
+
+    def load(self):
+        """Load (or reload) the data; returns True if its version changed."""
+        with step('serve_load') as current:
+            sales_cube, period_label = self.loader()
+            current.record(sales_cube)
+        version = data_version(sales_cube)
+        changed = version != self.version
+        self.sales_cube, self.period_label, self.version = sales_cube, period_label, version
+        self.loaded_at = time.time()
+        return changed
+
+    def status(self):
+        return {'period': self.period_label, 'data_version': self.version, 'cells': len(self.sales_cube.cells),
+                'loaded_at': pd.Timestamp(self.loaded_at, unit='s').isoformat(), 'queries': sorted(QUERIES),
+                'cache': {'entries': len(self.cache.entries), 'max_entries': self.cache.max_entries,
+                          'hits': self.cache.hits, 'misses': self.cache.misses}}
+
+    def compute(self, name, params):
+        """
+        Run one query on the worker thread; stage output is silenced. Returns (data version,
+        result), both read here so that a reload queued before the query cannot mislabel it.
+        """
+        version, sales_cube = self.version, self.sales_cube
+        with step(f'query_{name}', params=params), contextlib.redirect_stdout(io.StringIO()):
+            return version, QUERIES[name](sales_cube, params)
+
+    async def answer(self, name, params):
+        """(status code, JSON body bytes, cache state) for one request."""
+        loop = asyncio.get_running_loop()
+        if name == 'status':
+            return 200, _encode(self.status()), 'none'
+        if name == 'reload':
+            changed = await loop.run_in_executor(self.executor, self.load)
+            return 200, _encode({'reloaded': True, 'changed': changed, **self.status()}), 'none'
+        if name not in QUERIES:
+            return 404, _encode({'error': f"unknown query {name!r}; choose from {sorted(QUERIES) + ['reload', 'status']}"}), 'none'
+
+        unknown = sorted(set(params) - QUERY_PARAMS[name])
+        if unknown:
+            return 400, _encode({'error': f"unknown parameter(s) {unknown} for /{name}; "
+                                          f"choose from {sorted(QUERY_PARAMS[name])}"}), 'none'
+
+        params_key = (name, tuple(sorted(params.items())))
+        key = (self.version, *params_key)
+        body = self.cache.get(key)
+        if body is not None:
+            return 200, body, 'hit'
+        if key not in self.pending:
+            self.pending[key] = loop.run_in_executor(self.executor, self.compute, name, params)
+        future = self.pending[key]
+        try:
+            version, result = await asyncio.shield(future)
+        except QueryError as e:
+            return 400, _encode({'error': str(e)}), 'miss'
+        except Exception as e:
+            return 500, _encode({'error': repr(e)}), 'miss'
+        finally:
+            self.pending.pop(key, None)
+        body = _encode({'query': name, 'params': params, 'data_version': version, 'result': result})
+        self.cache.put((version, *params_key), body)
+        return 200, body, 'miss'
+
+
+def _encode(payload):
+    return json.dumps(payload, default=str).encode()
+
+
+# --- HTTP ---
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+async def _read_request(reader):
+    """(method, target, keep_alive) of the next request on the connection, or None once it closes."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        return None
+    lines = head.decode('latin-1').split('\r\n')
+    parts = lines[0].split()
+    if len(parts) != 3:
+        return None
+    method, target, version = parts
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if int(headers.get('content-length', 0) or 0):
+        await reader.readexactly(int(headers['content-length']))  # Parameters come in the URL; ignore bodies.
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    return method, target, keep_alive
+
+
+def handler(service):
+    async def handle(reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, keep_alive = request
+                url = urlsplit(target)
+                if method not in ('GET', 'POST'):
+                    status, body, cache_state = 405, _encode({'error': "use GET (or POST for /reload)"}), 'none'
+                else:
+                    status, body, cache_state = await service.answer(url.path.strip('/') or 'status',
+                                                                     dict(parse_qsl(url.query)))
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\nX-Cache: {cache_state}\r\nX-Data-Version: {service.version}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """Serve `service` (already loaded) on host:port, or on a Unix socket at `socket_path`, until cancelled."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(handler(service), path=socket_path, limit=MAX_HEADER_BYTES)
+        address = f"unix:{socket_path}"
+    else:
+        server = await asyncio.start_server(handler(service), host, port, limit=MAX_HEADER_BYTES)
+        address = f"http://{host}:{server.sockets[0].getsockname()[1]}"
+    print(f"Serving {service.period_label} (data version {service.version}, {len(service.sales_cube.cells)} cells) "
+          f"on {address}; queries: {', '.join(sorted(QUERIES))}, status, reload.", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def run_service(loader, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, cache_size=DEFAULT_CACHE_SIZE):
+    """Load the data once with `loader` and serve queries on it until interrupted."""
+    service = QueryService(loader, cache_size)
+    service.load()
+    try:
+        asyncio.run(serve(service, host, port, socket_path))
+    except KeyboardInterrupt:
+        print("\nQuery service stopped.")
+    finally:
+        service.executor.shutdown(wait=False)
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -1,31 +1,56 @@
-import pandas as pd
-from column_selection import final_preprocessed_df
+from instrumentation import instrumented
+from sales_cube import aggregate
 
-# Assuming 'final_preprocessed_df' is already available from the data preprocessing steps,
-# containing 'TotalPrice', 'Quantity', 'Price', and 'Discount' columns
-# for the filtered data of February 2024.
 
-print("--- Financial Overview Calculations for February 2024 ---")
+def financial_figures(final_preprocessed_df):
+    """
+    Revenue, COGS, profit and profit margin of the preprocessed rows or SalesCube as a dict
+    (TotalRevenue, TotalCOGS, TotalProfit, ProfitMarginPercentage), without printing.
+    """
+    totals = aggregate(final_preprocessed_df, [], ['TotalPrice', 'COGS']).iloc[0]
 
-# 1. Calculate Total Revenue (Sales)
-total_revenue_feb2024 = final_preprocessed_df['TotalPrice'].sum()
-print(f"\nTotal Revenue (Sales) for February 2024: ₹{total_revenue_feb2024:,.2f}")
+    # COGS uses 'Price' as the cost per unit from the merged data, for consistency with the
+    # analysis methods described: Quantity * Price * (1 - Discount), summed in the sales cube's
+    # 'COGS' measure.
+    total_revenue = totals['TotalPrice']
+    total_cogs = totals['COGS']
+    total_profit = total_revenue - total_cogs
+    # Avoid division by zero if total_revenue is zero
+    profit_margin_percentage = (total_profit / total_revenue) * 100 if total_revenue != 0 else 0
+    return {
+        'TotalRevenue': total_revenue,
+        'TotalCOGS': total_cogs,
+        'TotalProfit': total_profit,
+        'ProfitMarginPercentage': profit_margin_percentage,
+    }
 
-# 2. Calculate Total Cost of Goods Sold (COGS)
-# Recalculate 'CostOfGoodsSold' column if it's not already present or for accuracy,
-# using 'Price' as the cost per unit from the merged data.
-# This ensures consistency with the analysis methods described.
-final_preprocessed_df['CostOfGoodsSold'] = final_preprocessed_df['Quantity'] * final_preprocessed_df['Price'] * (1 - final_preprocessed_df['Discount'])
-total_cogs_feb2024 = final_preprocessed_df['CostOfGoodsSold'].sum()
-print(f"Total Cost of Goods Sold (COGS) for February 2024: ₹{total_cogs_feb2024:,.2f}")
 
-# 3. Calculate Total Profit
-total_profit_feb2024 = total_revenue_feb2024 - total_cogs_feb2024
-print(f"Total Profit for February 2024: ₹{total_profit_feb2024:,.2f}")
+@instrumented('revenue')
+def run_financial_overview(final_preprocessed_df, period_label='February 2024'):
+    """
+    Revenue, COGS, profit and profit margin for the preprocessed period (`period_label` names it in the output).
 
-# 4. Calculate Profit Margin Percentage
-# Avoid division by zero if total_revenue_feb2024 is zero
-profit_margin_percentage_feb2024 = (total_profit_feb2024 / total_revenue_feb2024) * 100 if total_revenue_feb2024 != 0 else 0
-print(f"Profit Margin Percentage for February 2024: {profit_margin_percentage_feb2024:.2f}%")
+    Expects 'TotalPrice', 'Quantity', 'Price' and 'Discount' columns, as produced by
+    column_selection.py, or a SalesCube of them (see sales_cube.py). The input is not modified.
+    Returns the figures as a dict (see financial_figures).
+    """
+    print(f"--- Financial Overview Calculations for {period_label} ---")
+    figures = financial_figures(final_preprocessed_df)
 
-print("\nFinancial calculations complete.")
+    # 1. Total Revenue (Sales)
+    print(f"\nTotal Revenue (Sales) for {period_label}: ₹{figures['TotalRevenue']:,.2f}")
+    # 2. Total Cost of Goods Sold (COGS)
+    print(f"Total Cost of Goods Sold (COGS) for {period_label}: ₹{figures['TotalCOGS']:,.2f}")
+    # 3. Total Profit
+    print(f"Total Profit for {period_label}: ₹{figures['TotalProfit']:,.2f}")
+    # 4. Profit Margin Percentage
+    print(f"Profit Margin Percentage for {period_label}: {figures['ProfitMarginPercentage']:.2f}%")
+
+    print("\nFinancial calculations complete.")
+    return figures
+
+
+if __name__ == '__main__':
+    from column_selection import final_preprocessed_df
+
+    run_financial_overview(final_preprocessed_df)
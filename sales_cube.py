@@ -0,0 +1,138 @@
+"""
+Pre-aggregated sales cube: one cell per product and day.
+
+Every analysis only needs sums of TotalPrice, Quantity or COGS grouped by product, category,
+day or week, so the month's row-level final_preprocessed_df is summed once into product x day
+cells (thousands of rows instead of millions), carrying each product's attributes and each
+day's calendar features as dimensions. Category, week and other roll-ups are group-bys over
+the cells. A query on a dimension the cube does not have (e.g. the exact SalesDate timestamp)
+falls back to the raw rows, which are loaded only then.
+
+`aggregate()` accepts either a SalesCube or a row-level DataFrame, so the analyses work on both.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from date_features import extract_date_features
+from schema import as_float64
+
+PRODUCT_DIMENSIONS = ['ProductID', 'ProductName', 'Price', 'CategoryID', 'CategoryName']
+DAY_DIMENSIONS = ['SalesDay', 'SaleYear', 'SaleMonth', 'SaleWeekday', 'SaleWeek']
+CUBE_DIMENSIONS = PRODUCT_DIMENSIONS + DAY_DIMENSIONS
+
+# COGS follows revenue.py: Quantity x Price x (1 - Discount). Transactions counts sales rows.
+CUBE_MEASURES = ['TotalPrice', 'Quantity', 'COGS', 'Transactions']
+
+
+def _row_dimension(final_preprocessed_df, column):
+    if column == 'SalesDay':
+        return final_preprocessed_df['SalesDate'].dt.normalize().rename('SalesDay')
+    return final_preprocessed_df[column]
+
+
+def _row_measures(final_preprocessed_df, measures):
+    values = {}
+    for measure in measures:
+        if measure == 'COGS':
+            values[measure] = final_preprocessed_df['Quantity'] * as_float64(final_preprocessed_df['Price']) * \
+                (1 - as_float64(final_preprocessed_df['Discount']))
+        elif measure == 'Transactions':
+            values[measure] = np.ones(len(final_preprocessed_df), dtype=np.int64)
+        elif measure == 'Quantity':
+            values[measure] = final_preprocessed_df['Quantity'].astype(np.int64)
+        else:
+            values[measure] = final_preprocessed_df[measure].astype(np.float64)
+    return pd.DataFrame(values, index=final_preprocessed_df.index)
+
+
+def _group_sum(values, keys):
+    if not keys:
+        return values.sum().to_frame().T
+    return values.groupby(keys, observed=True).sum().reset_index()
+
+
+def aggregate_rows(final_preprocessed_df, by, measures=('TotalPrice',)):
+    """Sum `measures` over row-level sales grouped by `by` (any columns, plus the derived 'SalesDay')."""
+    measures = list(measures)
+    keys = [_row_dimension(final_preprocessed_df, column) for column in by]
+    return _group_sum(_row_measures(final_preprocessed_df, measures), keys)
+
+
+class SalesCube:
+    """
+    Product x day cells of a preprocessed month. `rows` is the row-level frame behind the cube;
+    pass `raw_loader` instead of `raw` to load it only when a query needs it.
+    """
+
+    def __init__(self, cells, raw=None, raw_loader=None):
+        self.cells = cells
+        self._raw = raw
+        self._raw_loader = raw_loader
+        self._raw_lock = threading.Lock()  # Concurrent pipeline stages may all fall back at once.
+
+    @classmethod
+    def from_rows(cls, final_preprocessed_df):
+        """Build the cube with one grouped sum over the rows."""
+        sums = aggregate_rows(final_preprocessed_df, ['ProductID', 'SalesDay'], CUBE_MEASURES)
+        products = final_preprocessed_df.drop_duplicates('ProductID').set_index('ProductID')[PRODUCT_DIMENSIONS[1:]]
+        attributes = {column: products[column].reindex(sums['ProductID']).array for column in PRODUCT_DIMENSIONS[1:]}
+        days = extract_date_features(sums['SalesDay'])
+        cells = pd.concat([
+            sums[['ProductID']].assign(**attributes),
+            sums[['SalesDay']], days[DAY_DIMENSIONS[1:]], sums[CUBE_MEASURES],
+        ], axis=1)
+        return cls(cells, raw=final_preprocessed_df)
+
+    @property
+    def rows(self):
+        with self._raw_lock:
+            if self._raw is None:
+                if self._raw_loader is None:
+                    raise ValueError("this sales cube has no row-level data to fall back to")
+                self._raw = self._raw_loader()
+        return self._raw
+
+    @property
+    def empty(self):
+        return self.cells.empty
+
+    def has(self, columns):
+        return all(column in self.cells.columns for column in columns)
+
+    def query(self, by, measures=('TotalPrice',)):
+        """Sum `measures` grouped by `by`, from the cells when possible and from the raw rows otherwise."""
+        by, measures = list(by), list(measures)
+        if not self.has(by + measures):
+            return aggregate_rows(self.rows, by, measures)
+        return _group_sum(self.cells[measures], [self.cells[column] for column in by])
+
+    def filter_days(self, start=None, end=None):
+        """A cube restricted to days in [start, end] (either may be None); raw rows are filtered lazily."""
+        keep = _in_range(self.cells['SalesDay'], start, end)
+        if keep.all():
+            return self
+        return SalesCube(self.cells[keep].reset_index(drop=True), raw_loader=lambda: filter_rows(self.rows, start, end))
+
+
+def _in_range(days, start, end):
+    keep = pd.Series(True, index=days.index)
+    if start is not None:
+        keep &= days >= pd.Timestamp(start).normalize()
+    if end is not None:
+        keep &= days < pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+    return keep
+
+
+def filter_rows(final_preprocessed_df, start=None, end=None):
+    """Row-level sales on days in [start, end] (either may be None)."""
+    keep = _in_range(final_preprocessed_df['SalesDate'], start, end)
+    return final_preprocessed_df if keep.all() else final_preprocessed_df[keep].reset_index(drop=True)
+
+
+def aggregate(data, by, measures=('TotalPrice',)):
+    """Sum `measures` grouped by `by` from a SalesCube or a row-level final_preprocessed_df."""
+    if isinstance(data, SalesCube):
+        return data.query(by, measures)
+    return aggregate_rows(data, by, measures)
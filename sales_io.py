@@ -0,0 +1,233 @@
+import json
+import os
+
+import pandas as pd
+
+from date_features import add_years
+
+# --- Raw sales.csv schema ---
+# The raw Kaggle sales data is dated around 2018; every analysis shifts it forward
+# so that it lines up with the analysis year (see data_trimming.py).
+SOURCE_YEAR = 2018
+
+# Only these columns are needed downstream: column_selection.py recalculates
+# TotalPrice from Quantity, Price and Discount after the product merge.
+SALES_COLUMNS = ['SalesDate', 'ProductID', 'Quantity', 'Discount']
+
+# Columns a trim can keep (data_trimming.py --columns): every column of sales.csv, as the
+# full-read trim has always written, or only SALES_COLUMNS. None means every column to the readers.
+TRIM_COLUMN_SETS = {'all': None, 'analysis': SALES_COLUMNS}
+
+# Compact dtypes for the raw columns (ProductID fits in 452 values, Quantity is 1-25).
+# SalesDate is parsed separately with pd.to_datetime.
+SALES_DTYPES = {
+    'SalesID': 'int32',
+    'SalesPersonID': 'int16',
+    'CustomerID': 'int32',
+    'ProductID': 'int16',
+    'Quantity': 'int16',
+    'Discount': 'float32',
+    'TotalPrice': 'float32',
+    'TransactionNumber': 'string',
+}
+
+# Rough in-flight cost of one row while a chunk is being parsed, shifted and filtered:
+# the raw CSV text, the parsed columns, the datetime column and the boolean mask.
+ESTIMATED_BYTES_PER_ROW = 256
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+
+def rows_per_chunk(memory_budget_mb, bytes_per_row=ESTIMATED_BYTES_PER_ROW):
+    """Return how many rows can be parsed at once within the given memory budget."""
+    return max(1_000, int(memory_budget_mb * 1024 * 1024) // bytes_per_row)
+
+
+def iter_sales_chunks(sales_file_path, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, columns=None):
+    """
+    Read sales.csv in bounded chunks, parsing `columns` (default: every column) with compact
+    dtypes. Rows with a missing or unparseable 'SalesDate' are dropped. Yields (rows read, chunk):
+    the rows read count the dropped rows too, so a chunk may be empty.
+    """
+    dtypes = {col: dtype for col, dtype in SALES_DTYPES.items() if columns is None or col in columns}
+    reader = pd.read_csv(
+        sales_file_path,
+        usecols=None if columns is None else list(columns),
+        dtype=dtypes,
+        chunksize=rows_per_chunk(memory_budget_mb),
+    )
+    for chunk in reader:
+        rows_read = len(chunk)
+        chunk['SalesDate'] = pd.to_datetime(chunk['SalesDate'], errors='coerce')
+        yield rows_read, chunk.dropna(subset=['SalesDate'])
+
+
+def shift_sales_year(sales_dates, target_year, source_year=SOURCE_YEAR):
+    """Shift SalesDate values from the source year to the target year (same as adding a DateOffset)."""
+    return add_years(sales_dates, target_year - source_year)
+
+
+def trim_sales_streaming(sales_file_path, output_filename, start_date, end_date, target_year,
+                         memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, columns=None):
+    """
+    Stream sales.csv chunk by chunk, shift each chunk to `target_year`, keep the rows in
+    [start_date, end_date) and append them to `output_filename`, with `columns` (default: all).
+
+    Peak memory is bounded by the chunk size derived from `memory_budget_mb`, not by the
+    size of the input file. Returns (rows_read, rows_written, min_date, max_date).
+    """
+    if os.path.exists(output_filename):
+        os.remove(output_filename)
+
+    rows_read = 0
+    rows_written = 0
+    min_date = None
+    max_date = None
+    for chunk_rows_read, chunk in iter_sales_chunks(sales_file_path, memory_budget_mb, columns):
+        rows_read += chunk_rows_read
+        chunk['SalesDate'] = shift_sales_year(chunk['SalesDate'], target_year)
+        in_period = chunk[(chunk['SalesDate'] >= start_date) & (chunk['SalesDate'] < end_date)]
+        if in_period.empty:
+            continue
+
+        in_period.to_csv(output_filename, mode='a', header=rows_written == 0, index=False)
+        rows_written += len(in_period)
+        chunk_min, chunk_max = in_period['SalesDate'].min(), in_period['SalesDate'].max()
+        min_date = chunk_min if min_date is None else min(min_date, chunk_min)
+        max_date = chunk_max if max_date is None else max(max_date, chunk_max)
+
+    return rows_read, rows_written, min_date, max_date
+
+
+# --- Month/Day Partitions ---
+PARTITION_MANIFEST_FILENAME = 'manifest.json'
+PARTITION_GRANULARITIES = ('month', 'day')
+
+
+def partition_key(timestamp, granularity):
+    """Return the manifest key for a timestamp, e.g. '2024-02' or '2024-02-05'."""
+    if granularity == 'month':
+        return f"{timestamp.year:04d}-{timestamp.month:02d}"
+    return f"{timestamp.year:04d}-{timestamp.month:02d}-{timestamp.day:02d}"
+
+
+def partition_relative_path(key, granularity):
+    """Month partitions are flat files; day partitions are grouped in one directory per month."""
+    if granularity == 'month':
+        return f"sales_{key.replace('-', '_')}.csv"
+    return os.path.join(key[:7].replace('-', '_'), f"sales_{key.replace('-', '_')}.csv")
+
+
+def read_partition_manifest(partition_dir):
+    with open(os.path.join(partition_dir, PARTITION_MANIFEST_FILENAME)) as f:
+        return json.load(f)
+
+
+def _remove_stale_partitions(partition_dir):
+    try:
+        manifest = read_partition_manifest(partition_dir)
+    except FileNotFoundError:
+        return
+    for entry in manifest['partitions'].values():
+        path = os.path.join(partition_dir, entry['path'])
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def partition_sales(sales_file_path, partition_dir, target_year, granularity='month',
+                    memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, columns=None):
+    """
+    Scan sales.csv once and route every row to a per-month (or per-day) partition file
+    under `partition_dir`, with `columns` (default: all), then write a manifest with row counts
+    and date ranges.
+
+    Returns the manifest dictionary.
+    """
+    if granularity not in PARTITION_GRANULARITIES:
+        raise ValueError(f"granularity must be one of {PARTITION_GRANULARITIES}, got {granularity!r}")
+
+    os.makedirs(partition_dir, exist_ok=True)
+    _remove_stale_partitions(partition_dir)
+
+    period_freq = 'M' if granularity == 'month' else 'D'
+    partitions = {}
+    rows_read = 0
+    written_columns = list(columns or [])
+    for chunk_rows_read, chunk in iter_sales_chunks(sales_file_path, memory_budget_mb, columns):
+        rows_read += chunk_rows_read
+        written_columns = list(chunk.columns)
+        chunk['SalesDate'] = shift_sales_year(chunk['SalesDate'], target_year)
+        for period, group in chunk.groupby(chunk['SalesDate'].dt.to_period(period_freq), sort=False):
+            key = partition_key(period.start_time, granularity)
+            entry = partitions.get(key)
+            if entry is None:
+                entry = {'path': partition_relative_path(key, granularity), 'rows': 0,
+                         'min_date': None, 'max_date': None}
+                partitions[key] = entry
+                os.makedirs(os.path.dirname(os.path.join(partition_dir, entry['path'])), exist_ok=True)
+
+            group.to_csv(os.path.join(partition_dir, entry['path']), mode='a',
+                         header=entry['rows'] == 0, index=False)
+            entry['rows'] += len(group)
+            group_min, group_max = group['SalesDate'].min(), group['SalesDate'].max()
+            entry['min_date'] = group_min if entry['min_date'] is None else min(entry['min_date'], group_min)
+            entry['max_date'] = group_max if entry['max_date'] is None else max(entry['max_date'], group_max)
+
+    for entry in partitions.values():
+        entry['min_date'] = str(entry['min_date'])
+        entry['max_date'] = str(entry['max_date'])
+
+    manifest = {
+        'source': os.path.abspath(sales_file_path),
+        'source_year': SOURCE_YEAR,
+        'target_year': target_year,
+        'granularity': granularity,
+        'columns': written_columns,
+        'rows_read': rows_read,
+        'partitions': dict(sorted(partitions.items())),
+    }
+    with open(os.path.join(partition_dir, PARTITION_MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def partition_paths(partition_dir, year, month):
+    """Paths of the partition file(s) holding one month, in date order."""
+    manifest = read_partition_manifest(partition_dir)
+    month_key = f"{year:04d}-{month:02d}"
+    paths = [os.path.join(partition_dir, entry['path'])
+             for key, entry in manifest['partitions'].items() if key[:7] == month_key]
+    if not paths:
+        raise FileNotFoundError(f"No partition for {month_key} in '{partition_dir}'.")
+    return paths
+
+
+def partition_months(partition_dir, start=None, end=None):
+    """
+    (year, month) of every partitioned month whose data overlaps the dates [start, end]
+    (either may be None for an open range), in date order, using only the manifest.
+    """
+    manifest = read_partition_manifest(partition_dir)
+    start = None if start is None else pd.Timestamp(start).normalize()
+    end = None if end is None else pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+    months = set()
+    for key, entry in manifest['partitions'].items():
+        if start is not None and pd.Timestamp(entry['max_date']) < start:
+            continue
+        if end is not None and pd.Timestamp(entry['min_date']) >= end:
+            continue
+        months.add((int(key[:4]), int(key[5:7])))
+    return sorted(months)
+
+
+def load_sales_partition(partition_dir, year, month):
+    """
+    Load one month of already-shifted sales from a partition directory written by
+    partition_sales(), without touching the raw sales.csv.
+    """
+    manifest = read_partition_manifest(partition_dir)
+    paths = partition_paths(partition_dir, year, month)
+    dtypes = {col: SALES_DTYPES[col] for col in manifest['columns'] if col in SALES_DTYPES}
+    month_df = pd.concat([pd.read_csv(path, dtype=dtypes) for path in paths], ignore_index=True)
+    month_df['SalesDate'] = pd.to_datetime(month_df['SalesDate'])
+    return month_df
@@ -0,0 +1,266 @@
+"""
+Memory-mapped sales store: sales.csv converted once into date-sorted NumPy columns.
+
+    python sales_store.py build sales.csv sales_store [--target-year 2024] [--memory-budget-mb 256]
+    python sales_store.py info sales_store [--from 2024-02-01 --to 2024-02-29]
+
+data_trimming.py and inventory_turnover_ratio_analysis.py find a period by parsing the whole
+CSV and masking every row. The store holds the same rows, already shifted to the target year
+like data_trimming.py's partitions, as one fixed-width .npy file per column:
+- SalesDate is int64 nanoseconds;
+- the other columns use sales_io.SALES_DTYPES.
+The rows are sorted by SalesDate. A sparse index, day_index.npy, holds the first row of every day.
+SalesStore memory-maps the columns. A date range is found with the day index plus a binary search
+inside the first and last day, and returned as zero-copy views of the mapped files. Reading a
+week therefore costs time and memory proportional to the week, not to the whole history.
+
+The build streams the CSV in chunks (sales_io.iter_sales_chunks) with bounded memory:
+1. each chunk's columns are appended to temporary files;
+2. the rows are counted per day, and every row is written to its day's slot of the output (a
+   counting sort by day);
+3. the rows within each day are sorted by time.
+Rows without a SalesDate are dropped, as everywhere else. store.json records the source file's
+fingerprint, so a changed sales.csv can be detected.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from preprocess_cache import file_fingerprint
+from sales_io import DEFAULT_MEMORY_BUDGET_MB, SALES_COLUMNS, SALES_DTYPES, iter_sales_chunks, rows_per_chunk, shift_sales_year
+
+STORE_FORMAT_VERSION = 1
+STORE_META_FILENAME = 'store.json'
+DAY_INDEX_FILENAME = 'day_index.npy'
+NS_PER_DAY = 86_400 * 10**9
+
+
+def _column_dtype(column):
+    return np.dtype(np.int64) if column == 'SalesDate' else np.dtype(SALES_DTYPES[column])
+
+
+def _column_path(store_dir, column):
+    return os.path.join(store_dir, f"{column}.npy")
+
+
+def _to_ns(timestamp):
+    return pd.Timestamp(timestamp).as_unit('ns').value
+
+
+def build_sales_store(sales_file_path, store_dir, target_year, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB,
+                      columns=SALES_COLUMNS):
+    """
+    Convert `sales_file_path` into a date-sorted store in `store_dir` (replacing any store there),
+    with dates shifted to `target_year`. Returns the store's metadata dict.
+    """
+    columns = ['SalesDate'] + [column for column in columns if column != 'SalesDate']
+    unknown = [column for column in columns[1:] if column not in SALES_DTYPES or SALES_DTYPES[column] == 'string']
+    if unknown:
+        raise ValueError(f"only fixed-width columns can be stored, not {unknown}")
+    start = time.perf_counter()
+    build_dir = f"{store_dir.rstrip(os.sep)}.building"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    scratch = {column: os.path.join(build_dir, f"{column}.unsorted") for column in columns}
+
+    # Pass 1: parse, shift and append each column to a flat temporary file.
+    rows = 0
+    file_columns = columns
+    first_ns = last_ns = None
+    scratch_files = {column: open(path, 'wb') for column, path in scratch.items()}
+    try:
+        for _, chunk in iter_sales_chunks(sales_file_path, memory_budget_mb, columns):
+            if chunk.empty:
+                continue
+            file_columns = list(chunk.columns) # Kept in the CSV's order, as the trimmed CSVs are.
+            sales_dates = shift_sales_year(chunk['SalesDate'], target_year).astype('datetime64[ns]')
+            dates_ns = sales_dates.to_numpy().view(np.int64)
+            dates_ns.tofile(scratch_files['SalesDate'])
+            for column in columns[1:]:
+                chunk[column].to_numpy(_column_dtype(column)).tofile(scratch_files[column])
+            rows += len(chunk)
+            first_ns = dates_ns.min() if first_ns is None else min(first_ns, dates_ns.min())
+            last_ns = dates_ns.max() if last_ns is None else max(last_ns, dates_ns.max())
+    finally:
+        for f in scratch_files.values():
+            f.close()
+    if rows == 0:
+        shutil.rmtree(build_dir)
+        raise ValueError(f"'{sales_file_path}' has no rows with a SalesDate")
+
+    # Pass 2: counting sort by day into the memory-mapped output columns.
+    first_day, last_day = first_ns // NS_PER_DAY, last_ns // NS_PER_DAY
+    unsorted = {column: np.memmap(path, dtype=_column_dtype(column), mode='r', shape=(rows,))
+                for column, path in scratch.items()}
+    block = rows_per_chunk(memory_budget_mb)
+    day_counts = np.zeros(last_day - first_day + 1, dtype=np.int64)
+    for offset in range(0, rows, block):
+        days = unsorted['SalesDate'][offset:offset + block] // NS_PER_DAY - first_day
+        day_counts += np.bincount(days, minlength=len(day_counts))
+    day_index = np.concatenate([[0], np.cumsum(day_counts)])
+
+    output = {column: np.lib.format.open_memmap(_column_path(build_dir, column), mode='w+',
+                                                dtype=_column_dtype(column), shape=(rows,))
+              for column in columns}
+    cursor = day_index[:-1].copy()
+    for offset in range(0, rows, block):
+        days = unsorted['SalesDate'][offset:offset + block] // NS_PER_DAY - first_day
+        order = np.argsort(days, kind='stable')
+        sorted_days = days[order]
+        rank_in_day = np.arange(len(order)) - np.searchsorted(sorted_days, sorted_days, side='left')
+        positions = cursor[sorted_days] + rank_in_day
+        for column in columns:
+            output[column][positions] = unsorted[column][offset:offset + block][order]
+        cursor += np.bincount(days, minlength=len(cursor))
+
+    # Pass 3: order each day's rows by time (a day's rows fit in memory).
+    sales_dates = output['SalesDate']
+    for day_start, day_end in zip(day_index[:-1], day_index[1:]):
+        day_dates = sales_dates[day_start:day_end]
+        if len(day_dates) > 1 and np.any(day_dates[1:] < day_dates[:-1]):
+            order = np.argsort(day_dates, kind='stable')
+            for column in columns:
+                output[column][day_start:day_end] = output[column][day_start:day_end][order]
+    for column in columns:
+        output[column].flush()
+    del output, unsorted, sales_dates
+    for path in scratch.values():
+        os.remove(path)
+
+    np.save(os.path.join(build_dir, DAY_INDEX_FILENAME), day_index)
+    meta = {
+        'version': STORE_FORMAT_VERSION,
+        'source': os.path.abspath(sales_file_path),
+        'source_fingerprint': file_fingerprint(sales_file_path),
+        'target_year': target_year,
+        'columns': {column: _column_dtype(column).str for column in file_columns},
+        'rows': int(rows),
+        'first_day': str(pd.Timestamp(first_day * NS_PER_DAY).date()),
+        'last_day': str(pd.Timestamp(last_day * NS_PER_DAY).date()),
+        'min_date': str(pd.Timestamp(first_ns)),
+        'max_date': str(pd.Timestamp(last_ns)),
+        'build_seconds': round(time.perf_counter() - start, 3),
+    }
+    with open(os.path.join(build_dir, STORE_META_FILENAME), 'w') as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(build_dir, store_dir)
+    return meta
+
+
+class SalesStore:
+    """A sales store opened read-only; its columns are memory-mapped, not loaded."""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, STORE_META_FILENAME)) as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != STORE_FORMAT_VERSION:
+            raise ValueError(f"'{store_dir}' is a version {self.meta['version']} sales store; rebuild it with "
+                             f"sales_store.py build")
+        self.columns = {column: np.load(_column_path(store_dir, column), mmap_mode='r') for column in self.meta['columns']}
+        self.day_index = np.load(os.path.join(store_dir, DAY_INDEX_FILENAME))
+        self.first_day = pd.Timestamp(self.meta['first_day']).as_unit('ns').value // NS_PER_DAY
+
+    def __len__(self):
+        return self.meta['rows']
+
+    @property
+    def target_year(self):
+        return self.meta['target_year']
+
+    def is_stale(self, sales_file_path=None):
+        """True if the source sales.csv (or `sales_file_path`) no longer matches the file the store was built from."""
+        try:
+            return file_fingerprint(sales_file_path or self.meta['source']) != self.meta['source_fingerprint']
+        except FileNotFoundError:
+            return True
+
+    def _row_bound(self, timestamp):
+        """Position of the first row at or after `timestamp`: the day index, then a binary search in that day."""
+        timestamp_ns = _to_ns(timestamp)
+        day = timestamp_ns // NS_PER_DAY - self.first_day
+        if day < 0:
+            return 0
+        if day >= len(self.day_index) - 1:
+            return len(self)
+        day_start, day_end = int(self.day_index[day]), int(self.day_index[day + 1])
+        return day_start + int(np.searchsorted(self.columns['SalesDate'][day_start:day_end], timestamp_ns))
+
+    def row_range(self, start=None, end=None):
+        """(first, stop) row positions of the sales with start <= SalesDate < end (either may be None)."""
+        first = 0 if start is None else self._row_bound(start)
+        stop = len(self) if end is None else self._row_bound(end)
+        return first, max(first, stop)
+
+    def slice(self, start=None, end=None, columns=None):
+        """
+        The sales with start <= SalesDate < end as {column: array}, zero-copy views of the
+        memory-mapped files (SalesDate as datetime64[ns]). Only the pages read are loaded.
+        """
+        first, stop = self.row_range(start, end)
+        views = {}
+        for column in columns or self.columns:
+            view = self.columns[column][first:stop]
+            views[column] = view.view('datetime64[ns]') if column == 'SalesDate' else view
+        return views
+
+    def to_frame(self, start=None, end=None, columns=None):
+        """The sales with start <= SalesDate < end as a DataFrame in memory, like a trimmed sales CSV."""
+        return pd.DataFrame({column: np.array(values) for column, values in self.slice(start, end, columns).items()})
+
+    def day_counts(self):
+        """Rows per day, as a Series indexed by day."""
+        days = pd.date_range(self.meta['first_day'], periods=len(self.day_index) - 1, freq='D')
+        return pd.Series(np.diff(self.day_index), index=days, name='Rows')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a memory-mapped, date-sorted sales store.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="Convert sales.csv into a store (one-time).")
+    build_parser.add_argument('sales_file', help="Raw sales.csv to convert.")
+    build_parser.add_argument('store_dir', help="Directory to write the store to (replaced if it exists).")
+    build_parser.add_argument('--target-year', type=int, default=2024,
+                              help="Year the sales dates are shifted to, as data_trimming.py (default: %(default)s).")
+    build_parser.add_argument('--memory-budget-mb', type=int, default=DEFAULT_MEMORY_BUDGET_MB,
+                              help="Approximate memory per chunk while converting (default: %(default)s MB).")
+
+    info_parser = subparsers.add_parser('info', help="Describe a store, and time slicing a date range from it.")
+    info_parser.add_argument('store_dir')
+    info_parser.add_argument('--from', dest='date_from', type=pd.Timestamp, help="First day of a range to slice.")
+    info_parser.add_argument('--to', dest='date_to', type=pd.Timestamp, help="Last day of the range to slice.")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        try:
+            meta = build_sales_store(args.sales_file, args.store_dir, args.target_year, args.memory_budget_mb)
+        except FileNotFoundError:
+            print(f"Error: The file '{args.sales_file}' was not found. Please check the path and filename.")
+            exit()
+        print(f"Stored {meta['rows']:,} rows, {meta['min_date']} to {meta['max_date']}, in '{args.store_dir}' in "
+              f"{meta['build_seconds']:.1f}s.")
+        return
+
+    store = SalesStore(args.store_dir)
+    size = sum(values.nbytes for values in store.columns.values())
+    print(f"'{args.store_dir}': {len(store):,} rows ({size / 2**20:,.1f} MB), {store.meta['min_date']} to "
+          f"{store.meta['max_date']}, shifted to {store.target_year}; columns {', '.join(store.columns)}.")
+    if store.is_stale():
+        print(f"Note: '{store.meta['source']}' has changed or is missing since the store was built.")
+    if args.date_from is not None or args.date_to is not None:
+        end = None if args.date_to is None else args.date_to.normalize() + pd.Timedelta(days=1)
+        start_time = time.perf_counter()
+        sales_df = store.to_frame(args.date_from, end)
+        print(f"Sliced {len(sales_df):,} rows for {args.date_from} to {args.date_to} in "
+              f"{(time.perf_counter() - start_time) * 1000:.2f} ms.")
+
+
+if __name__ == '__main__':
+    main()
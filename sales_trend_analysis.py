@@ -1,53 +1,65 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from column_selection import final_preprocessed_df  # Assuming this is the preprocessed DataFrame from the previous step
 
+from charts import emit_chart, weekly_trend_chart
+from instrumentation import instrumented
+from sales_cube import aggregate
 
 
-print("--- Sales Trend Analysis for February 2024 ---")
+def weekly_sales_trend(final_preprocessed_df):
+    """Total sales per week of the period (RelativeWeek 1, 2, ...; weeks start on Monday), without printing."""
+    # Aggregate total sales by day (a roll-up of the sales cube, see sales_cube.py), then by the
+    # Monday each day's week starts on, so periods spanning a year boundary keep their week order
+    daily_sales = aggregate(final_preprocessed_df, ['SalesDay'], ['TotalPrice'])
+    week_start = daily_sales['SalesDay'] - pd.to_timedelta(daily_sales['SalesDay'].dt.weekday, unit='D')
+    weekly_totals = daily_sales['TotalPrice'].groupby(week_start.rename('WeekStart')).sum()
 
-# --- Part 1: Weekly Sales Trend Line Graph ---
+    # Create a 'RelativeWeek' key for plotting (Week 1, Week 2, etc. within the period)
+    weekly_sales = pd.DataFrame({
+        'RelativeWeek': (weekly_totals.index - weekly_totals.index.min()).days // 7 + 1,
+        'TotalPrice': weekly_totals.to_numpy(),
+    })
 
-# Determine the starting ISO week number for February 2024 in the dataset
-min_sale_week = final_preprocessed_df['SaleWeek'].min()
+    # Ensure the weeks are sorted for proper plotting order
+    return weekly_sales.sort_values(by='RelativeWeek')
 
-# Create a 'RelativeWeek' column for plotting (Week 1, Week 2, etc. within the month)
-final_preprocessed_df['RelativeWeek'] = final_preprocessed_df['SaleWeek'] - min_sale_week + 1
 
-# Aggregate total sales by the new 'RelativeWeek'
-weekly_sales = final_preprocessed_df.groupby('RelativeWeek')['TotalPrice'].sum().reset_index()
+def product_sales(final_preprocessed_df):
+    """Total sales (TotalPrice) per ProductName as a Series, fastest-moving first."""
+    sales_by_product = aggregate(final_preprocessed_df, ['ProductName'], ['TotalPrice']).set_index('ProductName')['TotalPrice']
+    return sales_by_product.sort_values(ascending=False)
 
-# Ensure the weeks are sorted for proper plotting order
-weekly_sales = weekly_sales.sort_values(by='RelativeWeek')
 
-plt.figure(figsize=(10, 6)) # Adjusted figure size for weekly data
-sns.lineplot(
-    data=weekly_sales,
-    x='RelativeWeek',
-    y='TotalPrice',
-    marker='o', # Add markers for each data point
-    color='skyblue', # Single color for a single line
-    linewidth=2
-)
+@instrumented('sales_trend')
+def run_sales_trend_analysis(final_preprocessed_df, show_plots=True, period_label='February 2024', charts=None):
+    """
+    Weekly sales trend plus fast- and slow-moving products, from the preprocessed rows or a
+    SalesCube. The input is not modified. With `charts` (a charts.ChartBatch), the weekly trend
+    chart is added to it instead of being shown. Returns (weekly_sales, sales_by_product).
+    """
+    print(f"--- Sales Trend Analysis for {period_label} ---")
 
-plt.title('Weekly Sales Trend for February 2024')
-plt.xlabel('Week Number (within month)')
-plt.ylabel('Total Sales')
-plt.xticks(weekly_sales['RelativeWeek'].unique()) # Ensure only actual week numbers are shown
-plt.grid(True, linestyle='--', alpha=0.7)
-plt.tight_layout()
-plt.show()
+    # --- Part 1: Weekly Sales Trend Line Graph ---
 
-print("\n--- Part 2: Fast-Moving and Slow-Moving Items ---")
+    weekly_sales = weekly_sales_trend(final_preprocessed_df)
 
-# Group by ProductName and sum TotalPrice to get total sales for each product
-sales_by_product = final_preprocessed_df.groupby('ProductName')['TotalPrice'].sum().sort_values(ascending=False)
+    emit_chart(weekly_trend_chart(weekly_sales, period_label), charts, show_plots)
 
-print("\nTop 10 Fast-Moving Products (February 2024):")
-print(sales_by_product.head(10))
+    print("\n--- Part 2: Fast-Moving and Slow-Moving Items ---")
 
-print("\nTop 10 Slow-Moving Products (February 2024):")
-print(sales_by_product.tail(10))
+    # Total sales for each product, largest first
+    sales_by_product = product_sales(final_preprocessed_df)
 
-print("\nCombined sales trend analysis complete.")
+    print(f"\nTop 10 Fast-Moving Products ({period_label}):")
+    print(sales_by_product.head(10))
+
+    print(f"\nTop 10 Slow-Moving Products ({period_label}):")
+    print(sales_by_product.tail(10))
+
+    print("\nCombined sales trend analysis complete.")
+    return weekly_sales, sales_by_product
+
+
+if __name__ == '__main__':
+    from column_selection import final_preprocessed_df  # Assuming this is the preprocessed DataFrame from the previous step
+
+    run_sales_trend_analysis(final_preprocessed_df)
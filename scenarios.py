@@ -0,0 +1,204 @@
+"""
+Batch what-if scenarios: many assortments and COGS assumptions evaluated in one pass.
+
+    python -m bdm scenarios scenarios.json --month 2024-02 [--output scenario_results.csv]
+
+column_selection.py fixes one assortment (products_to_exclude, categories_to_include), and
+inventory_turnover_ratio_analysis.py one COGS share of revenue (0.70). A scenario file lists
+alternatives as a JSON list of objects, or JSON lines, each with any of:
+
+    {"name": "no beverages", "products_to_exclude": [...], "categories_to_include": [...],
+     "cogs_percentage": 0.65}
+
+Missing keys take column_selection.py's lists and the 0.70 COGS share.
+
+The sales are streamed once (as top_movers.py does) into per-product revenue and quantity for
+every product, without any assortment filter. The N scenarios then become an N x products
+boolean matrix: scenario i keeps product j if j's category is included and j is not excluded.
+All the figures come from that matrix and the per-product totals:
+- revenue is one matrix-vector product;
+- COGS, profit and profit margin follow from each scenario's COGS share;
+- the ABC summary ranks the products by revenue once. Each scenario's masked revenues are
+  summed cumulatively along that order and cut at the ABC thresholds, as abc_engine.abc_classify
+  does for one assortment.
+The cost is one read of the sales plus N x products array operations, so a few hundred
+scenarios cost about as much as one.
+"""
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from abc_engine import CLASS_SCHEMES, DEFAULT_COGS_PERCENTAGE_OF_REVENUE, classify_by_thresholds
+from instrumentation import step
+from product_lookup import build_product_lookup
+from sales_io import DEFAULT_MEMORY_BUDGET_MB
+from schema import CATEGORIES_DTYPES, PRODUCTS_DTYPES, as_float64
+from top_movers import filtered_sales_chunks
+
+SCENARIO_KEYS = ('name', 'products_to_exclude', 'categories_to_include', 'cogs_percentage')
+
+
+def load_scenarios(scenario_file_path):
+    """
+    Read a JSON list (or JSON lines) of scenarios and fill in the defaults. Returns a list of dicts
+    with every key of SCENARIO_KEYS; raises ValueError on unknown keys or a bad COGS share.
+    """
+    import column_selection
+
+    with open(scenario_file_path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        scenarios = json.loads(text)
+    except json.JSONDecodeError:
+        scenarios = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(scenarios, dict):
+        scenarios = [scenarios]
+
+    loaded = []
+    for number, scenario in enumerate(scenarios, start=1):
+        unknown = set(scenario) - set(SCENARIO_KEYS)
+        if unknown:
+            raise ValueError(f"scenario {number} has unknown key(s) {sorted(unknown)}; expected {list(SCENARIO_KEYS)}")
+        cogs_percentage = float(scenario.get('cogs_percentage', DEFAULT_COGS_PERCENTAGE_OF_REVENUE))
+        if not 0 <= cogs_percentage <= 1:
+            raise ValueError(f"scenario {number}: cogs_percentage must be between 0 and 1, got {cogs_percentage}")
+        loaded.append({
+            'name': str(scenario.get('name', f'scenario_{number}')),
+            'products_to_exclude': list(scenario.get('products_to_exclude', column_selection.products_to_exclude)),
+            'categories_to_include': list(scenario.get('categories_to_include', column_selection.categories_to_include)),
+            'cogs_percentage': cogs_percentage,
+        })
+    return loaded
+
+
+def product_totals(sales_file_paths, products_file_path, categories_file_path, start=None, end=None, target_year=None,
+                   memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Revenue (as column_selection.py's TotalPrice) and quantity per known product over the sales in
+    `sales_file_paths` on days in [start, end], before any assortment filter. One row per product
+    with sales, in ProductID order, with ProductName and CategoryName.
+    """
+    if isinstance(sales_file_paths, str):
+        sales_file_paths = [sales_file_paths]
+    lookup = build_product_lookup(pd.read_csv(products_file_path, dtype=PRODUCTS_DTYPES),
+                                  pd.read_csv(categories_file_path, dtype=CATEGORIES_DTYPES))
+    price = lookup['Price'].to_numpy(np.float64)
+    revenue = np.zeros(len(lookup))
+    quantity = np.zeros(len(lookup), dtype=np.int64)
+    rows = np.zeros(len(lookup), dtype=np.int64)
+    for _, chunk in filtered_sales_chunks(sales_file_paths, lookup['Known'].to_numpy(), start, end, target_year,
+                                          memory_budget_mb):
+        product_ids = chunk['ProductID'].to_numpy(np.int64)
+        chunk_quantity = chunk['Quantity'].to_numpy(np.int64)
+        weights = chunk_quantity * price[product_ids] * (1 - as_float64(chunk['Discount']).to_numpy())
+        revenue += np.bincount(product_ids, weights=weights, minlength=len(lookup))
+        quantity += np.bincount(product_ids, weights=chunk_quantity, minlength=len(lookup)).astype(np.int64)
+        rows += np.bincount(product_ids, minlength=len(lookup))
+
+    sold = np.flatnonzero(rows)
+    return pd.DataFrame({
+        'ProductID': sold,
+        'ProductName': lookup['ProductName'].array.take(sold),
+        'CategoryName': lookup['CategoryName'].array.take(sold),
+        'TotalRevenue': revenue[sold],
+        'TotalQuantity': quantity[sold],
+    })
+
+
+def scenario_matrix(scenarios, totals):
+    """
+    The N x products boolean matrix of the scenarios over `totals`' products: True where the
+    product's category is included and its name is not excluded.
+    """
+    product_names = pd.Index(totals['ProductName'].astype(object))
+    category_codes, category_names = pd.factorize(totals['CategoryName'].astype(object))
+    category_index = pd.Index(category_names)
+
+    def pairs(key, index):
+        # (scenario row, position in `index`) for every listed name that is present.
+        rows = np.repeat(np.arange(len(scenarios)), [len(scenario[key]) for scenario in scenarios])
+        positions = index.get_indexer([name for scenario in scenarios for name in scenario[key]])
+        return rows[positions >= 0], positions[positions >= 0]
+
+    included_categories = np.zeros((len(scenarios), len(category_names)), dtype=bool)
+    included_categories[pairs('categories_to_include', category_index)] = True
+    excluded = np.zeros((len(scenarios), len(product_names)), dtype=bool)
+    excluded[pairs('products_to_exclude', product_names)] = True
+    return included_categories[:, category_codes] & ~excluded
+
+
+def evaluate_scenarios(scenarios, totals, thresholds=CLASS_SCHEMES['abc'][0], labels=CLASS_SCHEMES['abc'][1]):
+    """
+    Revenue, COGS, profit, profit margin and the ABC class summary of every scenario, from
+    per-product `totals` (see product_totals). Returns one row per scenario.
+    """
+    with step('scenario_matrix', scenarios=len(scenarios)) as current:
+        kept = scenario_matrix(scenarios, totals)
+        current.record(kept)
+
+    with step('scenario_evaluate', scenarios=len(scenarios)):
+        product_revenue = totals['TotalRevenue'].to_numpy(np.float64)
+        revenue = kept @ product_revenue
+        cogs_percentage = np.array([scenario['cogs_percentage'] for scenario in scenarios])
+        cogs = revenue * cogs_percentage
+        profit = revenue - cogs
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin = np.where(revenue != 0, profit / revenue * 100, 0.0)
+
+        results = pd.DataFrame({
+            'Scenario': [scenario['name'] for scenario in scenarios],
+            'Products': kept.sum(axis=1),
+            'TotalQuantity': kept @ totals['TotalQuantity'].to_numpy(np.int64),
+            'TotalRevenue': revenue,
+            'COGSPercentage': cogs_percentage,
+            'TotalCOGS': cogs,
+            'TotalProfit': profit,
+            'ProfitMarginPercentage': margin,
+        })
+
+        # ABC: one ranking of all products by revenue (ties in ProductID order, as abc_classify),
+        # then each scenario's cumulative share of its own revenue along that ranking.
+        order = np.argsort(-product_revenue, kind='stable')
+        kept_ranked = kept[:, order]
+        cumulative = np.cumsum(np.where(kept_ranked, product_revenue[order], 0.0), axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cumulative_percentage = cumulative / revenue[:, None] * 100
+        classes = classify_by_thresholds(cumulative_percentage.ravel(), thresholds, labels).reshape(kept.shape)
+        for label in labels:
+            in_class = kept_ranked & (classes == label)
+            class_revenue = np.where(in_class, product_revenue[order], 0.0).sum(axis=1)
+            results[f'{label}_Products'] = in_class.sum(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                results[f'{label}_RevenuePercentage'] = np.where(revenue != 0, class_revenue / revenue * 100, 0.0)
+    return results
+
+
+def run_scenarios(scenario_file_path, sales_file_paths, products_file_path, categories_file_path, start=None, end=None,
+                  target_year=None, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, output_filename=None,
+                  period_label=None):
+    """Load the scenarios, stream the period's per-product totals once and evaluate every scenario."""
+    scenarios = load_scenarios(scenario_file_path)
+    print(f"--- What-if Scenarios for {period_label}: {len(scenarios)} scenarios ---" if period_label else
+          f"--- What-if Scenarios: {len(scenarios)} scenarios ---")
+
+    start_time = time.perf_counter()
+    with step('scenario_product_totals') as current:
+        totals = product_totals(sales_file_paths, products_file_path, categories_file_path, start, end, target_year,
+                                memory_budget_mb)
+        current.record(totals)
+    totals_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    results = evaluate_scenarios(scenarios, totals)
+    evaluate_seconds = time.perf_counter() - start_time
+    print(f"Per-product totals of {len(totals)} products in {totals_seconds:.2f}s; "
+          f"{len(scenarios)} scenarios evaluated in {evaluate_seconds * 1000:.1f} ms.")
+
+    with pd.option_context('display.max_columns', None, 'display.width', 200, 'display.float_format', '{:,.2f}'.format):
+        print(results.to_string(index=False))
+    if output_filename:
+        results.to_csv(output_filename, index=False)
+        print(f"\nScenario results saved to '{output_filename}'.")
+    return results
@@ -0,0 +1,82 @@
+"""
+Compact in-memory schema for the preprocessed sales data.
+
+Names (ProductName, CategoryName, SaleMonth, SaleWeekday) are stored as categoricals instead of
+one Python string per sales row, integer columns use the smallest width that holds their values,
+and Discount/Price are stored as float32. TotalPrice stays float64 because it is summed.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ['ProductName', 'CategoryName', 'SaleMonth', 'SaleWeekday']
+INTEGER_COLUMNS = ['ProductID', 'CategoryID', 'Quantity', 'SaleYear', 'SaleWeek']
+FLOAT32_COLUMNS = ['Discount', 'Price']
+
+# Decimal places in the source CSVs. A float32 value rounded back to this many places is the
+# exact float64 that read_csv would have produced, so calculations stay bit-for-bit identical.
+SOURCE_DECIMALS = {'Discount': 2, 'Price': 4}
+
+# Parse-time dtypes for products.csv and categories.csv.
+PRODUCTS_DTYPES = {'ProductID': 'int16', 'ProductName': 'category', 'Price': 'float64', 'CategoryID': 'int8'}
+CATEGORIES_DTYPES = {'CategoryID': 'int8', 'CategoryName': 'category'}
+
+
+def as_float64(series):
+    """Upcast a compact float column for arithmetic, restoring the source CSV value exactly."""
+    values = series.astype('float64')
+    decimals = SOURCE_DECIMALS.get(series.name)
+    return values.round(decimals) if decimals is not None and series.dtype == np.float32 else values
+
+
+def smallest_int(series):
+    """Downcast an integer column to the smallest signed width that holds all of its values."""
+    if series.isna().any() or not pd.api.types.is_integer_dtype(series):
+        return series
+    return pd.to_numeric(series, downcast='integer')
+
+
+def apply_compact_schema(df):
+    """Return `df` with the compact dtypes applied to whichever schema columns it has."""
+    compact = {}
+    for column in df.columns:
+        series = df[column]
+        if column in CATEGORICAL_COLUMNS and not isinstance(series.dtype, pd.CategoricalDtype):
+            compact[column] = series.astype('category')
+        elif column in INTEGER_COLUMNS:
+            compact[column] = smallest_int(series)
+        elif column in FLOAT32_COLUMNS and series.dtype != np.float32:
+            compact[column] = series.astype('float32')
+        elif column == 'SalesDate' and not pd.api.types.is_datetime64_any_dtype(series):
+            compact[column] = pd.to_datetime(series)
+    return df.assign(**compact) if compact else df
+
+
+def to_default_dtypes(df):
+    """The same frame with pandas' default dtypes (object strings, int64, float64), for comparison."""
+    default = {}
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            default[column] = series.astype(object)
+        elif pd.api.types.is_integer_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+            default[column] = series.astype('int64')
+        elif pd.api.types.is_float_dtype(series):
+            default[column] = as_float64(series)
+    return df.assign(**default)
+
+
+def memory_by_column(df):
+    """Deep memory usage in bytes per column (index excluded)."""
+    return df.memory_usage(index=False, deep=True)
+
+
+def print_memory_report(before_df, after_df, title="Memory Report"):
+    before = memory_by_column(before_df)
+    after = memory_by_column(after_df)
+    print(f"\n--- {title} ---")
+    print(f"{'column':<14}{'dtype before':<16}{'dtype after':<16}{'before (MB)':>12}{'after (MB)':>12}")
+    for column in after.index:
+        print(f"{column:<14}{str(before_df[column].dtype):<16}{str(after_df[column].dtype):<16}"
+              f"{before[column] / 1e6:>12.2f}{after[column] / 1e6:>12.2f}")
+    saved = 1 - after.sum() / before.sum() if before.sum() else 0
+    print(f"{'total':<46}{before.sum() / 1e6:>12.2f}{after.sum() / 1e6:>12.2f}  ({saved:.0%} smaller)")
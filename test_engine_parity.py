@@ -0,0 +1,59 @@
+"""
+The lazy preprocessing engines against the pandas path, as a pytest test (the same comparison
+as check_engine_parity.py, on a small generated set of input files). Engines that are not
+installed are skipped.
+
+    python -m pytest test_engine_parity.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from check_engine_parity import build, compare
+
+# Included and excluded categories, and one excluded product name (see column_selection.py).
+CATEGORIES = ['Confections', 'Shell fish', 'Produce', 'Beverages', 'Meat', 'Grain']
+PRODUCT_NAMES = ['Barramundi', 'Flour - Whole Wheat', 'Cookie Chocolate Chip With', 'Apples - Green',
+                 'Tea - Green', 'Coffee - Irish Cream', 'Rice - Long Grain', 'Beef - Ground', 'Shrimp - 31/40',
+                 'Juice - Orange', 'Bread - White', 'Candy - Fudge']
+SALES_ROWS = 2_000
+
+
+@pytest.fixture(scope='module')
+def input_files(tmp_path_factory):
+    """(sales file, products file, categories file) written to a temporary directory."""
+    directory = tmp_path_factory.mktemp('engine_parity')
+    rng = np.random.default_rng(0)
+    categories = pd.DataFrame({'CategoryID': range(1, len(CATEGORIES) + 1), 'CategoryName': CATEGORIES})
+    products = pd.DataFrame({
+        'ProductID': range(1, len(PRODUCT_NAMES) + 1),
+        'ProductName': PRODUCT_NAMES,
+        'Price': rng.uniform(1, 100, len(PRODUCT_NAMES)).round(4),
+        'CategoryID': np.arange(len(PRODUCT_NAMES)) % len(CATEGORIES) + 1,
+    })
+    seconds = rng.integers(0, 29 * 24 * 3600, SALES_ROWS)
+    sales = pd.DataFrame({
+        'SalesID': range(1, SALES_ROWS + 1),
+        'ProductID': rng.integers(1, len(PRODUCT_NAMES) + 2, SALES_ROWS),  # The last ID is not in products.csv.
+        'Quantity': rng.integers(1, 26, SALES_ROWS),
+        'Discount': rng.choice([0.0, 0.1, 0.2], SALES_ROWS),
+        'TotalPrice': 0.0,
+        'SalesDate': (pd.Timestamp(2024, 2, 1) + pd.to_timedelta(seconds, unit='s')).strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    sales.loc[::97, 'SalesDate'] = None  # Undated rows are dropped by every engine.
+
+    paths = [directory / name for name in ('sales.csv', 'products.csv', 'categories.csv')]
+    for frame, path in zip((sales, products, categories), paths):
+        frame.to_csv(path, index=False)
+    return tuple(str(path) for path in paths)
+
+
+@pytest.mark.parametrize('engine', ['polars', 'duckdb'])
+def test_lazy_engine_matches_pandas(engine, input_files):
+    pytest.importorskip(engine)
+    sales_file, products_file, categories_file = input_files
+    expected, _ = build('pandas', sales_file, products_file, categories_file)
+    actual, _ = build(engine, sales_file, products_file, categories_file)
+    assert len(expected) > 0
+    problems = compare(expected, actual)
+    assert problems == [], problems
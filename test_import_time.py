@@ -0,0 +1,33 @@
+"""
+Import-time budget of the library API and the analysis modules, as a pytest test (the same
+checks as check_import_time.py, with its default budgets).
+
+    python -m pytest test_import_time.py
+"""
+import os
+
+import pytest
+
+from check_import_time import (ANALYSIS_MODULES, API_FORBIDDEN_MODULES, API_MODULE, DEFAULT_API_BUDGET_MS,
+                               DEFAULT_BUDGET_MS, DEFAULT_REPEAT, HEAVY_MODULES, check_module)
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope='module')
+def work_dir(tmp_path_factory):
+    # An empty working directory, so a module that reads data files at import fails.
+    return str(tmp_path_factory.mktemp('import_time'))
+
+
+def test_api_import_is_within_budget(work_dir):
+    milliseconds, problems = check_module(API_MODULE, [], API_FORBIDDEN_MODULES, DEFAULT_API_BUDGET_MS,
+                                          DEFAULT_REPEAT, REPO_DIR, work_dir)
+    assert problems == [], f"{API_MODULE}: {'; '.join(problems)}"
+
+
+@pytest.mark.parametrize('module', ANALYSIS_MODULES)
+def test_analysis_module_import_is_within_budget(module, work_dir):
+    milliseconds, problems = check_module(module, ['numpy', 'pandas'], HEAVY_MODULES, DEFAULT_BUDGET_MS,
+                                          DEFAULT_REPEAT, REPO_DIR, work_dir)
+    assert problems == [], f"{module}: {'; '.join(problems)}"
@@ -1,75 +1,174 @@
-import pandas as pd
-from prophet import Prophet
-import matplotlib.pyplot as plt
-import seaborn as sns
-from column_selection import final_preprocessed_df  # Assuming this is the preprocessed DataFrame from the previous step
-
-# Suppress warnings from Prophet
-import logging
-logging.getLogger('prophet').setLevel(logging.WARNING)
-
-# Assuming 'final_preprocessed_df' is available and preprocessed
-# from the 'Preprocess Trimmed Sales Data (February 2024) for Indian Grocery Store Specifics' immersive.
-# This DataFrame should contain 'SalesDate' and 'TotalPrice'.
-
-print("--- Time Series Forecasting for February 2024 Sales ---")
-print("Using the 'final_preprocessed_df' which is already filtered for February 2024,")
-print("Indian grocery store products, and selected categories.")
-
-
-# Step 1: Prepare the data for Prophet
-# Aggregate TotalPrice by SalesDate to get daily sales
-daily_sales = final_preprocessed_df.groupby('SalesDate')['TotalPrice'].sum().reset_index()
-
-# Rename columns to 'ds' and 'y' as required by Prophet
-daily_sales = daily_sales.rename(columns={'SalesDate': 'ds', 'TotalPrice': 'y'})
-
-print("\nPrepared daily sales data for Prophet (first 5 rows):")
-print(daily_sales.head())
-print(f"Total days in dataset: {len(daily_sales)}")
-
+import argparse
 
-# Step 2: Initialize and Fit Prophet Model
-# Using daily_seasonality=True if there's enough data to detect daily patterns
-# (though with only one month, it might be weak)
-model = Prophet(seasonality_mode='additive', daily_seasonality=True)
-model.fit(daily_sales)
-
-print("\nProphet model fitted to the February 2024 daily sales data.")
-
-# Step 3: Make Future DataFrame
-# Forecast for the next 7 days (into March)
-future = model.make_future_dataframe(periods=7, include_history=True) # include_history=True to plot actuals
-print(f"\nFuture DataFrame created for {len(future)} periods (including history and next 7 days).")
-print(future.tail(10)) # Show some of the future dates
-
-# Step 4: Generate Forecasts
-forecast = model.predict(future)
-
-print("\nForecast generated (first 5 rows of forecast):")
-print(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].head())
-print("Forecast generated (last 5 rows of forecast - predictions):")
-print(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail())
-
-# Step 5: Plot the Forecasts
-fig1 = model.plot(forecast)
-plt.title('Daily Sales Forecast for February 2024 and Next 7 Days')
-plt.xlabel('Date')
-plt.ylabel('Total Sales (₹)') # Updated label to reflect Rupees
-plt.grid(True, linestyle='--', alpha=0.6)
-plt.show()
-
-# Plot the components of the forecast (trend, daily seasonality)
-fig2 = model.plot_components(forecast)
-plt.show()
-
-
-# Step 6: Acknowledge Limitations
-print("\n--- Important Note on Forecast Limitations ---")
-print("This forecast was generated using only one month (February 2024) of historical sales data.")
-print("Due to this very limited dataset, the accuracy and reliability of these predictions are inherently low.")
-print("Time series models perform best with more historical data to accurately identify long-term trends,")
-print("yearly seasonality, and more robust weekly/daily patterns.")
-print("These forecasts should be considered illustrative and not for critical business decision-making.")
+import numpy as np
+import pandas as pd
 
-print("\nTime Series Forecasting section complete.")
+from charts import emit_chart, forecast_chart, forecast_components_chart
+from forecast_cache import cached_fit_predict
+from forecasters import DEFAULT_FORECAST_BACKEND, FORECASTERS, forecast_components, forecast_frame, get_forecaster
+from instrumentation import instrumented, step
+from sales_cube import aggregate
+
+
+def daily_sales_series(final_preprocessed_df):
+    """Total sales (TotalPrice) per calendar day as a regular daily Series; days without sales count as zero."""
+    daily_sales = aggregate(final_preprocessed_df, ['SalesDay'], ['TotalPrice']).set_index('SalesDay')['TotalPrice']
+    return daily_sales.asfreq('D', fill_value=0.0)
+
+
+def fit_forecast(ds, y, periods=7, backend=DEFAULT_FORECAST_BACKEND, use_cache=True):
+    """
+    Fit one daily series (`y` on dates `ds`) with a forecasters.py backend and forecast `periods`
+    days, optionally via the forecast cache. Returns (forecast frame, how it was obtained), without printing.
+    The frame also has the backend's components (Prophet's trend and seasonalities), cached or not.
+    """
+    forecaster = get_forecaster(backend)
+    series = np.asarray(y, dtype=np.float64)[None, :]
+    with step('fit_predict', backend=backend, rows=series.shape[1]) as current:
+        if use_cache:
+            yhat, yhat_lower, yhat_upper, counts, states = cached_fit_predict(forecaster, series, periods, ds=ds)
+            how = 'served from the forecast cache' if counts['cached'] else \
+                'refitted warm from the cached model' if counts['warm'] else 'fitted and cached'
+        else:
+            yhat, yhat_lower, yhat_upper, states = forecaster.fit_predict_state(series, periods, ds=ds)
+            how = 'fitted'
+        current.record(how=how)
+    forecast = forecast_frame(ds, yhat[0], yhat_lower[0], yhat_upper[0], periods)
+    return forecast.assign(**forecast_components(states[0])), how
+
+
+@instrumented('forecast')
+def run_forecast(final_preprocessed_df, show_plots=True, periods=7, backend=DEFAULT_FORECAST_BACKEND,
+                 use_cache=True, period_label='February 2024', charts=None):
+    """
+    Fit a forecasting backend (see forecasters.py; Prophet by default) to total daily sales and
+    forecast the next `periods` days.
+
+    'final_preprocessed_df' should contain 'SalesDate' and 'TotalPrice' (see column_selection.py),
+    or be a SalesCube of it.
+    With `use_cache`, fitted models and forecasts are reused across runs (see forecast_cache.py).
+    `period_label` names the preprocessed period in the output. With `charts` (a charts.ChartBatch),
+    the forecast chart (and Prophet's components chart) is added to it instead of being shown.
+    Returns the forecast DataFrame (ds, yhat, yhat_lower, yhat_upper, plus Prophet's components,
+    and all of Prophet's own columns when it is fitted without the cache).
+    """
+    print(f"--- Time Series Forecasting for {period_label} Sales ---")
+    print(f"Using the 'final_preprocessed_df' which is already filtered for {period_label},")
+    print("Indian grocery store products, and selected categories.")
+
+    if backend != 'prophet':
+        return _run_vectorized_forecast(final_preprocessed_df, show_plots, periods, backend, use_cache, period_label,
+                                        charts)
+
+    # Step 1: Prepare the data for Prophet
+    # Aggregate TotalPrice by SalesDate to get daily sales
+    # (The sales cube has no per-timestamp cells, so this groups the raw rows.)
+    daily_sales = aggregate(final_preprocessed_df, ['SalesDate'], ['TotalPrice'])
+
+    # Rename columns to 'ds' and 'y' as required by Prophet
+    daily_sales = daily_sales.rename(columns={'SalesDate': 'ds', 'TotalPrice': 'y'})
+
+    print("\nPrepared daily sales data for Prophet (first 5 rows):")
+    print(daily_sales.head())
+    print(f"Total days in dataset: {len(daily_sales)}")
+
+    if use_cache:
+        return _forecast_series(daily_sales['ds'], daily_sales['y'], show_plots, periods, backend, use_cache,
+                                period_label, charts)
+
+    # Prophet is imported only when it is used: the import pulls in the Stan backend.
+    import logging
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+    from prophet import Prophet
+
+    # Step 2: Initialize and Fit Prophet Model
+    # Using daily_seasonality=True if there's enough data to detect daily patterns
+    # (though with only one month, it might be weak)
+    model = Prophet(seasonality_mode='additive', daily_seasonality=True)
+    with step('prophet_fit', rows=len(daily_sales)):
+        model.fit(daily_sales)
+
+    print(f"\nProphet model fitted to the {period_label} daily sales data.")
+
+    # Step 3: Make Future DataFrame
+    # Forecast for the next `periods` days after the period
+    future = model.make_future_dataframe(periods=periods, include_history=True) # include_history=True to plot actuals
+    print(f"\nFuture DataFrame created for {len(future)} periods (including history and next {periods} days).")
+    print(future.tail(10)) # Show some of the future dates
+
+    # Step 4: Generate Forecasts
+    with step('prophet_predict') as current:
+        forecast = model.predict(future)
+        current.record(forecast)
+
+    print("\nForecast generated (first 5 rows of forecast):")
+    print(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].head())
+    print("Forecast generated (last 5 rows of forecast - predictions):")
+    print(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail())
+
+    # Step 5: Plot the Forecasts
+    # Drawn from the forecast frame (not the model), so the charts can be rendered in another process
+    title = f'Daily Sales Forecast for {period_label} and Next {periods} Days'
+    emit_chart(forecast_chart(daily_sales['ds'], daily_sales['y'], forecast, title), charts, show_plots)
+
+    # Plot the components of the forecast (trend, daily seasonality)
+    emit_chart(forecast_components_chart(forecast, f'Forecast Components for {period_label}'), charts, show_plots)
+
+
+    print_forecast_limitations(daily_sales['ds'].dt.normalize().nunique(), period_label)
+    return forecast
+
+
+def _run_vectorized_forecast(final_preprocessed_df, show_plots, periods, backend, use_cache, period_label, charts):
+    """The same steps with one of the NumPy backends, on a regular daily series."""
+    # Step 1: Aggregate TotalPrice per calendar day (days without sales count as zero)
+    daily_sales = daily_sales_series(final_preprocessed_df)
+    print(f"\nPrepared daily sales data for the '{backend}' backend (first 5 rows):")
+    print(daily_sales.head())
+    print(f"Total days in dataset: {len(daily_sales)}")
+    return _forecast_series(daily_sales.index, daily_sales, show_plots, periods, backend, use_cache, period_label,
+                            charts)
+
+
+def _forecast_series(ds, y, show_plots, periods, backend, use_cache, period_label, charts):
+    """Steps 2-5 through the forecasters interface, optionally via the forecast cache."""
+    # Step 2-4: Fit and forecast in one call
+    forecast, how = fit_forecast(ds, y, periods, backend, use_cache)
+    print(f"\n'{backend}' model {how}; forecast generated (last 5 rows - predictions):")
+    print(forecast.tail())
+
+    # Step 5: Plot the Forecasts
+    title = f'Daily Sales Forecast for {period_label} and Next {periods} Days ({backend})'
+    emit_chart(forecast_chart(ds, y.to_numpy(), forecast, title), charts, show_plots)
+    # Prophet's components (trend, seasonalities) come from the fitted or cached state.
+    emit_chart(forecast_components_chart(forecast, f'Forecast Components for {period_label}'), charts, show_plots)
+
+    print_forecast_limitations(pd.DatetimeIndex(ds).normalize().nunique(), period_label)
+    return forecast
+
+
+def print_forecast_limitations(n_days, period_label='February 2024'):
+    # Step 6: Acknowledge Limitations
+    print("\n--- Important Note on Forecast Limitations ---")
+    print(f"This forecast was generated using {n_days} days ({period_label}) of historical sales data.")
+    if n_days < 365:
+        print("With less than a year of history, the accuracy and reliability of these predictions are limited.")
+        print("Time series models perform best with more historical data to accurately identify long-term trends,")
+        print("yearly seasonality, and more robust weekly/daily patterns.")
+        print("These forecasts should be considered illustrative and not for critical business decision-making.")
+
+    print("\nTime Series Forecasting section complete.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Forecast total daily sales.")
+    parser.add_argument('--backend', choices=list(FORECASTERS), default=DEFAULT_FORECAST_BACKEND,
+                        help="Forecasting backend (default: %(default)s).")
+    parser.add_argument('--periods', type=int, default=7, help="Days to forecast ahead (default: %(default)s).")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Fit from scratch instead of reusing cached models.")
+    args = parser.parse_args()
+
+    from column_selection import final_preprocessed_df  # Assuming this is the preprocessed DataFrame from the previous step
+
+    run_forecast(final_preprocessed_df, periods=args.periods, backend=args.backend, use_cache=not args.no_cache)
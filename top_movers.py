@@ -0,0 +1,183 @@
+"""
+Streaming fast/slow movers: the top-K and bottom-K products without the row-level frame.
+
+sales_trend_analysis.py ranks products from the preprocessed period. Here sales rows are read
+chunk by chunk (sales_io.iter_sales_chunks) from the raw sales.csv, a trimmed file or month
+partitions. Each chunk is filtered like column_selection.py (product exclusions, category
+inclusions, the date range) and folded into per-product accumulators. Memory is therefore
+bounded by the chunk size and the number of products, not by the number of rows.
+
+There are two accumulators:
+- 'exact': dense arrays indexed by ProductID (as in product_lookup.py), updated with one
+  np.bincount per chunk. It is exact and ranks both ends.
+- 'space_saving': a Space-Saving summary of `capacity` counters, for key spaces too large for
+  a dense array. Every chunk is aggregated first, then merged into the summary, which keeps the
+  `capacity` largest counters.
+  - A monitored product's Total is an upper bound of its true total, at most Error too high.
+  - A product that is not monitored sold no more than the smallest counter.
+  - The summary is exact while no more than `capacity` products have sold.
+  It only ranks the top: a heavy-hitter summary keeps nothing about the slowest products.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from abc_engine import METRICS
+from product_lookup import build_product_lookup, product_filter_masks
+from sales_io import DEFAULT_MEMORY_BUDGET_MB, iter_sales_chunks, shift_sales_year
+from schema import CATEGORIES_DTYPES, PRODUCTS_DTYPES, as_float64
+
+MOVER_METRICS = ('revenue', 'quantity')
+MOVER_METHODS = ('exact', 'space_saving')
+MOVER_COLUMNS = ['SalesDate', 'ProductID', 'Quantity', 'Discount']
+
+
+class ExactAccumulator:
+    """Exact totals per ProductID in a dense array."""
+
+    def __init__(self, size):
+        self.totals = np.zeros(size)
+        self.rows = np.zeros(size, dtype=np.int64)
+
+    def update(self, product_ids, weights):
+        self.totals += np.bincount(product_ids, weights=weights, minlength=len(self.totals))
+        self.rows += np.bincount(product_ids, minlength=len(self.rows))
+
+    def ranked(self):
+        """(ProductID, Total, Error) of every product with sales, largest total first."""
+        sold = np.flatnonzero(self.rows)
+        order = np.argsort(-self.totals[sold], kind='stable')
+        return pd.DataFrame({'ProductID': sold[order], 'Total': self.totals[sold][order], 'Error': 0.0})
+
+
+class SpaceSavingSummary:
+    """Space-Saving heavy hitters over weighted keys, merged one aggregated chunk at a time."""
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0)
+        self.errors = np.empty(0)
+        self.min_count = 0.0  # Upper bound of the total of any key that is not monitored.
+
+    def update(self, keys, weights):
+        # Exact per-key totals of the chunk first, so each key is merged once.
+        codes, unique_keys = pd.factorize(keys)
+        chunk_counts = np.bincount(codes, weights=weights, minlength=len(unique_keys))
+
+        positions = pd.Index(self.keys).get_indexer(unique_keys)
+        monitored = positions >= 0
+        counts = self.counts.copy()
+        np.add.at(counts, positions[monitored], chunk_counts[monitored])
+
+        # A key seen for the first time may have been evicted before: start it at min_count.
+        floor = self.min_count
+        keys = np.concatenate([self.keys, np.asarray(unique_keys[~monitored], dtype=np.int64)])
+        counts = np.concatenate([counts, chunk_counts[~monitored] + floor])
+        errors = np.concatenate([self.errors, np.full((~monitored).sum(), floor)])
+
+        if len(keys) > self.capacity:
+            keep = np.argpartition(-counts, self.capacity - 1)[:self.capacity]
+            keys, counts, errors = keys[keep], counts[keep], errors[keep]
+        self.keys, self.counts, self.errors = keys, counts, errors
+        if len(keys) >= self.capacity:
+            self.min_count = float(counts.min())
+
+    def ranked(self):
+        order = np.argsort(-self.counts, kind='stable')
+        return pd.DataFrame({'ProductID': self.keys[order], 'Total': self.counts[order], 'Error': self.errors[order]})
+
+
+def filtered_sales_chunks(sales_file_paths, included, start, end, target_year, memory_budget_mb):
+    """
+    Sales chunks of `sales_file_paths` (shifted to `target_year` if given) on days in [start, end],
+    keeping the products whose `included[ProductID]` is True. Yields (rows read, filtered chunk).
+    """
+    end_exclusive = None if end is None else pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+    for path in sales_file_paths:
+        for rows_read, chunk in iter_sales_chunks(path, memory_budget_mb, MOVER_COLUMNS):
+            if target_year is not None:
+                chunk['SalesDate'] = shift_sales_year(chunk['SalesDate'], target_year)
+            product_ids = chunk['ProductID'].to_numpy(np.int64)
+            keep = (product_ids >= 0) & (product_ids < len(included))
+            keep[keep] = included[product_ids[keep]]
+            if start is not None:
+                keep &= (chunk['SalesDate'] >= pd.Timestamp(start).normalize()).to_numpy()
+            if end_exclusive is not None:
+                keep &= (chunk['SalesDate'] < end_exclusive).to_numpy()
+            yield rows_read, chunk[keep]
+
+
+def stream_movers(sales_file_paths, products_file_path, categories_file_path, k=10, metric='revenue', start=None,
+                  end=None, target_year=None, method='exact', capacity=None,
+                  memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, products_to_exclude=None, categories_to_include=None):
+    """
+    The `k` fastest and slowest products by total `metric` ('revenue' or 'quantity') over the sales
+    in `sales_file_paths`, read in chunks of about `memory_budget_mb`. Pass `target_year` for the
+    raw sales.csv, which still has to be shifted; trimmed files and partitions are already shifted.
+    Only sales on days in [start, end] (either may be None) count. The filters default to
+    column_selection.py's, so revenue matches the preprocessed TotalPrice.
+
+    `method` is 'exact' or 'space_saving'; with a summary of `capacity` counters (default 10 * k)
+    there is no bottom list. Returns (top, bottom, stats). The lists have ProductID, ProductName,
+    CategoryName, Total<Metric> and Error (0 when exact); bottom is slowest first, or None.
+    """
+    if metric not in MOVER_METRICS:
+        raise ValueError(f"metric must be one of {MOVER_METRICS}, got {metric!r}")
+    if method not in MOVER_METHODS:
+        raise ValueError(f"method must be one of {MOVER_METHODS}, got {method!r}")
+    if products_to_exclude is None or categories_to_include is None:
+        import column_selection
+        products_to_exclude = column_selection.products_to_exclude if products_to_exclude is None else products_to_exclude
+        categories_to_include = column_selection.categories_to_include if categories_to_include is None else categories_to_include
+    if isinstance(sales_file_paths, str):
+        sales_file_paths = [sales_file_paths]
+
+    lookup = build_product_lookup(pd.read_csv(products_file_path, dtype=PRODUCTS_DTYPES),
+                                  pd.read_csv(categories_file_path, dtype=CATEGORIES_DTYPES))
+    _, included = product_filter_masks(lookup, products_to_exclude, categories_to_include)
+    price = lookup['Price'].to_numpy(np.float64)
+    accumulator = ExactAccumulator(len(lookup)) if method == 'exact' else SpaceSavingSummary(capacity or 10 * k)
+
+    start_time = time.perf_counter()
+    stats = {'rows_read': 0, 'rows_used': 0, 'chunks': 0}
+    for rows_read, chunk in filtered_sales_chunks(sales_file_paths, included, start, end, target_year, memory_budget_mb):
+        stats['rows_read'] += rows_read
+        stats['rows_used'] += len(chunk)
+        stats['chunks'] += 1
+        product_ids = chunk['ProductID'].to_numpy(np.int64)
+        quantity = chunk['Quantity'].to_numpy(np.float64)
+        if metric == 'revenue':
+            # As column_selection.py's TotalPrice: Quantity * Price * (1 - Discount).
+            weights = quantity * price[product_ids] * (1 - as_float64(chunk['Discount']).to_numpy())
+        else:
+            weights = quantity
+        accumulator.update(product_ids, weights)
+    stats['seconds'] = time.perf_counter() - start_time
+
+    ranked = accumulator.ranked()
+    ranked.insert(1, 'ProductName', lookup['ProductName'].array.take(ranked['ProductID'].to_numpy()))
+    ranked.insert(2, 'CategoryName', lookup['CategoryName'].array.take(ranked['ProductID'].to_numpy()))
+    if metric == 'quantity':
+        ranked[['Total', 'Error']] = ranked[['Total', 'Error']].astype(np.int64)  # Sums of whole units.
+    ranked = ranked.rename(columns={'Total': f'Total{METRICS[metric][0]}'})
+    top = ranked.head(k).reset_index(drop=True)
+    bottom = ranked.tail(k).iloc[::-1].reset_index(drop=True) if method == 'exact' else None
+    return top, bottom, stats
+
+
+def print_movers(top, bottom, stats, metric, period_label):
+    total_column = f'Total{METRICS[metric][0]}'
+    columns = ['ProductName', 'CategoryName', total_column] + (['Error'] if top['Error'].any() else [])
+    print(f"Streamed {stats['rows_read']:,} rows in {stats['chunks']} chunks ({stats['rows_used']:,} in the period "
+          f"and categories) in {stats['seconds']:.2f}s.")
+    print(f"\nTop {len(top)} Fast-Moving Products by {metric} ({period_label}):")
+    print(top[columns].to_string(index=False))
+    if bottom is None:
+        print("\n(Slow movers need --method exact: a Space-Saving summary only tracks the largest totals.)")
+    else:
+        print(f"\nTop {len(bottom)} Slow-Moving Products by {metric} ({period_label}), slowest first:")
+        print(bottom[columns].to_string(index=False))